@@ -0,0 +1,325 @@
+"""Serving of the built frontend from memory, with precompressed variants.
+
+Build-time compression, run after copying the frontend build into place:
+
+    python -m app.assets.assets static
+"""
+from dataclasses import dataclass
+from email.utils import formatdate
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from typing import Optional
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import sys
+import time
+from dotenv import load_dotenv
+
+from ..cache.cache import TTLCache, MISSING
+from ..storage.downloads import not_modified
+
+load_dotenv()
+
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+# How often a served file is checked for changes on disk, e.g. a new index.html after a deploy
+STATIC_RELOAD_INTERVAL_SECONDS = float(os.getenv("STATIC_RELOAD_INTERVAL_SECONDS", "2"))
+# Larger files are streamed from disk instead of being held in memory
+STATIC_MAX_CACHED_FILE_MB = int(os.getenv("STATIC_MAX_CACHED_FILE_MB", "10"))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compression applied when no precompressed file is found next to an asset;
+# the build-time command uses the maximum levels instead
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+BUILD_GZIP_LEVEL = 9
+BUILD_BROTLI_QUALITY = 11
+
+# Smaller files are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "image/svg+xml",
+    "image/x-icon",
+    "image/vnd.microsoft.icon",
+}
+
+# Content encodings by preference, with the suffix of their precompressed files
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# File names carrying a content hash, e.g. main.0c05d6f5.js or 453.8ab44547.chunk.js
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")
+
+# Hashed files never change under the same name; everything else is revalidated with its ETag
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+INDEX_FILE = "index.html"
+
+# Prefix of the hashed build output; a missing file here is a 404, not the app shell
+BUILD_ASSETS_PREFIX = "static/"
+
+MEDIA_TYPES = {
+    ".js": "application/javascript",
+    ".map": "application/json",
+    ".json": "application/json",
+    ".webmanifest": "application/manifest+json",
+}
+
+
+def media_type_for(path: str):
+    extension = os.path.splitext(path)[1].lower()
+    return MEDIA_TYPES.get(extension) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def is_compressible(media_type: str):
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+def compress(encoding: str, content: bytes, build: bool = False):
+    if encoding == "br":
+        return brotli.compress(content, quality=BUILD_BROTLI_QUALITY if build else BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=BUILD_GZIP_LEVEL if build else GZIP_LEVEL, mtime=0)
+
+
+def available_encodings():
+    return [(encoding, suffix) for encoding, suffix in ENCODINGS if encoding != "br" or brotli is not None]
+
+
+@dataclass
+class Asset:
+    """A static file held in memory, with its compressed variants."""
+    path: str
+    media_type: str
+    cache_control: str
+    etag: str
+    last_modified: str
+    mtime: float
+    # (st_mtime_ns, st_size) when loaded, to detect changes on disk
+    signature: tuple
+    # Content by encoding; "identity" is always present
+    bodies: dict
+    checked_at: float
+
+
+def load_asset(path: str, stat: os.stat_result):
+    """Read a file and its compressed variants, preferring precompressed files on disk."""
+    with open(path, "rb") as f:
+        content = f.read()
+    media_type = media_type_for(path)
+    bodies = {"identity": content}
+    if is_compressible(media_type) and len(content) >= COMPRESS_MIN_BYTES:
+        for encoding, suffix in ENCODINGS:
+            variant_path = path + suffix
+            if os.path.isfile(variant_path) and os.stat(variant_path).st_mtime_ns >= stat.st_mtime_ns:
+                with open(variant_path, "rb") as f:
+                    variant = f.read()
+            elif encoding == "br" and brotli is None:
+                continue
+            else:
+                variant = compress(encoding, content)
+            if len(variant) < len(content):
+                bodies[encoding] = variant
+
+    hashed = HASHED_NAME.search(os.path.basename(path)) is not None
+    return Asset(
+        path=path,
+        media_type=media_type,
+        cache_control=IMMUTABLE_CACHE_CONTROL if hashed else REVALIDATE_CACHE_CONTROL,
+        etag=hashlib.sha256(content).hexdigest()[:32],
+        last_modified=formatdate(stat.st_mtime, usegmt=True),
+        mtime=stat.st_mtime,
+        signature=(stat.st_mtime_ns, stat.st_size),
+        bodies=bodies,
+        checked_at=time.monotonic(),
+    )
+
+
+def accepted_encodings(header: str):
+    """Content codings a client accepts, from its Accept-Encoding header."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def normalize_path(relative_path: str):
+    """Canonical form of a request path relative to the root, or None if it leaves the root.
+
+    Purely lexical, so aliases such as a/../main.js share one cache entry
+    without touching the disk.
+    """
+    path = posixpath.normpath(relative_path)
+    if path.startswith(("/", "../")) or path == "..":
+        return None
+    return path
+
+
+class AssetStore:
+    """In-memory table of the files under a directory, kept in step with the disk.
+
+    Each file is read and compressed once. Files are re-checked at most
+    every reload_interval seconds, except content-hashed ones, which never
+    change. Paths with no file are remembered for the same interval so
+    client-side routes do not hit the disk on every request.
+
+    Only the files found by preload are held in memory, so the store cannot
+    grow with the requests it sees; files added to the directory later are
+    streamed from disk until the next restart.
+    """
+
+    def __init__(self, root: str, reload_interval: float, max_cached_bytes: int):
+        self.root = os.path.realpath(root)
+        self.reload_interval = reload_interval
+        self.max_cached_bytes = max_cached_bytes
+        self._assets = {}
+        # Paths that may be held in memory, fixed by preload
+        self._cacheable = frozenset()
+        self._missing = TTLCache(maxsize=10000, ttl=reload_interval)
+
+    def _resolve(self, relative_path: str):
+        path = os.path.realpath(os.path.join(self.root, relative_path))
+        if not path.startswith(self.root + os.sep):
+            return None
+        return path
+
+    def preload(self):
+        """Load every file under the root, so compression happens before serving."""
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                    continue
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                if stat.st_size <= self.max_cached_bytes:
+                    relative_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+                    self._assets[relative_path] = load_asset(path, stat)
+        self._cacheable = frozenset(self._assets)
+
+    async def get(self, relative_path: str):
+        """The asset at a path relative to the root, a path to stream from disk, or None."""
+        relative_path = normalize_path(relative_path)
+        if relative_path is None:
+            return None
+        asset = self._assets.get(relative_path)
+        now = time.monotonic()
+        if asset is not None and (
+            asset.cache_control == IMMUTABLE_CACHE_CONTROL or now - asset.checked_at < self.reload_interval
+        ):
+            return asset
+        if asset is None and self._missing.get(relative_path) is not MISSING:
+            return None
+
+        path = self._resolve(relative_path)
+        try:
+            stat = os.stat(path) if path else None
+        except OSError:
+            stat = None
+        if stat is None or not os.path.isfile(path):
+            self._assets.pop(relative_path, None)
+            self._missing.set(relative_path, True)
+            return None
+        if stat.st_size > self.max_cached_bytes or relative_path not in self._cacheable:
+            return path
+        if asset is not None and asset.signature == (stat.st_mtime_ns, stat.st_size):
+            asset.checked_at = now
+            return asset
+
+        asset = await asyncio.to_thread(load_asset, path, stat)
+        self._assets[relative_path] = asset
+        return asset
+
+    def stats(self):
+        return {
+            "files": len(self._assets),
+            "bytes": sum(len(body) for asset in self._assets.values() for body in asset.bodies.values()),
+        }
+
+
+frontend = AssetStore(STATIC_DIR, STATIC_RELOAD_INTERVAL_SECONDS, STATIC_MAX_CACHED_FILE_MB * 1024 * 1024)
+
+
+def asset_response(request: Request, asset: Asset):
+    """Serve an asset in the best encoding the client accepts, or 304 when its copy is current."""
+    accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+    encoding = next((encoding for encoding, _ in ENCODINGS if encoding in asset.bodies and encoding in accepted), "identity")
+
+    # Each encoding is a different representation, so it gets its own ETag
+    etag = f'"{asset.etag}"' if encoding == "identity" else f'"{asset.etag}-{encoding}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": asset.last_modified,
+        "Cache-Control": asset.cache_control,
+    }
+    if len(asset.bodies) > 1:
+        headers["Vary"] = "Accept-Encoding"
+    if not_modified(request, etag, asset.mtime):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    body = asset.bodies[encoding]
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        body = b""
+    return Response(content=body, media_type=asset.media_type, headers=headers)
+
+
+async def serve_frontend(request: Request):
+    """Serve a file from the frontend build, or index.html for client-side routes."""
+    relative_path = request.url.path.lstrip("/")
+    asset = await frontend.get(relative_path) if relative_path else None
+    if asset is None:
+        if relative_path.startswith(BUILD_ASSETS_PREFIX):
+            return Response(status_code=404)
+        asset = await frontend.get(INDEX_FILE)
+        if asset is None:
+            return Response(status_code=404)
+    if isinstance(asset, str):
+        return FileResponse(asset, headers={"Cache-Control": REVALIDATE_CACHE_CONTROL})
+    return asset_response(request, asset)
+
+
+def precompress(root: str):
+    """Write .gz (and, with brotli installed, .br) files next to each compressible file under root."""
+    encodings = available_encodings()
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            if name.endswith(tuple(suffix for _, suffix in ENCODINGS)) or not is_compressible(media_type_for(path)):
+                continue
+            with open(path, "rb") as f:
+                content = f.read()
+            if len(content) < COMPRESS_MIN_BYTES:
+                continue
+            for encoding, suffix in encodings:
+                variant = compress(encoding, content, build=True)
+                if len(variant) < len(content):
+                    with open(path + suffix, "wb") as f:
+                        f.write(variant)
+                    print(f"{path}{suffix}: {len(content)} -> {len(variant)} bytes")
+
+
+if __name__ == "__main__":
+    precompress(sys.argv[1] if len(sys.argv) > 1 else STATIC_DIR)
@@ -1,67 +1,148 @@
 from fastapi import Depends, HTTPException, status, Request, Cookie
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import select, event, inspect
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
 
 from ..schemas.schemas import TokenData
 from ..models.models import User
-from ..database.database import get_db
+from ..database.database import get_async_db
+from ..cache.cache import TTLCache, MISSING, on_commit
+from ..realtime.realtime import bus
+from .hashing import hash_password, verify_and_update
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
-
-# Password context for hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
 
 # OAuth2 scheme for token handling
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Bus channel carrying the ids of changed users to every worker
+USER_INVALIDATION_CHANNEL = "users:invalidated"
+
+# Authenticated users keyed by (user id, token issue time)
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL_SECONDS)
+
+# Broadcasts started from commit hooks, kept referenced until they finish
+_pending_broadcasts = set()
+
+
+def invalidate_user(user_id: int):
+    """Drop every cached identity of a user in this worker only; see broadcast_user_change."""
+    user_cache.delete_where(lambda key: key[0] == user_id)
 
-def verify_password(plain_password, hashed_password):
-    """Verify the password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
 
+async def broadcast_user_change(user_id: int):
+    """Drop a user's cached identities in every worker, e.g. after a profile change.
+
+    Call once the change is committed. As for shares, other workers hear of
+    it through the realtime bus. Failures are logged, never raised.
+    """
+    invalidate_user(user_id)
+    try:
+        await bus.publish(USER_INVALIDATION_CHANNEL, str(user_id))
+    except Exception:
+        logger.exception("Broadcasting user invalidation failed")
+
+
+def _broadcast_after_commit(user_id: int):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # A sync session outside the event loop; other workers expire the user within USER_CACHE_TTL_SECONDS
+        invalidate_user(user_id)
+        return
+    task = loop.create_task(broadcast_user_change(user_id))
+    _pending_broadcasts.add(task)
+    task.add_done_callback(_pending_broadcasts.discard)
 
-def get_password_hash(password):
-    """Hash a password."""
-    return pwd_context.hash(password)
 
+@event.listens_for(User, "after_update")
+def _invalidate_deactivated(mapper, connection, target):
+    """Drop a user's cached identity everywhere once a change to their active flag is committed."""
+    if inspect(target).attrs.is_active.history.has_changes():
+        user_id = target.id
+        on_commit(Session.object_session(target), lambda: _broadcast_after_commit(user_id))
 
-def get_user(db: Session, username: str):
+
+async def listen_for_user_changes():
+    """Apply other workers' user invalidations to this worker's cache until cancelled."""
+    while True:
+        async with bus.subscribe(USER_INVALIDATION_CHANNEL) as subscription:
+            while not (subscription.overflowed and subscription.queue.empty()):
+                invalidate_user(int(await subscription.queue.get()))
+        # Invalidations were dropped; forget every user rather than keep a deactivated one
+        user_cache.clear()
+
+
+async def get_password_hash(password):
+    """Hash a password without blocking the event loop."""
+    return await hash_password(password)
+
+
+async def get_user(db: AsyncSession, username: str):
     """Get a user by username."""
-    return db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    """Authenticate a user."""
-    user = get_user(db, username)
+async def get_cached_user(db: AsyncSession, user_id: int, issued_at=None):
+    """Get a user by id for a token, loading the row at most once per cache lifetime.
+
+    The returned instance belongs to db; the cached copy is never modified.
+    """
+    key = (user_id, issued_at)
+    cached = user_cache.get(key)
+    if cached is MISSING:
+        cached = await db.get(User, user_id)
+        if cached is None:
+            return None
+        db.expunge(cached)
+        user_cache.set(key, cached)
+    return await db.merge(cached, load=False)
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    """Authenticate a user, upgrading their password hash if its parameters are outdated."""
+    user = await get_user(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 
 def create_access_token(data: dict):
     """Create an access token."""
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    issued_at = datetime.now(timezone.utc)
+    expire = issued_at + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": int(issued_at.timestamp())})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     """Get the current user from the token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -76,7 +157,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(userid=userid,username=payload.get("username"),email=payload.get("email"))
     except JWTError:
         raise credentials_exception
-    user = get_user(db, username=token_data.username)
+    user = await get_cached_user(db, token_data.userid, payload.get("iat"))
     if user is None:
         raise credentials_exception
     return user
@@ -91,7 +172,7 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
 
 async def get_current_user_from_cookie(
     request: Request, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     access_token: Optional[str] = Cookie(None, alias="access_token")
 ):
     """Get the current user from cookie token for templates."""
@@ -100,10 +181,10 @@ async def get_current_user_from_cookie(
     
     try:
         payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("username")
-        if username is None:
+        userid = payload.get("userid")
+        if userid is None:
             return None
-        user = get_user(db, username=username)
+        user = await get_cached_user(db, int(userid), payload.get("iat"))
         if user is None:
             return None
         return user
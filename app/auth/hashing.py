@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+import asyncio
+import threading
+import time
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# bcrypt releases the GIL, so a thread pool runs hashes in parallel off the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashes allowed to wait for a worker before new logins are turned away
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Password context for hashing; hashes made with other parameters are upgraded on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class HashPool:
+    """Bounded executor for password hashing with queue-time metrics.
+
+    At most `workers` hashes run at once. Once `max_pending` calls are
+    queued or running, further calls fail fast with 503 instead of piling
+    up behind a login storm.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+
+    def _timed(self, submitted: float, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                waited = started - submitted
+                self.completed += 1
+                self.queue_seconds_total += waited
+                self.queue_seconds_max = max(self.queue_seconds_max, waited)
+                self.hash_seconds_total += finished - started
+
+    async def run(self, func, *args):
+        """Run func(*args) on the pool and return its result."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-in attempts in progress, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._timed, time.perf_counter(), func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def stats(self):
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_ms_avg": round(self.queue_seconds_total / completed * 1000, 2),
+                "queue_ms_max": round(self.queue_seconds_max * 1000, 2),
+                "hash_ms_avg": round(self.hash_seconds_total / completed * 1000, 2),
+            }
+
+
+hash_pool = HashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+async def hash_password(password: str):
+    """Hash a password on the hashing pool."""
+    return await hash_pool.run(pwd_context.hash, password)
+
+
+async def verify_and_update(password: str, hashed_password: str):
+    """Verify a password on the hashing pool.
+
+    Returns (verified, new_hash); new_hash is set when the stored hash uses
+    outdated parameters and should be replaced.
+    """
+    return await hash_pool.run(pwd_context.verify_and_update, password, hashed_password)
@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import threading
+import time
+
+# Returned by TTLCache.get when a key is absent or expired
+MISSING = object()
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after a time to live.
+
+    Safe to share between the event loop and threadpool workers of one
+    process. Keeps hit, miss and eviction counters for telemetry.
+
+    With group, a function of the key, keys are also indexed by group so
+    that delete_group removes a group's entries without scanning the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, group=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._group = group
+        self._groups = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, key):
+        """Drop an entry and its group index; the lock must be held."""
+        self._entries.pop(key, None)
+        if self._group is not None:
+            group = self._group(key)
+            keys = self._groups.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[group]
+
+    def get(self, key):
+        """Return the cached value for key, or MISSING."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        """Cache value under key, evicting the least recently used entries when full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            if self._group is not None:
+                self._groups.setdefault(self._group(key), set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def delete_where(self, predicate):
+        """Remove every entry whose key satisfies predicate."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+
+    def delete_group(self, group):
+        """Remove every entry in a group; needs the group function."""
+        with self._lock:
+            for key in list(self._groups.get(group, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def on_commit(session: Session, callback):
+    """Run callback once session commits, or forget it if the session rolls back.
+
+    Used to invalidate cached rows only after their change is durable.
+    """
+    session.info.setdefault("after_commit_callbacks", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_commit_callbacks(session):
+    for callback in session.info.pop("after_commit_callbacks", ()):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_commit_callbacks(session):
+    session.info.pop("after_commit_callbacks", None)
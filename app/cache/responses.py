@@ -0,0 +1,228 @@
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, Optional
+import itertools
+import logging
+import os
+from dotenv import load_dotenv
+import redis.asyncio
+from redis.exceptions import WatchError
+
+from .cache import TTLCache, MISSING
+from ..models.models import Feed, UserShare
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# redis:// URL of a shared cache; serialized responses are kept in-process when unset
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+# Separates the cached X-Next-Cursor value from the body; cursors are base64
+CURSOR_SEPARATOR = b"\n"
+
+
+class MemoryBackend:
+    """In-process LRU of serialized responses, keyed by (user id, key) and indexed by user.
+
+    Each user has a generation, replaced on eviction. A response is only
+    stored if the user's generation is the one read when it was looked up,
+    so a response computed before an eviction is never cached after it.
+    A generation that has expired from its cache never matches.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, group=lambda key: key[0])
+        self._generations = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counter = itertools.count(1)
+
+    def _generation(self, user_id: int):
+        generation = self._generations.get(user_id)
+        if generation is MISSING:
+            generation = next(self._counter)
+            self._generations.set(user_id, generation)
+        return generation
+
+    async def get(self, user_id: int, key: str):
+        """The cached value, or None, and the user's current generation."""
+        value = self._cache.get((user_id, key))
+        return None if value is MISSING else value, self._generation(user_id)
+
+    async def set(self, user_id: int, key: str, value: bytes, generation):
+        """Cache value unless the user was evicted since generation was read; True if stored."""
+        if self._generations.get(user_id) != generation:
+            return False
+        self._cache.set((user_id, key), value)
+        return True
+
+    async def evict(self, user_ids: set):
+        for user_id in user_ids:
+            self._generations.set(user_id, next(self._counter))
+            self._cache.delete_group(user_id)
+
+    def stats(self):
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class RedisBackend:
+    """Serialized responses in Redis, one hash per user so a user is evicted with one DEL.
+
+    Each user also has a generation counter, incremented on eviction and
+    watched while storing, as in MemoryBackend. Works with any
+    redis.asyncio-compatible client, including fakes.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "responses:"):
+        self.client = client
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    def _name(self, user_id: int):
+        return f"{self.prefix}{user_id}"
+
+    def _generation_name(self, user_id: int):
+        return f"{self.prefix}{user_id}:generation"
+
+    async def get(self, user_id: int, key: str):
+        """The cached value, or None, and the user's current generation."""
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hget(self._name(user_id), key)
+            pipe.get(self._generation_name(user_id))
+            value, generation = await pipe.execute()
+        # Users never evicted have no counter yet
+        return value, generation or b"0"
+
+    async def set(self, user_id: int, key: str, value: bytes, generation):
+        """Cache value unless the user was evicted since generation was read; True if stored."""
+        name = self._name(user_id)
+        generation_name = self._generation_name(user_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            await pipe.watch(generation_name)
+            if (await pipe.get(generation_name) or b"0") != generation:
+                return False
+            pipe.multi()
+            pipe.hset(name, key, value)
+            pipe.expire(name, self.ttl)
+            try:
+                await pipe.execute()
+            except WatchError:
+                # An eviction landed between the check and the write
+                return False
+        return True
+
+    async def evict(self, user_ids: set):
+        async with self.client.pipeline(transaction=True) as pipe:
+            for user_id in user_ids:
+                pipe.delete(self._name(user_id))
+                pipe.incr(self._generation_name(user_id))
+                # Outlives any request that read the old generation
+                pipe.expire(self._generation_name(user_id), self.ttl)
+            await pipe.execute()
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+def backend_from_url(url: Optional[str]):
+    """Cache backend for RESPONSE_CACHE_URL: Redis when set, else in-memory."""
+    if not url:
+        return MemoryBackend(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
+    return RedisBackend(redis.asyncio.from_url(url), RESPONSE_CACHE_TTL_SECONDS)
+
+
+class ResponseCache:
+    """Per-user cache of serialized JSON responses.
+
+    Entries are only ever removed by explicit eviction of the users a write
+    affects (see evict_feed_audience) or by expiry. get returns the user's
+    cache generation along with any hit; store only caches the response if
+    no eviction has happened since, so a page read before a write commits
+    is not cached after that write's eviction. Backend failures are logged
+    and treated as misses so the cache never fails a request.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._adapters = {}
+
+    def _adapter(self, response_type):
+        if response_type not in self._adapters:
+            self._adapters[response_type] = TypeAdapter(response_type)
+        return self._adapters[response_type]
+
+    async def get(self, user_id: int, key: str, cursor_header: str):
+        """Cached response for the user and key, or None, and the generation to store with.
+
+        Call before reading the data a response is built from.
+        """
+        try:
+            value, generation = await self.backend.get(user_id, key)
+        except Exception:
+            logger.exception("Response cache read failed")
+            return None, None
+        if value is None:
+            return None, generation
+        next_cursor, _, body = value.partition(CURSOR_SEPARATOR)
+        response = Response(content=body, media_type="application/json")
+        if next_cursor:
+            response.headers[cursor_header] = next_cursor.decode()
+        return response, generation
+
+    async def store(
+        self, user_id: int, key: str, generation, response_type, content, cursor_header: str, next_cursor=None
+    ):
+        """Serialize content as response_type and return the response.
+
+        It is cached only if the user has not been evicted since get
+        returned generation.
+        """
+        adapter = self._adapter(response_type)
+        body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+        try:
+            if generation is not None:
+                await self.backend.set(
+                    user_id, key, (next_cursor or "").encode() + CURSOR_SEPARATOR + body, generation
+                )
+        except Exception:
+            logger.exception("Response cache write failed")
+        response = Response(content=body, media_type="application/json")
+        if next_cursor:
+            response.headers[cursor_header] = next_cursor
+        return response
+
+    async def evict(self, user_ids: Iterable[int]):
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return
+        try:
+            await self.backend.evict(user_ids)
+        except Exception:
+            logger.exception("Response cache eviction failed")
+
+    def stats(self):
+        return self.backend.stats()
+
+
+response_cache = ResponseCache(backend_from_url(RESPONSE_CACHE_URL))
+
+
+async def feed_audience(db: AsyncSession, feed_ids: Iterable[int]):
+    """Users whose feed listings include any of the feeds: owners and active share recipients."""
+    feed_ids = list(feed_ids)
+    result = await db.execute(union(
+        select(Feed.host_id).where(Feed.id.in_(feed_ids)),
+        select(UserShare.shared_with_id).where(
+            UserShare.feed_id.in_(feed_ids),
+            UserShare.is_active == True
+        ),
+    ))
+    return set(result.scalars().all())
+
+
+async def evict_feed_audience(db: AsyncSession, *feed_ids: int, users: Iterable[int] = ()):
+    """Evict cached listings of everyone who can see the feeds, plus any extra users."""
+    await response_cache.evict((await feed_audience(db, feed_ids)) | set(users))
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import formatdate
+from fastapi import Depends, HTTPException, Request, Response
+from typing import Optional
+import hashlib
+
+from ..auth.auth import get_current_user
+from ..models.models import User
+from ..storage.downloads import not_modified
+
+# Clients may keep responses but must revalidate them before use
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+# Bump to invalidate every issued ETag, e.g. when a response schema changes
+VALIDATOR_VERSION = "1"
+
+
+@dataclass(frozen=True)
+class Version:
+    """Cheap stand-in for the current state of a response.
+
+    key changes whenever the response body would; last_modified is the
+    naive UTC time of the newest change, if known.
+    """
+    key: tuple
+    last_modified: Optional[datetime] = None
+
+
+class NotModified(HTTPException):
+    """Ends a request with 304 before the endpoint runs."""
+
+    def __init__(self, headers: dict):
+        super().__init__(status_code=304, headers=headers)
+
+
+def validator_headers(request: Request, version: Version, user_id: int = None):
+    """ETag, Last-Modified and Cache-Control headers for a version of the requested resource."""
+    parts = [VALIDATOR_VERSION, request.url.path, str(request.url.query), str(user_id), repr(version.key)]
+    headers = {
+        "ETag": f'"{hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]}"',
+        "Cache-Control": CONDITIONAL_CACHE_CONTROL,
+    }
+    if version.last_modified:
+        headers["Last-Modified"] = formatdate(
+            version.last_modified.replace(tzinfo=timezone.utc).timestamp(), usegmt=True
+        )
+    if user_id is not None:
+        headers["Vary"] = "Authorization, Cookie"
+    return headers
+
+
+def _check(request: Request, response: Response, version: Optional[Version], user_id: int = None):
+    # Missing resources are left to the endpoint to report
+    if version is None:
+        return
+    headers = validator_headers(request, version, user_id)
+    last_modified = version.last_modified.replace(tzinfo=timezone.utc).timestamp() if version.last_modified else 0
+    if not_modified(request, headers["ETag"], last_modified):
+        raise NotModified(headers)
+    response.headers.update(headers)
+
+
+def conditional(version_dependency, per_user: bool = False):
+    """Dependency that answers conditional GETs from a version key before the endpoint runs.
+
+    version_dependency is a FastAPI dependency returning a Version, or None
+    when the resource does not exist. Requests whose If-None-Match (or
+    If-Modified-Since) still matches get a 304; other responses carry the
+    validators. With per_user the validators also depend on the
+    authenticated user, for responses that vary with current_user.
+    """
+    if per_user:
+        async def check_for_user(
+            request: Request,
+            response: Response,
+            version: Optional[Version] = Depends(version_dependency),
+            current_user: User = Depends(get_current_user),
+        ):
+            _check(request, response, version, current_user.id)
+
+        return check_for_user
+
+    async def check(request: Request, response: Response, version: Optional[Version] = Depends(version_dependency)):
+        _check(request, response, version)
+
+    return check
@@ -1,19 +1,149 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import logging
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Connection pool sizing, per engine and per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Per-statement timeout on PostgreSQL; 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# Applied to every SQLite connection; WAL lets readers run alongside a writer
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": "5000",
+}
+
+# Minimum time between pool exhaustion warnings
+POOL_WARNING_INTERVAL_SECONDS = 60
+
+# Async drivers used for each backend by the async engine
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def to_async_url(url: str):
+    """Rewrite a database URL to use the async driver for its backend."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def connect_args(url):
+    """Driver arguments applying the statement timeout as a session default at connect time.
+
+    A SET run on a pooled connection would belong to its implicit
+    transaction and be undone by the rollback on check-in.
+    """
+    url = make_url(url)
+    if url.get_backend_name() != "postgresql" or not DB_STATEMENT_TIMEOUT_MS:
+        return {}
+    timeout = str(int(DB_STATEMENT_TIMEOUT_MS))
+    if url.get_driver_name() == "asyncpg":
+        return {"server_settings": {"statement_timeout": timeout}}
+    return {"options": f"-c statement_timeout={timeout}"}
+
+
+def engine_options(url):
+    """Pool and connection options for a database URL; SQLite keeps SQLAlchemy's default pools."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args(url),
+    }
+
+
+def configure_engine(engine):
+    """Install SQLite pragmas and pool exhaustion warnings on a (sync) engine.
+
+    PostgreSQL settings are passed when connecting instead; see connect_args.
+    """
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def configure_connection(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    last_warning = [0.0]
+
+    @event.listens_for(engine, "checkout")
+    def warn_on_exhaustion(dbapi_connection, connection_record, connection_proxy):
+        stats = pool_stats(engine.pool)
+        capacity = stats.get("capacity")
+        now = time.monotonic()
+        if capacity and stats["checked_out"] >= capacity and now - last_warning[0] > POOL_WARNING_INTERVAL_SECONDS:
+            last_warning[0] = now
+            logger.warning(
+                "Database pool exhausted (%s connections checked out); further requests wait up to %ss",
+                stats["checked_out"], DB_POOL_TIMEOUT_SECONDS,
+            )
+
+    return engine
+
+
+def pool_stats(pool):
+    """Checked-out, idle and overflow counts for pools that track them."""
+    if not hasattr(pool, "checkedout"):
+        return {"pool": type(pool).__name__}
+    stats = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+    }
+    if hasattr(pool, "overflow"):
+        stats["overflow"] = max(pool.overflow(), 0)
+        # A negative max_overflow means the pool never blocks
+        if pool._max_overflow >= 0:
+            stats["capacity"] = pool.size() + pool._max_overflow
+    return stats
+
+
+engine = configure_engine(create_engine(DATABASE_URL, **engine_options(DATABASE_URL)))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+configure_engine(async_engine.sync_engine)
+
+# Objects stay usable after commit; relationships must be loaded explicitly
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
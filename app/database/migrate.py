@@ -0,0 +1,45 @@
+"""Bring the database schema up to date.
+
+Run once per deploy, before starting the API workers:
+
+    python -m app.database.migrate
+"""
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+import logging
+import os
+
+from .database import engine
+from ..search.search import init_search_index
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+# The original create_all schema; tables added later without a migration are
+# created by the next revision if they are missing
+BASELINE_REVISION = "0001"
+
+
+def alembic_config():
+    """Alembic configuration for this app; no alembic.ini is needed at deploy time."""
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    return config
+
+
+def migrate():
+    """Upgrade the database to the latest revision and build the search index."""
+    config = alembic_config()
+    tables = set(inspect(engine).get_table_names())
+    if "users" in tables and "alembic_version" not in tables:
+        logger.info("Existing database without migration history; stamping baseline %s", BASELINE_REVISION)
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+    init_search_index(engine)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
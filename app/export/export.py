@@ -0,0 +1,71 @@
+from datetime import datetime
+from fastapi.responses import StreamingResponse
+import csv
+import io
+import json
+import os
+from dotenv import load_dotenv
+
+from ..database.database import AsyncSessionLocal
+
+load_dotenv()
+
+# Rows fetched from the database cursor, and written to the client, at a time
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _ndjson(columns, rows):
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default, separators=(",", ":")) + "\n"
+        for row in rows
+    )
+
+
+def _csv(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows
+    )
+    return buffer.getvalue()
+
+
+async def export_rows(stmt, format: str):
+    """Encode the rows of a column select batch by batch, reading them through a server-side cursor.
+
+    Runs in its own session, so the stream does not depend on the request's
+    session, and holds at most one batch of rows at a time.
+    """
+    columns = [column["name"] for column in stmt.column_descriptions]
+    if format == "csv":
+        header = io.StringIO()
+        csv.writer(header).writerow(columns)
+        yield header.getvalue()
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield _csv(rows) if format == "csv" else _ndjson(columns, rows)
+
+
+def export_response(stmt, name: str, format: str):
+    """Stream a column select as an NDJSON or CSV download.
+
+    The select must be ordered by id ascending, so a client whose download
+    was interrupted can resume with the id of the last complete row.
+    """
+    return StreamingResponse(
+        export_rows(stmt, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
@@ -0,0 +1,220 @@
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+import asyncio
+import logging
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+from ..database.database import AsyncSessionLocal
+from ..models.models import Job, Feed, utcnow
+from ..search.search import store_pages
+from . import tasks
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for CPU-bound jobs; defaults to one per core
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0")) or os.cpu_count() or 1
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+# How long a claimed job may run before another runner may take it over
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+# Fallback polling interval; enqueues in this process wake the runner immediately
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+
+# Job kind -> (function run in a worker process, async handler for its result)
+REGISTRY = {}
+
+
+class UnknownJobKind(Exception):
+    """No function is registered for a job's kind."""
+
+
+# Errors that fail a job immediately instead of retrying; a missing file never reappears
+PERMANENT_ERRORS = (tasks.InvalidDocument, UnknownJobKind, FileNotFoundError)
+
+
+def register(kind: str, func, on_success=None):
+    """Register a job kind.
+
+    func runs in a worker process with the job payload. on_success, if
+    given, is awaited as on_success(db, job, result) in the same
+    transaction that marks the job as succeeded.
+    """
+    REGISTRY[kind] = (func, on_success)
+
+
+def retry_delay(attempts: int):
+    """Exponential backoff before the next attempt."""
+    return timedelta(seconds=JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+async def enqueue(db: AsyncSession, kind: str, payload: dict, user_id: int = None, max_attempts: int = None):
+    """Persist a new job and wake the runner. Commits the session."""
+    if kind not in REGISTRY:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    job = Job(
+        kind=kind,
+        payload=payload,
+        user_id=user_id,
+        max_attempts=max_attempts or JOB_MAX_ATTEMPTS,
+    )
+    db.add(job)
+    await db.commit()
+    runner.notify()
+    return job
+
+
+class JobRunner:
+    """Runs queued jobs from the jobs table on a process pool.
+
+    Jobs are claimed with a conditional UPDATE, so several application
+    workers can share one table without an external broker.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, max_workers: int = JOB_WORKERS):
+        self._session_factory = session_factory
+        self._max_workers = max_workers
+        self._pool = None
+        self._loop_task = None
+        self._running = set()
+        self._wakeup = asyncio.Event()
+
+    async def start(self):
+        if self._loop_task is not None:
+            return
+        self._pool = self._new_pool()
+        self._wakeup = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._run())
+
+    def _new_pool(self):
+        # Spawned workers do not inherit the event loop or open connections
+        return ProcessPoolExecutor(max_workers=self._max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def stop(self):
+        if self._loop_task is None:
+            return
+        self._loop_task.cancel()
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(self._loop_task, *self._running, return_exceptions=True)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._loop_task = None
+        self._pool = None
+
+    def notify(self):
+        """Wake the runner to look for new work."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await self._fill()
+            except Exception:
+                logger.exception("Failed to claim jobs")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _fill(self):
+        while len(self._running) < self._max_workers:
+            job = await self._claim_next()
+            if job is None:
+                return
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        self._running.discard(task)
+        self.notify()
+
+    async def _claim_next(self):
+        """Atomically take the oldest due job, or one whose lease has expired."""
+        now = utcnow()
+        claimable = or_(
+            and_(Job.status == "queued", Job.run_after <= now),
+            and_(Job.status == "running", Job.lease_expires_at < now),
+        )
+        async with self._session_factory() as db:
+            candidates = (await db.execute(
+                select(Job.id).where(claimable).order_by(Job.run_after, Job.id).limit(self._max_workers)
+            )).scalars().all()
+            for job_id in candidates:
+                claimed = await db.execute(
+                    update(Job).where(Job.id == job_id, claimable).values(
+                        status="running",
+                        attempts=Job.attempts + 1,
+                        lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    )
+                )
+                await db.commit()
+                if claimed.rowcount == 1:
+                    return await db.get(Job, job_id)
+        return None
+
+    async def _execute(self, job: Job):
+        func, on_success = REGISTRY.get(job.kind, (None, None))
+        try:
+            if func is None:
+                raise UnknownJobKind(job.kind)
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._pool, func, job.payload)
+        except asyncio.CancelledError:
+            raise
+        except BrokenProcessPool as exc:
+            # A worker died mid-job; replace the pool and retry the job later
+            self._pool = self._new_pool()
+            await self._record_failure(job, exc)
+            return
+        except Exception as exc:
+            await self._record_failure(job, exc)
+            return
+
+        async with self._session_factory() as db:
+            db_job = await db.get(Job, job.id)
+            try:
+                if on_success is not None:
+                    await on_success(db, db_job, result)
+                db_job.status = "succeeded"
+                db_job.result = result
+                db_job.error = None
+                db_job.lease_expires_at = None
+                await db.commit()
+            except Exception as exc:
+                await db.rollback()
+                await self._record_failure(job, exc)
+
+    async def _record_failure(self, job: Job, exc: Exception):
+        permanent = isinstance(exc, PERMANENT_ERRORS)
+        async with self._session_factory() as db:
+            db_job = await db.get(Job, job.id)
+            db_job.error = f"{type(exc).__name__}: {exc}"
+            db_job.lease_expires_at = None
+            if permanent or db_job.attempts >= db_job.max_attempts:
+                db_job.status = "failed"
+                logger.warning("Job %s (%s) failed: %s", job.id, job.kind, db_job.error)
+            else:
+                db_job.status = "queued"
+                db_job.run_after = utcnow() + retry_delay(db_job.attempts)
+            await db.commit()
+
+
+async def store_extracted_pages(db: AsyncSession, job: Job, result: dict):
+    """Index the page text extracted by process_pdf, keeping only the summary on the job."""
+    pages = result.pop("pages", [])
+    feed_id = job.payload["feed_id"]
+    if await db.get(Feed, feed_id) is not None:
+        await store_pages(db, feed_id, pages)
+
+
+register("process_pdf", tasks.process_pdf, on_success=store_extracted_pages)
+
+runner = JobRunner()
@@ -0,0 +1,35 @@
+"""CPU-bound job functions.
+
+These run in the job runner's worker processes, so they take and return
+plain JSON-serializable values and must not touch the database.
+"""
+from pypdf import PdfReader
+from pypdf.errors import PyPdfError
+
+
+class InvalidDocument(Exception):
+    """The stored file could not be parsed as a PDF. Retrying will not help."""
+
+
+def process_pdf(payload: dict):
+    """Validate an uploaded PDF, count its pages and extract the text of each page.
+
+    A missing file raises FileNotFoundError, e.g. once the feed was deleted
+    and its blob collected.
+    """
+    path = payload["path"]
+    try:
+        reader = PdfReader(path)
+        page_count = len(reader.pages)
+    except (PyPdfError, ValueError, KeyError, TypeError) as exc:
+        # Only pypdf runs here, and it reports some malformed structures as plain lookup and value errors
+        raise InvalidDocument(f"{type(exc).__name__}: {exc}") from exc
+
+    pages = []
+    for page in reader.pages:
+        try:
+            pages.append(page.extract_text() or "")
+        except Exception:
+            # One unreadable page should not hide the text of the others
+            pages.append("")
+    return {"valid": True, "page_count": page_count, "pages": pages}
@@ -1,14 +1,26 @@
 from fastapi import FastAPI, APIRouter, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from .database.database import engine
-from .models.models import Base
-from .routers import auth, feeds, comments, topics, users, shares
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import text
+from .database.database import engine, async_engine, pool_stats
+from .routers import auth, feeds, comments, topics, users, shares, jobs, exports
+from .jobs.jobs import runner as job_runner
+from .pagination.pagination import NEXT_CURSOR_HEADER, SINCE_CURSOR_HEADER
+from .routers.feeds import JOB_ID_HEADER
+from .auth.auth import user_cache, listen_for_user_changes
+from .auth.hashing import hash_pool
+from .sharing.sharing import share_cache, listen_for_share_changes
+from .cache.responses import response_cache
+from .realtime.realtime import bus as realtime_bus
+from .assets.assets import frontend, serve_frontend
+from .metrics.metrics import MetricsMiddleware, instrument_engine, render_metrics, mark_process_dead
+import asyncio
 import os
+import time
 
-# Create the database tables
-Base.metadata.create_all(bind=engine)
+# Attribute database time to requests in the metrics
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
 
 # Create FastAPI app
 app = FastAPI(
@@ -25,6 +37,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, SINCE_CURSOR_HEADER, JOB_ID_HEADER, "Accept-Ranges", "Content-Range", "Content-Length", "ETag", "Server-Timing", "X-Query-Count"],
 )
 
 # Create API router with prefix
@@ -37,18 +50,94 @@ api_router.include_router(comments.router)
 api_router.include_router(topics.router)
 api_router.include_router(users.router)
 api_router.include_router(shares.router)
+api_router.include_router(jobs.router)
+api_router.include_router(exports.router)
+
+@app.on_event("startup")
+async def start_job_runner():
+    """Start processing background jobs in this worker."""
+    await job_runner.start()
+
+
+@app.on_event("startup")
+async def start_cache_invalidation():
+    """Drop shares revoked and users changed in other workers from this worker's caches."""
+    app.state.invalidation_listeners = [
+        asyncio.create_task(listen_for_share_changes()),
+        asyncio.create_task(listen_for_user_changes()),
+    ]
+
+
+@app.on_event("startup")
+def load_frontend():
+    """Read and compress the frontend build before serving it."""
+    frontend.preload()
+
+
+@app.on_event("shutdown")
+async def stop_job_runner():
+    await job_runner.stop()
+
+
+@app.on_event("shutdown")
+async def stop_realtime():
+    for listener in app.state.invalidation_listeners:
+        listener.cancel()
+    await asyncio.gather(*app.state.invalidation_listeners, return_exceptions=True)
+    await realtime_bus.close()
+
+
+@app.on_event("shutdown")
+def stop_metrics():
+    mark_process_dead()
+
 
 @api_router.get("/health")
+@api_router.get("/health/live")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+    """Liveness probe: the process is up and serving requests."""
+    return {
+        "status": "healthy",
+        "user_cache": user_cache.stats(),
+        "share_cache": share_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "password_hashing": hash_pool.stats(),
+        "realtime": realtime_bus.stats(),
+        "static": frontend.stats(),
+    }
+
+
+@api_router.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: the database answers, with round-trip latency and pool usage."""
+    started = time.perf_counter()
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as exc:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "database": {"error": type(exc).__name__}},
+        )
+    return {
+        "status": "ready",
+        "database": {
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "async_pool": pool_stats(async_engine.pool),
+            "sync_pool": pool_stats(engine.pool),
+        },
+    }
+
+
+@api_router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics for all workers."""
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
 
 # Include API router
 app.include_router(api_router)
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static/static"), name="static")
-
 # Custom middleware to handle routing
 @app.middleware("http")
 async def custom_middleware(request: Request, call_next):
@@ -58,13 +147,11 @@ async def custom_middleware(request: Request, call_next):
         response = await call_next(request)
         return response
     
-    # For all other paths, serve the frontend
-    if path == "/" or not path.startswith("/static/"):
-        return FileResponse("static/index.html")
-    
-    # Let other requests pass through (like static files)
-    response = await call_next(request)
-    return response
+    # For all other paths, serve the frontend build from memory, with index.html for client-side routes
+    return await serve_frontend(request)
+
+# Outermost, so every request is measured, including frontend routes
+app.add_middleware(MetricsMiddleware)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,208 @@
+from collections import Counter as Tally, defaultdict
+from contextvars import ContextVar
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from starlette.routing import Match
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# With several workers each process writes its samples here and /api/metrics merges them
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Adds X-Query-Count and Server-Timing headers to every response
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "false").lower() in ("1", "true", "yes")
+# Statements slower than this are logged with their parameters
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# The same statement run this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+# Longest parameter listing included in the slow-query log
+MAX_LOGGED_PARAMETERS = 500
+
+# Label for requests that matched no route, to keep label cardinality bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+DB_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request", ["method", "route"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests being handled", ["method"], multiprocess_mode="livesum"
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Size of HTTP response bodies", ["method", "route"], buckets=SIZE_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in database statements per HTTP request", ["method", "route"],
+    buckets=DB_BUCKETS,
+)
+UPLOAD_BYTES = Counter("pdf_upload_bytes_total", "Bytes of PDF uploads accepted")
+DOWNLOAD_BYTES = Counter("pdf_download_bytes_total", "Bytes of PDF content served by download endpoints")
+
+
+class RequestStats:
+    """Database time and statements accumulated for the current request."""
+    __slots__ = ("db_seconds", "db_statements", "statements")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_statements = 0
+        # Executions per statement text; parameters are bound, so equal text means equal shape
+        self.statements = Tally()
+
+    def repeated_statements(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        """Statements run at least threshold times, most frequent first."""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+current_request_stats: ContextVar = ContextVar("current_request_stats", default=None)
+
+
+def instrument_engine(engine):
+    """Attribute statement time on a (sync) engine to the request that issued it."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.db_seconds += elapsed
+            stats.db_statements += 1
+            stats.statements[statement] += 1
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning(
+                "Slow query (%.1f ms): %s; parameters: %.*s",
+                elapsed * 1000, statement, MAX_LOGGED_PARAMETERS, repr(parameters),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def drop_timer(exception_context):
+        if exception_context.connection is not None:
+            started = exception_context.connection.info.get("statement_started")
+            if started:
+                started.pop()
+
+    return engine
+
+
+def debug_headers(stats: RequestStats, started: float):
+    """X-Query-Count and Server-Timing headers describing the request so far."""
+    server_timing = (
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_statements} queries", '
+        f"app;dur={(time.perf_counter() - started) * 1000:.1f}"
+    )
+    return [
+        (b"x-query-count", str(stats.db_statements).encode()),
+        (b"server-timing", server_timing.encode()),
+    ]
+
+
+def _route_index(routes):
+    index = defaultdict(list)
+    for route in routes:
+        index[getattr(route, "endpoint", None) or getattr(route, "app", None)].append(route)
+    return index
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording Prometheus metrics for every HTTP request.
+
+    Routes are labelled by their path template, e.g. /api/feeds/{feed_id}.
+    """
+
+    def __init__(self, app, download_suffix: str = "/download"):
+        self.app = app
+        self.download_suffix = download_suffix
+        self._routes = None
+        self._router = None
+
+    def _route_template(self, scope):
+        endpoint = scope.get("endpoint")
+        router = scope.get("router")
+        if endpoint is None or router is None:
+            return UNMATCHED_ROUTE
+        if self._router is not router:
+            self._routes, self._router = _route_index(router.routes), router
+        candidates = self._routes.get(endpoint, ())
+        if len(candidates) == 1:
+            return candidates[0].path
+        for route in candidates:
+            if route.matches(scope)[0] == Match.FULL:
+                return route.path
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = [500]
+        sent = [0]
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if QUERY_DEBUG:
+                    message["headers"] = list(message.get("headers", [])) + debug_headers(stats, started)
+            elif message["type"] == "http.response.body":
+                sent[0] += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            current_request_stats.reset(token)
+            route = self._route_template(scope)
+            REQUESTS.labels(method, route, str(status[0])).inc()
+            REQUEST_DURATION.labels(method, route).observe(elapsed)
+            RESPONSE_SIZE.labels(method, route).observe(sent[0])
+            REQUEST_DB_TIME.labels(method, route).observe(stats.db_seconds)
+            if route.endswith(self.download_suffix) and status[0] in (200, 206):
+                DOWNLOAD_BYTES.inc(sent[0])
+            for statement, count in stats.repeated_statements():
+                logger.warning("Possible N+1 on %s %s: %d executions of %s", method, route, count, statement)
+
+
+def render_metrics():
+    """Exposition of all metrics, merged across worker processes when multiprocess mode is on."""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the merged view when it exits."""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,55 @@
+"""Helpers for asserting database query budgets in tests.
+
+    from app.metrics.testing import query_budget
+
+    def test_feed_detail_queries(client, feed):
+        with query_budget(4):
+            client.get(f"/api/feeds/{feed.id}")
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+
+from ..database.database import engine, async_engine
+
+
+class QueryLog:
+    """Statements executed while a query budget is active."""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __str__(self):
+        return "\n".join(f"{number}. {statement}" for number, statement in enumerate(self.statements, 1))
+
+
+@contextmanager
+def capture_queries(engines=None):
+    """Record every statement run on the engines inside the block, from any thread."""
+    engines = engines or [engine, async_engine.sync_engine]
+    log = QueryLog()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        log.statements.append(statement)
+
+    for target in engines:
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        yield log
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", record)
+
+
+@contextmanager
+def query_budget(max_queries: int, engines=None):
+    """Fail with the executed statements if the block runs more than max_queries of them."""
+    with capture_queries(engines) as log:
+        yield log
+    if log.count > max_queries:
+        raise AssertionError(
+            f"Query budget exceeded: {log.count} statements executed, budget is {max_queries}\n{log}"
+        )
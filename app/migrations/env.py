@@ -0,0 +1,50 @@
+from alembic import context
+
+from app.database.database import engine
+from app.models.models import Base
+from app.search.search import SQLITE_FTS_TABLE, SQLITE_PAGE_FTS_TABLE
+
+target_metadata = Base.metadata
+
+# Built by init_search_index outside the migrations, per backend
+SEARCH_OBJECTS = {"search_vector", "ix_feeds_search_vector", "ix_feed_pages_search_vector"}
+SEARCH_TABLE_PREFIXES = (SQLITE_FTS_TABLE, SQLITE_PAGE_FTS_TABLE)
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Keep autogenerate from dropping the search index structures."""
+    if name in SEARCH_OBJECTS:
+        return False
+    return not (type_ == "table" and name.startswith(SEARCH_TABLE_PREFIXES))
+
+
+def run_migrations_offline():
+    """Emit the migration SQL without connecting to the database."""
+    context.configure(
+        url=engine.url,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite can only alter tables by copying them
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,85 @@
+"""Blob store, background jobs and extracted page text, added before migrations were introduced
+
+Databases created with create_all during that time already have some of
+these tables, so only the missing ones are created.
+
+Revision ID: 0002
+Revises: 0001
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def existing_tables():
+    """Tables already in the database; none when only emitting SQL."""
+    if context.is_offline_mode():
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    tables = existing_tables()
+
+    if 'blobs' not in tables:
+        op.create_table('blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('sha256')
+        )
+    op.create_index('ix_feeds_file_path', 'feeds', ['file_path'], unique=False, if_not_exists=True)
+
+    if 'jobs' not in tables:
+        op.create_table('jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_after', sa.DateTime(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_jobs_id', 'jobs', ['id'], unique=False)
+        op.create_index('ix_jobs_kind', 'jobs', ['kind'], unique=False)
+        op.create_index('ix_jobs_run_after', 'jobs', ['run_after'], unique=False)
+        op.create_index('ix_jobs_status', 'jobs', ['status'], unique=False)
+
+    if 'feed_pages' not in tables:
+        op.create_table('feed_pages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('feed_id', sa.Integer(), nullable=False),
+        sa.Column('page_number', sa.Integer(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['feed_id'], ['feeds.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_feed_pages_feed_id_page_number', 'feed_pages', ['feed_id', 'page_number'], unique=True)
+        op.create_index('ix_feed_pages_id', 'feed_pages', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_feed_pages_id', table_name='feed_pages')
+    op.drop_index('ix_feed_pages_feed_id_page_number', table_name='feed_pages')
+    op.drop_table('feed_pages')
+    op.drop_index('ix_jobs_status', table_name='jobs')
+    op.drop_index('ix_jobs_run_after', table_name='jobs')
+    op.drop_index('ix_jobs_kind', table_name='jobs')
+    op.drop_index('ix_jobs_id', table_name='jobs')
+    op.drop_table('jobs')
+    op.drop_index('ix_feeds_file_path', table_name='feeds')
+    op.drop_table('blobs')
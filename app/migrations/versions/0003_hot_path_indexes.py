@@ -0,0 +1,38 @@
+"""Composite and partial indexes for listing, comment and share lookups
+
+Revision ID: 0003
+Revises: 0002
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# Matches how `UserShare.is_active == True` is rendered, so the planner can use the partial indexes
+ACTIVE_SHARES = dict(
+    postgresql_where=sa.text('is_active = true'),
+    sqlite_where=sa.text('is_active = 1'),
+)
+
+
+def upgrade():
+    # Databases created before migrations may already have the comment stream index
+    op.create_index('ix_comments_feed_id_created_at_id', 'comments', ['feed_id', 'created_at', 'id'], unique=False, if_not_exists=True)
+    op.create_index('ix_comments_user_id_created_at_id', 'comments', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_feeds_host_id_updated_at_id', 'feeds', ['host_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_file_shares_feed_id', 'file_shares', ['feed_id'], unique=False)
+    op.create_index('ix_user_shares_recipient_active', 'user_shares', ['shared_with_id', 'feed_id'], unique=False, **ACTIVE_SHARES)
+    op.create_index('ix_user_shares_feed_active', 'user_shares', ['feed_id', 'shared_with_id'], unique=False, **ACTIVE_SHARES)
+
+
+def downgrade():
+    op.drop_index('ix_user_shares_feed_active', table_name='user_shares')
+    op.drop_index('ix_user_shares_recipient_active', table_name='user_shares')
+    op.drop_index('ix_file_shares_feed_id', table_name='file_shares')
+    op.drop_index('ix_feeds_host_id_updated_at_id', table_name='feeds')
+    op.drop_index('ix_comments_user_id_created_at_id', table_name='comments')
+    op.drop_index('ix_comments_feed_id_created_at_id', table_name='comments')
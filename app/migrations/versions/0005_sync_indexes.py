@@ -0,0 +1,25 @@
+"""Indexes on the update times that delta sync filters by
+
+Revision ID: 0005
+Revises: 0004
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_comments_updated_at', 'comments', ['updated_at'], unique=False)
+    op.create_index('ix_feeds_updated_at', 'feeds', ['updated_at'], unique=False)
+    op.create_index('ix_users_updated_at', 'users', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_users_updated_at', table_name='users')
+    op.drop_index('ix_feeds_updated_at', table_name='feeds')
+    op.drop_index('ix_comments_updated_at', table_name='comments')
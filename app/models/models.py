@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Text, ForeignKey, DateTime, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 import datetime
@@ -7,6 +7,15 @@ import uuid
 Base = declarative_base()
 
 
+def utcnow():
+    """Current UTC time, evaluated per row rather than once at import.
+
+    Returned naive because the DateTime columns are stored without a time
+    zone, which asyncpg enforces.
+    """
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -15,8 +24,8 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc))
-    updated_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc), onupdate=datetime.datetime.now(datetime.timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
 
     # Relationships
     feeds = relationship("Feed", back_populates="host")
@@ -24,6 +33,11 @@ class User(Base):
     shared_with_me = relationship("UserShare", foreign_keys="UserShare.shared_with_id", back_populates="shared_with_user")
     shared_by_me = relationship("UserShare", foreign_keys="UserShare.shared_by_id", back_populates="shared_by_user")
 
+    __table_args__ = (
+        # Finds users changed since a delta sync
+        Index("ix_users_updated_at", "updated_at"),
+    )
+
 
 class Topic(Base):
     __tablename__ = "topics"
@@ -43,15 +57,44 @@ class Feed(Base):
     topic_id = Column(Integer, ForeignKey("topics.id", ondelete="SET NULL"), nullable=True)
     title = Column(String(200), index=True)
     description = Column(Text, nullable=True)
-    file_path = Column(String)
-    created_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc))
-    updated_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc), onupdate=datetime.datetime.now(datetime.timezone.utc))
+    # SHA-256 of the stored blob; older rows hold a plain upload path
+    file_path = Column(String, index=True)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
 
     # Relationships
     host = relationship("User", back_populates="feeds")
     topic = relationship("Topic", back_populates="feeds")
     comments = relationship("Comment", back_populates="feed", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Serves a user's feed listing, most recently updated first
+        Index("ix_feeds_host_id_updated_at_id", "host_id", "updated_at", "id"),
+        # Finds feeds changed since a delta sync, whoever owns them
+        Index("ix_feeds_updated_at", "updated_at"),
+    )
+
+
+class FeedPage(Base):
+    __tablename__ = "feed_pages"
+    __table_args__ = (
+        Index("ix_feed_pages_feed_id_page_number", "feed_id", "page_number", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    feed_id = Column(Integer, ForeignKey("feeds.id", ondelete="CASCADE"), nullable=False)
+    page_number = Column(Integer, nullable=False)
+    text = Column(Text)
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=utcnow)
+
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -61,13 +104,22 @@ class Comment(Base):
     feed_id = Column(Integer, ForeignKey("feeds.id", ondelete="CASCADE"))
     comment_body = Column(Text)
     commenter_name = Column(Text)
-    created_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc))
-    updated_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc), onupdate=datetime.datetime.now(datetime.timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
 
     # Relationships
     user = relationship("User", back_populates="comments")
     feed = relationship("Feed", back_populates="comments")
 
+    __table_args__ = (
+        # Serves a feed's comment stream, newest first or since a cursor
+        Index("ix_comments_feed_id_created_at_id", "feed_id", "created_at", "id"),
+        # Serves a user's comment listing
+        Index("ix_comments_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Finds comments changed since a delta sync
+        Index("ix_comments_updated_at", "updated_at"),
+    )
+
 
 class FileShare(Base):
     __tablename__ = "file_shares"
@@ -76,7 +128,7 @@ class FileShare(Base):
     feed_id = Column(Integer, ForeignKey("feeds.id", ondelete="CASCADE"))
     share_token = Column(String, unique=True, index=True, default=lambda: str(uuid.uuid4()))
     created_by = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
-    created_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
     expires_at = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True)
 
@@ -84,6 +136,10 @@ class FileShare(Base):
     feed = relationship("Feed", backref="shares")
     creator = relationship("User")
 
+    __table_args__ = (
+        Index("ix_file_shares_feed_id", "feed_id"),
+    )
+
 
 class UserShare(Base):
     __tablename__ = "user_shares"
@@ -92,10 +148,61 @@ class UserShare(Base):
     feed_id = Column(Integer, ForeignKey("feeds.id", ondelete="CASCADE"))
     shared_by_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     shared_with_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
-    created_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
     is_active = Column(Boolean, default=True)
 
     # Relationships
     feed = relationship("Feed", backref="user_shares")
     shared_by_user = relationship("User", foreign_keys=[shared_by_id], back_populates="shared_by_me")
     shared_with_user = relationship("User", foreign_keys=[shared_with_id], back_populates="shared_with_me")
+
+    # Partial indexes over active shares only; revoked shares are never looked up by these
+    __table_args__ = (
+        # Feeds shared with a user: the access check and shared listings
+        Index(
+            "ix_user_shares_recipient_active", shared_with_id, feed_id,
+            postgresql_where=is_active == True, sqlite_where=is_active == True,
+        ),
+        # Recipients of a feed: cache eviction and share management
+        Index(
+            "ix_user_shares_feed_active", feed_id, shared_with_id,
+            postgresql_where=is_active == True, sqlite_where=is_active == True,
+        ),
+    )
+
+
+class Tombstone(Base):
+    """A deleted or revoked row, kept so delta syncs can report the removal."""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True)
+    # "feed", "comment" or "share"
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # No foreign key: the feed may be the row that was deleted
+    feed_id = Column(Integer, nullable=True)
+    # The user the removal is reported to; None reaches everyone who can see the feed
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    deleted_at = Column(DateTime, default=utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tombstones_deleted_at", "deleted_at"),
+    )
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), index=True)
+    payload = Column(JSON)
+    status = Column(String(20), default="queued", index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime, default=utcnow, index=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
@@ -0,0 +1,137 @@
+from fastapi import HTTPException
+from sqlalchemy import or_, and_
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+import base64
+import json
+
+# Page size limits for cursor-paginated listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Response header carrying the cursor to poll with for newer rows
+SINCE_CURSOR_HEADER = "X-Since-Cursor"
+
+
+def encode_cursor(*values):
+    """Encode keyset values into an opaque, URL-safe cursor token."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int):
+    """Decode a cursor token into its keyset values."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("unexpected cursor shape")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset_filter(timestamp_column, id_column, cursor: str, newer: bool = False):
+    """Build the filter selecting rows after the cursor in (timestamp, id) descending order.
+
+    With newer, select the rows before it instead, i.e. those added since.
+    """
+    timestamp, row_id = decode_cursor(cursor, 2)
+    try:
+        timestamp = datetime.fromisoformat(timestamp)
+        row_id = int(row_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if newer:
+        return or_(
+            timestamp_column > timestamp,
+            and_(timestamp_column == timestamp, id_column > row_id),
+        )
+    return or_(
+        timestamp_column < timestamp,
+        and_(timestamp_column == timestamp, id_column < row_id),
+    )
+
+
+def rank_filter(score_column, id_column, cursor: str):
+    """Build the filter selecting rows after the cursor in (score ascending, id descending) order.
+
+    That is the order of ranked search results, where lower scores rank higher.
+    """
+    score, row_id = decode_cursor(cursor, 2)
+    try:
+        score = float(score)
+        row_id = int(row_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return or_(
+        score_column > score,
+        and_(score_column == score, id_column < row_id),
+    )
+
+
+def row_cursor(row, timestamp_column, id_column):
+    """Cursor pointing at a row (or the first entity of a Row tuple)."""
+    if isinstance(row, Row):
+        row = row[0]
+    return encode_cursor(getattr(row, timestamp_column.key), getattr(row, id_column.key))
+
+
+async def paginate(db: AsyncSession, stmt, timestamp_column, id_column, cursor=None, limit: int = DEFAULT_PAGE_SIZE):
+    """Fetch one page of a select ordered newest first by (timestamp, id).
+
+    Returns the rows of the page and the cursor for the next page, or None
+    when there are no more rows. For multi-entity selects the rows are
+    returned as tuples and the keyset is read from the first entity.
+    """
+    if cursor:
+        stmt = stmt.where(keyset_filter(timestamp_column, id_column, cursor))
+    stmt = stmt.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1)
+
+    result = (await db.execute(stmt)).unique()
+    rows = result.scalars().all() if len(stmt.column_descriptions) == 1 else result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = row_cursor(rows[-1], timestamp_column, id_column)
+    return rows, next_cursor
+
+
+async def paginate_ranked(db: AsyncSession, stmt, score_column, id_column, cursor=None, limit: int = DEFAULT_PAGE_SIZE):
+    """Fetch one page of a select ordered best first by (score, id), lower scores first.
+
+    Returns the rows of the page as tuples, without the score, and the
+    cursor for the next page, or None when there are no more rows. The
+    keyset id is read from the first entity of each row.
+    """
+    if cursor:
+        stmt = stmt.where(rank_filter(score_column, id_column, cursor))
+    stmt = stmt.add_columns(score_column).order_by(score_column, id_column.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).unique().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-1], getattr(rows[-1][0], id_column.key))
+    return [tuple(row)[:-1] for row in rows], next_cursor
+
+
+async def fetch_since(db: AsyncSession, stmt, timestamp_column, id_column, since: str, limit: int = DEFAULT_PAGE_SIZE):
+    """Fetch up to limit rows added after the since cursor, oldest first.
+
+    Returns the rows and the cursor to poll with next: that of the newest
+    row returned, or since itself when nothing is new.
+    """
+    stmt = stmt.where(keyset_filter(timestamp_column, id_column, since, newer=True))
+    stmt = stmt.order_by(timestamp_column.asc(), id_column.asc()).limit(limit)
+
+    result = (await db.execute(stmt)).unique()
+    rows = result.scalars().all() if len(stmt.column_descriptions) == 1 else result.all()
+    return rows, row_cursor(rows[-1], timestamp_column, id_column) if rows else since
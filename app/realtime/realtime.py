@@ -0,0 +1,275 @@
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+import os
+from dotenv import load_dotenv
+import redis.asyncio
+
+from ..models.models import utcnow
+from ..schemas.schemas import Comment
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# redis:// URL relaying events between worker processes; events stay in-process when unset
+REALTIME_BUS_URL = os.getenv("REALTIME_BUS_URL")
+# Open event streams allowed per worker before new ones are turned away
+REALTIME_MAX_CONNECTIONS = int(os.getenv("REALTIME_MAX_CONNECTIONS", "10000"))
+# Events buffered for a slow subscriber before its stream is closed
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
+# Comment lines sent on idle streams so proxies keep them open
+REALTIME_HEARTBEAT_SECONDS = float(os.getenv("REALTIME_HEARTBEAT_SECONDS", "15"))
+# Streams are closed after this long; clients reconnect and are authorized again
+REALTIME_MAX_STREAM_SECONDS = float(os.getenv("REALTIME_MAX_STREAM_SECONDS", "3600"))
+
+HEARTBEAT = ": keepalive\n\n"
+
+STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop nginx from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+
+class Subscription:
+    """One subscriber's buffered events on a channel."""
+    __slots__ = ("channel", "queue", "overflowed")
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+
+class MemoryBus:
+    """In-process pub/sub: delivers each published message to this worker's subscribers.
+
+    Messages are delivered without awaiting, so a publisher never waits on
+    subscribers. A subscriber that falls REALTIME_QUEUE_SIZE messages behind
+    is dropped and its stream ends, so the client can reconnect and catch up
+    from the listing.
+    """
+
+    def __init__(self, queue_size: int = REALTIME_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._channels = {}
+        self.connections = 0
+        self.published = 0
+        self.dropped = 0
+
+    def has_subscribers(self, channel: str):
+        return channel in self._channels
+
+    def add(self, channel: str):
+        subscription = Subscription(channel, self.queue_size)
+        self._channels.setdefault(channel, set()).add(subscription)
+        self.connections += 1
+        return subscription
+
+    def remove(self, subscription: Subscription):
+        subscribers = self._channels.get(subscription.channel)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._channels[subscription.channel]
+        self.connections -= 1
+
+    def deliver(self, channel: str, message: str):
+        for subscription in list(self._channels.get(channel, ())):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self.dropped += 1
+                self.remove(subscription)
+
+    async def publish(self, channel: str, message: str):
+        self.published += 1
+        self.deliver(channel, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        subscription = self.add(channel)
+        try:
+            yield subscription
+        finally:
+            self.remove(subscription)
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "connections": self.connections,
+            "channels": len(self._channels),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+class RedisBus(MemoryBus):
+    """Pub/sub across worker processes through Redis.
+
+    Each worker holds one Redis subscription for the channels its own
+    clients follow, however many clients that is, and fans messages out
+    locally. Published messages go through Redis to every worker, including
+    the publisher's. Works with any redis.asyncio-compatible client,
+    including fakes.
+    """
+
+    def __init__(self, client, queue_size: int = REALTIME_QUEUE_SIZE, prefix: str = "realtime:"):
+        super().__init__(queue_size)
+        self.client = client
+        self.prefix = prefix
+        self._pubsub = client.pubsub()
+        self._subscribed = set()
+        self._lock = asyncio.Lock()
+        self._listener = None
+
+    async def _sync_subscription(self, channel: str):
+        """Subscribe to or unsubscribe from a channel in Redis to match the local subscribers."""
+        async with self._lock:
+            wanted = self.has_subscribers(channel)
+            if wanted and channel not in self._subscribed:
+                await self._pubsub.subscribe(self.prefix + channel)
+                self._subscribed.add(channel)
+                if self._listener is None:
+                    self._listener = asyncio.create_task(self._listen())
+            elif not wanted and channel in self._subscribed:
+                self._subscribed.discard(channel)
+                await self._pubsub.unsubscribe(self.prefix + channel)
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Realtime bus connection failed; retrying")
+                await asyncio.sleep(1)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            channel = message["channel"]
+            data = message["data"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            if isinstance(data, bytes):
+                data = data.decode()
+            self.deliver(channel[len(self.prefix):], data)
+
+    async def publish(self, channel: str, message: str):
+        self.published += 1
+        await self.client.publish(self.prefix + channel, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        subscription = self.add(channel)
+        try:
+            await self._sync_subscription(channel)
+            yield subscription
+        finally:
+            self.remove(subscription)
+            await self._sync_subscription(channel)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        await self._pubsub.aclose()
+
+    def stats(self):
+        return {**super().stats(), "backend": "redis"}
+
+
+def bus_from_url(url: Optional[str]):
+    """Pub/sub bus for REALTIME_BUS_URL: Redis when set, else in-memory."""
+    if not url:
+        return MemoryBus()
+    return RedisBus(redis.asyncio.from_url(url))
+
+
+bus = bus_from_url(REALTIME_BUS_URL)
+
+
+def sse_frame(event: str, data: str):
+    """A Server-Sent Events frame; data must not contain newlines (compact JSON does not)."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _stream(channel: str, deadline: Optional[datetime], authorized: Optional[Callable[[], Awaitable[bool]]]):
+    async with bus.subscribe(channel) as subscription:
+        loop = asyncio.get_running_loop()
+        closes_at = loop.time() + REALTIME_MAX_STREAM_SECONDS
+        if deadline is not None:
+            closes_at = min(closes_at, loop.time() + (deadline - utcnow()).total_seconds())
+        yield sse_frame("ready", "{}")
+        while True:
+            remaining = closes_at - loop.time()
+            if remaining <= 0 or (subscription.overflowed and subscription.queue.empty()):
+                return
+            try:
+                frame = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=min(REALTIME_HEARTBEAT_SECONDS, remaining)
+                )
+            except asyncio.TimeoutError:
+                frame = HEARTBEAT
+            if authorized is not None and not await authorized():
+                return
+            yield frame
+
+
+def event_stream(
+    channel: str,
+    deadline: Optional[datetime] = None,
+    authorized: Optional[Callable[[], Awaitable[bool]]] = None,
+):
+    """A text/event-stream response relaying a channel's events until the client leaves or the deadline passes.
+
+    Streams start with a `ready` event, sent once the subscription is in
+    place; events published before it are not delivered, so clients fetch
+    the listing after `ready` (or poll with the since cursor) to catch up.
+    When given, authorized is awaited before every event and heartbeat and
+    the stream ends as soon as it returns False, e.g. once access is revoked.
+    """
+    if bus.connections >= REALTIME_MAX_CONNECTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open event streams, please retry",
+            headers={"Retry-After": "5"},
+        )
+    return StreamingResponse(
+        _stream(channel, deadline, authorized), media_type="text/event-stream", headers=STREAM_HEADERS
+    )
+
+
+def feed_comments_channel(feed_id: int):
+    return f"feed:{feed_id}:comments"
+
+
+_comment_adapter = TypeAdapter(Comment)
+
+
+async def publish_comment(event: str, comment):
+    """Publish a comment change to the feed's subscribers; event is created, updated or deleted.
+
+    Deletions carry only the comment id. Failures are logged, never raised,
+    so a comment write succeeds even when the bus is unavailable.
+    """
+    if event == "deleted":
+        data = f'{{"id":{int(comment.id)}}}'
+    else:
+        data = _comment_adapter.dump_json(_comment_adapter.validate_python(comment, from_attributes=True)).decode()
+    try:
+        await bus.publish(feed_comments_channel(comment.feed_id), sse_frame(f"comment.{event}", data))
+    except Exception:
+        logger.exception("Publishing comment event failed")
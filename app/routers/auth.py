@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Form, Response
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..schemas.schemas import UserCreate, User
 from ..models.models import User as UserModel
-from ..database.database import get_db
+from ..database.database import get_async_db
 
 from ..auth.auth import (
     authenticate_user,
@@ -12,6 +13,7 @@ from ..auth.auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     get_current_active_user,
 )
+from ..conditional.conditional import Version, conditional
 
 router = APIRouter(prefix="/auth",tags=["authentication"])
 
@@ -22,10 +24,10 @@ async def login_form(
     response: Response,
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login form submission handler."""
-    user = authenticate_user(db, username, password)
+    user = await authenticate_user(db, username, password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -61,7 +63,7 @@ async def register_user(
     username: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Register a new user."""
     # Handle both API and form submissions
@@ -74,29 +76,30 @@ async def register_user(
         
 
     # Check if the username already exists
-    db_user = db.query(UserModel).filter(UserModel.username == user.username.lower()).first()
+    result = await db.execute(select(UserModel).where(UserModel.username == user.username.lower()))
+    db_user = result.scalars().first()
     if db_user:
             raise HTTPException(
                 status_code=400, detail="Username already registered"
             )
     
     # Check if the email already exists
-    db_email = db.query(UserModel).filter(UserModel.email == user.email).first()
+    result = await db.execute(select(UserModel).where(UserModel.email == user.email))
+    db_email = result.scalars().first()
     if db_email:
             raise HTTPException(
                 status_code=400, detail="Email already registered"
             )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     db_user = UserModel(
         username=user.username.lower(),
         email=user.email,
         hashed_password=hashed_password,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     
     access_token = create_access_token(
     data={
@@ -125,7 +128,11 @@ async def register_user(
         
 
 
-@router.get("/user/me", response_model=User)
+async def me_version(current_user: UserModel = Depends(get_current_active_user)):
+    return Version(key=(current_user.updated_at,), last_modified=current_user.updated_at)
+
+
+@router.get("/user/me", response_model=User, dependencies=[Depends(conditional(me_version, per_user=True))])
 async def read_users_me(current_user: UserModel = Depends(get_current_active_user)):
     """Get the current user."""
     return current_user 
\ No newline at end of file
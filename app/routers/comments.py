@@ -1,39 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from ..schemas.schemas import Comment, CommentCreate, CommentUpdate
 from ..models.models import Comment as CommentModel, Feed, User
-from ..database.database import get_db
+from ..database.database import get_async_db
 from ..auth.auth import get_current_active_user
+from ..conditional.conditional import Version, conditional
+from ..cache.responses import evict_feed_audience
+from ..sync.sync import add_tombstones
+from ..realtime.realtime import event_stream, feed_comments_channel, publish_comment
+from ..pagination.pagination import (
+    paginate,
+    fetch_since,
+    row_cursor,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    SINCE_CURSOR_HEADER,
+)
 
 router = APIRouter(prefix="/comments", tags=["comments"])
 
 
-@router.get("/", response_model=List[Comment])
-async def get_comments(feed_id: int = None, db: Session = Depends(get_db)):
-    """Get all comments, optionally filtered by feed."""
-    query = db.query(CommentModel).options(joinedload(CommentModel.user))
-    
+async def comments_version(feed_id: int = None, db: AsyncSession = Depends(get_async_db)):
+    """Version of the comment listing: comment count and last update."""
+    query = select(func.count(CommentModel.id), func.max(CommentModel.updated_at))
+
     if feed_id:
-        query = query.filter(CommentModel.feed_id == feed_id)
-    
-    comments = query.order_by(CommentModel.updated_at.desc(), CommentModel.created_at.desc()).all()
+        query = query.where(CommentModel.feed_id == feed_id)
+
+    comment_count, last_updated_at = (await db.execute(query)).one()
+    return Version(key=(feed_id, comment_count, last_updated_at), last_modified=last_updated_at)
+
+
+async def comment_page(db: AsyncSession, response: Response, query, cursor: Optional[str], since: Optional[str], limit: int):
+    """One page of a comment stream.
+
+    Without since, comments come newest first and X-Next-Cursor points at
+    the next (older) page. With since, only comments added after that
+    cursor are returned, oldest first. X-Since-Cursor carries the cursor to
+    poll with for newer comments.
+    """
+    if cursor and since:
+        raise HTTPException(status_code=400, detail="Use either cursor or since, not both")
+
+    if since:
+        comments, since_cursor = await fetch_since(
+            db, query, CommentModel.created_at, CommentModel.id, since, limit
+        )
+    else:
+        comments, next_cursor = await paginate(
+            db, query, CommentModel.created_at, CommentModel.id, cursor, limit
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        # Only the first page starts at the newest comment
+        since_cursor = None
+        if comments and not cursor:
+            since_cursor = row_cursor(comments[0], CommentModel.created_at, CommentModel.id)
+
+    if since_cursor:
+        response.headers[SINCE_CURSOR_HEADER] = since_cursor
     return comments
 
 
+@router.get("/", response_model=List[Comment], dependencies=[Depends(conditional(comments_version))])
+async def get_comments(
+    response: Response,
+    feed_id: int = None,
+    cursor: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get comments, optionally filtered by feed, one page at a time.
+
+    Pages are capped at MAX_PAGE_SIZE, including the unfiltered listing.
+    See comment_page for cursor and since.
+    """
+    query = select(CommentModel)
+
+    if feed_id:
+        query = query.where(CommentModel.feed_id == feed_id)
+
+    return await comment_page(db, response, query, cursor, since, limit)
+
+
+@router.get("/stream")
+async def stream_comments(
+    feed_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Server-Sent Events stream of a feed's comment changes.
+
+    Events are comment.created and comment.updated, carrying the comment,
+    and comment.deleted, carrying its id.
+    """
+    if await db.get(Feed, feed_id) is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    # Release the connection now; the stream itself never touches the database
+    await db.close()
+    return event_stream(feed_comments_channel(feed_id))
+
+
 @router.post("/", response_model=Comment, status_code=status.HTTP_201_CREATED)
 async def create_comment(
     comment: CommentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Create a new comment."""
     # Check if feed exists
-    feed = db.query(Feed).filter(Feed.id == comment.feed_id).first()
+    feed = await db.get(Feed, comment.feed_id)
     if not feed:
         raise HTTPException(status_code=404, detail="Feed not found")
-    
+
     # Create comment
     db_comment = CommentModel(
         user_id=current_user.id,
@@ -42,18 +126,16 @@ async def create_comment(
         commenter_name=current_user.username
     )
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
-    
-    # Fetch the comment with user relationship
-    db_comment = db.query(CommentModel).options(joinedload(CommentModel.user)).filter(CommentModel.id == db_comment.id).first()
+    await db.commit()
+    await evict_feed_audience(db, db_comment.feed_id)
+    await publish_comment("created", db_comment)
     return db_comment
 
 
 @router.get("/{comment_id}", response_model=Comment)
-async def get_comment(comment_id: int, db: Session = Depends(get_db)):
+async def get_comment(comment_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific comment by ID."""
-    db_comment = db.query(CommentModel).filter(CommentModel.id == comment_id).first()
+    db_comment = await db.get(CommentModel, comment_id)
     if db_comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
     return db_comment
@@ -63,45 +145,50 @@ async def get_comment(comment_id: int, db: Session = Depends(get_db)):
 async def update_comment(
     comment_id: int,
     comment_update: CommentUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Update a comment."""
-    db_comment = db.query(CommentModel).filter(CommentModel.id == comment_id).first()
+    db_comment = await db.get(CommentModel, comment_id)
     if db_comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
-    
+
     # Check if user is the owner
     if db_comment.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this comment")
-    
+
     # Update comment
     update_data = comment_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_comment, key, value)
-    
-    db.commit()
-    db.refresh(db_comment)
+
+    await db.commit()
+    await evict_feed_audience(db, db_comment.feed_id)
+    await db.refresh(db_comment)
+    await publish_comment("updated", db_comment)
     return db_comment
 
 
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_comment(
     comment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Delete a comment."""
-    db_comment = db.query(CommentModel).filter(CommentModel.id == comment_id).first()
+    db_comment = await db.get(CommentModel, comment_id)
     if db_comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
-    
+
     # Check if user is the owner
     if db_comment.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
-    
+
     # Delete comment
-    db.delete(db_comment)
-    db.commit()
-    
-    return None 
\ No newline at end of file
+    await add_tombstones(db, "comment", db_comment.id, feed_id=db_comment.feed_id)
+    await db.delete(db_comment)
+    await db.commit()
+    await evict_feed_audience(db, db_comment.feed_id)
+    await publish_comment("deleted", db_comment)
+
+    return None
@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from typing import Literal, Optional
+
+from ..models.models import Comment, Feed, Topic, User
+from ..database.database import get_async_db
+from ..auth.auth import get_current_active_user
+from ..export.export import export_response
+from .feeds import visible_feeds_query
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+
+def naive_utc(value: Optional[datetime]):
+    """Compare timestamps given with a time zone in UTC, as stored."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def filter_created(stmt, created_at, start: Optional[datetime], end: Optional[datetime]):
+    """Restrict a select to rows created in [start, end)."""
+    start, end = naive_utc(start), naive_utc(end)
+    if start:
+        stmt = stmt.where(created_at >= start)
+    if end:
+        stmt = stmt.where(created_at < end)
+    return stmt
+
+
+@router.get("/comments")
+async def export_comments(
+    feed_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Stream the comments on feeds visible to the user as NDJSON or CSV, oldest first.
+
+    Filter by feed, by commenting user and by creation time in [start, end).
+    Rows are ordered by id; to resume an interrupted export, repeat the
+    request with after_id set to the last id received.
+    """
+    visible_ids = visible_feeds_query(current_user).with_only_columns(Feed.id)
+
+    if feed_id is not None:
+        result = await db.execute(visible_ids.where(Feed.id == feed_id))
+        if result.first() is None:
+            raise HTTPException(status_code=404, detail="Feed not found")
+    # Release the connection now; the export reads through its own session
+    await db.close()
+
+    stmt = select(
+        Comment.id,
+        Comment.feed_id,
+        Comment.user_id,
+        Comment.commenter_name,
+        Comment.comment_body,
+        Comment.created_at,
+        Comment.updated_at,
+    ).where(Comment.feed_id.in_(visible_ids))
+
+    if feed_id is not None:
+        stmt = stmt.where(Comment.feed_id == feed_id)
+    if user_id is not None:
+        stmt = stmt.where(Comment.user_id == user_id)
+    if after_id is not None:
+        stmt = stmt.where(Comment.id > after_id)
+    stmt = filter_created(stmt, Comment.created_at, start, end)
+
+    return export_response(stmt.order_by(Comment.id), "comments", format)
+
+
+@router.get("/feeds")
+async def export_feeds(
+    user_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Stream the feeds visible to the user as NDJSON or CSV, oldest first.
+
+    Filter by owner (user_id) and by creation time in [start, end). Resume
+    with after_id as for comments.
+    """
+    await db.close()
+
+    stmt = visible_feeds_query(current_user).outerjoin(Topic, Topic.id == Feed.topic_id).with_only_columns(
+        Feed.id,
+        Feed.host_id,
+        Feed.title,
+        Feed.description,
+        Topic.topic,
+        Feed.created_at,
+        Feed.updated_at,
+    )
+
+    if user_id is not None:
+        stmt = stmt.where(Feed.host_id == user_id)
+    if after_id is not None:
+        stmt = stmt.where(Feed.id > after_id)
+    stmt = filter_created(stmt, Feed.created_at, start, end)
+
+    return export_response(stmt.order_by(Feed.id), "feeds", format)
@@ -1,43 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
-import shutil
-from sqlalchemy import or_, and_
+import re
+from sqlalchemy import select, delete, or_, and_, func
 
-from ..schemas.schemas import Feed, FeedCreate, FeedUpdate, FeedWithComments
-from ..models.models import Feed as FeedModel, User, Topic, Comment, UserShare
-from ..database.database import get_db
+from ..schemas.schemas import Feed, FeedCreate, FeedUpdate, FeedWithComments, FeedSummary, FeedSearchResult, FeedChanges
+from ..models.models import Feed as FeedModel, User, Topic, Comment, UserShare, FileShare, Tombstone, utcnow
+from ..database.database import get_async_db
 from ..auth.auth import get_current_active_user
+from ..storage.storage import stage_upload, discard_upload, store_blob, release_blob, collect_blob, blob_path, is_blob_ref
+from ..storage.downloads import serve_file
+from ..jobs.jobs import enqueue
+from ..search.search import apply_search, search_pages, index_feed, remove_feed
+from ..pagination.pagination import paginate, paginate_ranked, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from ..conditional.conditional import Version, conditional
+from ..cache.responses import response_cache, feed_audience, evict_feed_audience
+from ..sharing.sharing import broadcast_share_change
+from ..sync.sync import SYNC_MAX_CHANGES, sync_cursor, decode_sync_cursor, check_sync_size, add_tombstones
 
 router = APIRouter(prefix="/feeds", tags=["feeds"])
 
-UPLOAD_DIR = "app/media/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Response header carrying the id of the post-upload processing job
+JOB_ID_HEADER = "X-Job-Id"
 
-
-@router.get("/search", response_model=List[FeedWithComments])
-async def get_feeds(
-    q: Optional[str] = None, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Get all feeds with optional filtering, including those shared with the user."""
-    # Main query for feeds
-    main_query = db.query(FeedModel).options(
-        joinedload(FeedModel.host),
-        joinedload(FeedModel.comments).joinedload(Comment.user),
-    )
-    
-    # Filter to include only feeds owned by the user or shared with them
-    main_query = main_query.filter(
+def visible_feeds_query(current_user: User):
+    """Select feeds owned by the user or actively shared with them."""
+    return select(FeedModel).where(
         or_(
             # Feeds owned by the user
             FeedModel.host_id == current_user.id,
             # Feeds shared with the user
             FeedModel.id.in_(
-                db.query(UserShare.feed_id).filter(
+                select(UserShare.feed_id).where(
                     and_(
                         UserShare.shared_with_id == current_user.id,
                         UserShare.is_active == True
@@ -46,129 +42,328 @@ async def get_feeds(
             )
         )
     )
-    
-    # Apply additional filters
+
+
+def with_comment_stats(stmt):
+    """Attach per-feed comment counts and last comment time from one grouped subquery."""
+    stats = select(
+        Comment.feed_id.label("feed_id"),
+        func.count(Comment.id).label("comment_count"),
+        func.max(Comment.updated_at).label("last_comment_at"),
+    ).group_by(Comment.feed_id).subquery()
+
+    return stmt.outerjoin(stats, stats.c.feed_id == FeedModel.id).add_columns(
+        func.coalesce(stats.c.comment_count, 0),
+        stats.c.last_comment_at,
+    ).options(
+        joinedload(FeedModel.host),
+        joinedload(FeedModel.topic),
+    )
+
+
+def to_summaries(rows):
+    """Turn (feed, comment_count, last_comment_at) rows into feeds ready for FeedSummary."""
+    feeds = []
+    for feed, comment_count, last_comment_at in rows:
+        feed.comment_count = comment_count
+        feed.last_activity_at = max(filter(None, [feed.updated_at, last_comment_at]), default=None)
+        feeds.append(feed)
+    return feeds
+
+
+async def load_feed_with_comments(db: AsyncSession, feed_id: int):
+    """Load a feed with everything FeedWithComments serializes, or None if it does not exist."""
+    result = await db.execute(
+        select(FeedModel).options(
+            joinedload(FeedModel.host),
+            joinedload(FeedModel.topic),
+            selectinload(FeedModel.comments).joinedload(Comment.user),
+        ).where(FeedModel.id == feed_id)
+    )
+    db_feed = result.scalars().first()
+    if db_feed is not None:
+        db_feed.comment_count = len(db_feed.comments)
+    return db_feed
+
+
+async def feed_version(db: AsyncSession, feed_id: int):
+    """Version of a feed as served with its comments, from one aggregate query."""
+    result = await db.execute(
+        select(
+            FeedModel.updated_at,
+            User.updated_at,
+            select(func.count(Comment.id)).where(Comment.feed_id == FeedModel.id).scalar_subquery(),
+            select(func.max(Comment.updated_at)).where(Comment.feed_id == FeedModel.id).scalar_subquery(),
+        ).select_from(FeedModel).outerjoin(User, User.id == FeedModel.host_id).where(FeedModel.id == feed_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    feed_updated_at, host_updated_at, comment_count, last_comment_at = row
+    return Version(
+        key=(feed_id, feed_updated_at, host_updated_at, comment_count, last_comment_at),
+        last_modified=max(filter(None, [feed_updated_at, host_updated_at, last_comment_at]), default=None),
+    )
+
+
+async def requested_feed_version(feed_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await feed_version(db, feed_id)
+
+
+def download_name(feed: FeedModel):
+    """File name offered when downloading a feed's PDF."""
+    if not is_blob_ref(feed.file_path):
+        return os.path.basename(feed.file_path)
+    title = re.sub(r"[^\w\-. ]+", "_", feed.title or "").strip() or f"feed-{feed.id}"
+    return f"{title}.pdf"
+
+
+async def get_or_create_topic(db: AsyncSession, topic_name: str):
+    """Get a topic by name, creating it if needed."""
+    result = await db.execute(select(Topic).where(Topic.topic == topic_name))
+    topic = result.scalars().first()
+    if not topic:
+        topic = Topic(topic=topic_name)
+        db.add(topic)
+        await db.commit()
+    return topic
+
+
+@router.get("/search", response_model=List[FeedSearchResult])
+async def search_feeds(
+    response: Response,
+    q: Optional[str] = None,
+    content: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Search feeds visible to the user by title, description and topic.
+
+    With content=true the extracted PDF text is searched instead and each
+    feed lists its matching pages with a snippet. Matches are ranked by
+    relevance, best first, and paginated like the feed listing: pass the
+    X-Next-Cursor header of a page back as cursor for the next one.
+    Without a query this behaves like the paginated feed listing.
+    """
+    main_query = visible_feeds_query(current_user)
+
+    if q and content:
+        feed_ids, matches, next_cursor = await search_pages(
+            db, main_query.with_only_columns(FeedModel.id), q, limit, cursor
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        if not feed_ids:
+            return []
+        result = await db.execute(with_comment_stats(main_query.where(FeedModel.id.in_(feed_ids))))
+        feeds = {feed.id: feed for feed in to_summaries(result.all())}
+        for feed_id, feed in feeds.items():
+            feed.matches = [
+                {"page_number": page_number, "snippet": snippet} for page_number, snippet in matches[feed_id]
+            ]
+        return [feeds[feed_id] for feed_id in feed_ids if feed_id in feeds]
+
     if q:
-        main_query = main_query.filter(
-            or_(
-                FeedModel.title.icontains(q),
-                FeedModel.description.icontains(q),
-                FeedModel.topic.has(Topic.topic.icontains(q))
-            )
+        matching, score = apply_search(db, main_query, q)
+        rows, next_cursor = await paginate_ranked(
+            db, with_comment_stats(matching), score, FeedModel.id, cursor, limit
         )
-    
-    feeds = main_query.order_by(FeedModel.updated_at.desc(), FeedModel.created_at.desc()).all()
-    
-    # Calculate total comments for each feed
-    for feed in feeds:
-        feed.comment_count = len(feed.comments)
-    
-    return feeds
+    else:
+        rows, next_cursor = await paginate(
+            db, with_comment_stats(main_query), FeedModel.updated_at, FeedModel.id, cursor, limit
+        )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return to_summaries(rows)
 
-@router.get("/", response_model=List[FeedWithComments])
+@router.get("/", response_model=List[FeedSummary])
 async def get_feeds(
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get all feeds with optional filtering, including those shared with the user."""
-    # Main query for feeds
-    main_query = db.query(FeedModel).options(
-        joinedload(FeedModel.host),
-        joinedload(FeedModel.comments).joinedload(Comment.user),
+    """Get feeds owned by or shared with the user, newest first, one page at a time.
+
+    Feeds are returned as summaries with comment counts; full comments are
+    served by GET /feeds/{feed_id}. The cursor for the following page is
+    returned in the X-Next-Cursor header. Serialized pages are cached per
+    user until a write to one of their feeds evicts them.
+    """
+    cache_key = f"feeds:{cursor or ''}:{limit}"
+    cached, generation = await response_cache.get(current_user.id, cache_key, NEXT_CURSOR_HEADER)
+    if cached is not None:
+        return cached
+
+    main_query = visible_feeds_query(current_user)
+
+    rows, next_cursor = await paginate(
+        db, with_comment_stats(main_query), FeedModel.updated_at, FeedModel.id, cursor, limit
+    )
+
+    return await response_cache.store(
+        current_user.id, cache_key, generation, List[FeedSummary], to_summaries(rows), NEXT_CURSOR_HEADER, next_cursor
+    )
+
+
+@router.get("/changes", response_model=FeedChanges)
+async def get_feed_changes(
+    since: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Changes to the user's feeds, their comments and share grants since a sync cursor.
+
+    Without since, nothing is returned but a cursor: load the listings after
+    taking it, then pass it back as since. Each sync returns the feeds (as
+    summaries), comments and active share grants created or updated since
+    the cursor, tombstones for deleted feeds and comments and for revoked
+    shares, and the cursor for the next sync. A feed's tombstone also
+    removes its comments and grants. Rows near the cursor may be sent
+    twice, so clients apply changes by id. When there are too many changes
+    or the cursor is too old, 410 asks the client to reload instead.
+    """
+    synced_at = utcnow()
+    if not since:
+        return {"cursor": sync_cursor(synced_at)}
+    since_at = decode_sync_cursor(since)
+
+    main_query = visible_feeds_query(current_user)
+    visible_ids = main_query.with_only_columns(FeedModel.id)
+    # Feeds newly shared with the user are sent whole, with all their comments
+    new_grants = select(UserShare.feed_id).where(
+        UserShare.shared_with_id == current_user.id,
+        UserShare.is_active == True,
+        UserShare.created_at > since_at
     )
-    
-    # Filter to include only feeds owned by the user or shared with them
-    main_query = main_query.filter(
+
+    changed_feeds = main_query.where(
         or_(
-            # Feeds owned by the user
-            FeedModel.host_id == current_user.id,
-            # Feeds shared with the user
-            FeedModel.id.in_(
-                db.query(UserShare.feed_id).filter(
-                    and_(
-                        UserShare.shared_with_id == current_user.id,
-                        UserShare.is_active == True
-                    )
-                )
-            )
+            FeedModel.updated_at > since_at,
+            FeedModel.id.in_(new_grants),
+            # Comment counts and last activity changed
+            FeedModel.id.in_(select(Comment.feed_id).where(Comment.updated_at > since_at)),
+            FeedModel.id.in_(select(Tombstone.feed_id).where(
+                Tombstone.entity == "comment",
+                Tombstone.deleted_at > since_at
+            )),
+            # The embedded host changed
+            FeedModel.host_id.in_(select(User.id).where(User.updated_at > since_at)),
         )
     )
-    
-    feeds = main_query.order_by(FeedModel.updated_at.desc(), FeedModel.created_at.desc()).all()
-    
-    # Calculate total comments for each feed
-    for feed in feeds:
-        feed.comment_count = len(feed.comments)
-    
-    return feeds
+    result = await db.execute(with_comment_stats(changed_feeds).order_by(FeedModel.id).limit(SYNC_MAX_CHANGES + 1))
+    feeds = to_summaries(check_sync_size(result.all()))
+
+    result = await db.execute(
+        select(Comment).where(
+            Comment.feed_id.in_(visible_ids),
+            or_(Comment.updated_at > since_at, Comment.feed_id.in_(new_grants))
+        ).order_by(Comment.id).limit(SYNC_MAX_CHANGES + 1)
+    )
+    comments = check_sync_size(result.scalars().all())
+
+    result = await db.execute(
+        select(UserShare).where(
+            or_(UserShare.shared_with_id == current_user.id, UserShare.shared_by_id == current_user.id),
+            UserShare.is_active == True,
+            # Shares of feeds deleted before their shares were removed with them
+            UserShare.feed_id.isnot(None),
+            UserShare.created_at > since_at
+        ).order_by(UserShare.id).limit(SYNC_MAX_CHANGES + 1)
+    )
+    shares = check_sync_size(result.scalars().all())
+
+    result = await db.execute(
+        select(Tombstone).where(
+            Tombstone.deleted_at > since_at,
+            or_(
+                Tombstone.user_id == current_user.id,
+                and_(Tombstone.user_id.is_(None), Tombstone.feed_id.in_(visible_ids))
+            )
+        ).order_by(Tombstone.id).limit(SYNC_MAX_CHANGES + 1)
+    )
+    # A feed visible again, e.g. shared anew after a revocation, is not deleted
+    feed_ids = {feed.id for feed in feeds}
+    deleted = [
+        tombstone for tombstone in check_sync_size(result.scalars().all())
+        if not (tombstone.entity == "feed" and tombstone.entity_id in feed_ids)
+    ]
+
+    return {
+        "cursor": sync_cursor(synced_at, since_at),
+        "feeds": feeds,
+        "comments": comments,
+        "shares": shares,
+        "deleted": deleted,
+    }
 
 
 @router.post("/", response_model=FeedWithComments, status_code=status.HTTP_201_CREATED)
 async def create_feed(
+    response: Response,
     title: str = Form(...),
     description: Optional[str] = Form(None),
     topic_name: Optional[str] = Form(None),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Create a new feed with file upload."""
-    # Validate file is a PDF
-    if not file.content_type == "application/pdf":
-        raise HTTPException(
-            status_code=400, detail="Only PDF files are allowed."
-        )
-    
-    # Handle topic
-    topic = None
-    if topic_name:
-        topic = db.query(Topic).filter(Topic.topic == topic_name).first()
-        if not topic:
-            topic = Topic(topic=topic_name)
-            db.add(topic)
-            db.commit()
-            db.refresh(topic)
-    
-    # Save file
-    file_path = f"{UPLOAD_DIR}/{current_user.username}_{file.filename}"
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
+    """Create a new feed with file upload.
+
+    PDF validation and page counting run as a background job whose id is
+    returned in the X-Job-Id header.
+    """
+    # Stream the file to disk, validating it is a PDF within the size limit
+    staged = await stage_upload(file)
+
+    try:
+        # Handle topic
+        topic = None
+        if topic_name:
+            topic = await get_or_create_topic(db, topic_name)
+
+        # Store the content once, however many feeds reference it
+        blob_ref = await store_blob(db, staged)
+    except BaseException:
+        # Leave no staged file behind for gc to find
+        await discard_upload(staged.path)
+        raise
+
     # Create feed
     db_feed = FeedModel(
         host_id=current_user.id,
         topic_id=topic.id if topic else None,
         title=title,
         description=description,
-        file_path=file_path,
+        file_path=blob_ref,
     )
     db.add(db_feed)
-    db.commit()
-    db.refresh(db_feed)
-    
+    await db.flush()
+    await index_feed(db, db_feed.id)
+    await db.commit()
+    await response_cache.evict([current_user.id])
+
+    # Hand the CPU-heavy PDF processing to the job runner
+    job = await enqueue(
+        db, "process_pdf", {"feed_id": db_feed.id, "path": blob_path(blob_ref)}, user_id=current_user.id
+    )
+    response.headers[JOB_ID_HEADER] = str(job.id)
+
     # Reload feed with relationships
-    db_feed = db.query(FeedModel).options(
-        joinedload(FeedModel.host),
-        joinedload(FeedModel.comments).joinedload(Comment.user),
-    ).filter(FeedModel.id == db_feed.id).first()
-    
-    return db_feed
+    return await load_feed_with_comments(db, db_feed.id)
 
 
-@router.get("/{feed_id}", response_model=FeedWithComments)
-async def get_feed(feed_id: int, db: Session = Depends(get_db)):
+@router.get("/{feed_id}", response_model=FeedWithComments, dependencies=[Depends(conditional(requested_feed_version))])
+async def get_feed(feed_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific feed by ID with its comments."""
-    db_feed = db.query(FeedModel).options(
-        joinedload(FeedModel.host),
-        joinedload(FeedModel.comments).joinedload(Comment.user),
-    ).filter(FeedModel.id == feed_id).first()
-    
+    db_feed = await load_feed_with_comments(db, feed_id)
+
     if db_feed is None:
         raise HTTPException(status_code=404, detail="Feed not found")
-    
-    # Calculate total comments
-    db_feed.comment_count = len(db_feed.comments)
-    
+
     return db_feed
 
 
@@ -176,84 +371,91 @@ async def get_feed(feed_id: int, db: Session = Depends(get_db)):
 async def update_feed(
     feed_id: int,
     feed_update: FeedUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Update a feed."""
-    db_feed = db.query(FeedModel).filter(FeedModel.id == feed_id).first()
+    db_feed = await db.get(FeedModel, feed_id)
     if db_feed is None:
         raise HTTPException(status_code=404, detail="Feed not found")
-    
+
     # Check if user is the owner
     if db_feed.host_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this feed")
-    
+
     # Handle topic
     if feed_update.topic_name:
-        topic = db.query(Topic).filter(Topic.topic == feed_update.topic_name).first()
-        if not topic:
-            topic = Topic(topic=feed_update.topic_name)
-            db.add(topic)
-            db.commit()
-            db.refresh(topic)
+        topic = await get_or_create_topic(db, feed_update.topic_name)
         feed_update.topic_id = topic.id
-    
+
     # Update feed fields
     update_data = feed_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         if key != "topic_name" and value is not None:
             setattr(db_feed, key, value)
-    
-    db.commit()
-    db.refresh(db_feed)
-    
+
+    await db.flush()
+    await index_feed(db, db_feed.id)
+    await db.commit()
+    await evict_feed_audience(db, feed_id)
+
     # Reload feed with relationships
-    db_feed = db.query(FeedModel).options(
-        joinedload(FeedModel.host),
-        joinedload(FeedModel.comments).joinedload(Comment.user),
-    ).filter(FeedModel.id == db_feed.id).first()
-    
-    return db_feed
+    db.expire(db_feed)
+    return await load_feed_with_comments(db, feed_id)
 
 
 @router.delete("/{feed_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_feed(
     feed_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Delete a feed."""
-    db_feed = db.query(FeedModel).filter(FeedModel.id == feed_id).first()
+    db_feed = await db.get(FeedModel, feed_id)
     if db_feed is None:
         raise HTTPException(status_code=404, detail="Feed not found")
-    
+
     # Check if user is the owner
     if db_feed.host_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this feed")
-    
-    # Delete file if exists
-    if os.path.exists(db_feed.file_path):
-        os.remove(db_feed.file_path)
-    
+
+    # Legacy uploads are owned by a single feed
+    file_ref = db_feed.file_path
+    if not is_blob_ref(file_ref) and os.path.exists(file_ref):
+        os.remove(file_ref)
+
+    # Everyone who sees the feed, captured before its shares go away
+    audience = await feed_audience(db, [feed_id])
+    share_tokens = (await db.execute(select(FileShare.share_token).where(FileShare.feed_id == feed_id))).scalars().all()
+
     # Delete feed
-    db.delete(db_feed)
-    db.commit()
-    
+    await add_tombstones(db, "feed", feed_id, feed_id=feed_id, users=audience)
+    await release_blob(db, file_ref)
+    await remove_feed(db, db_feed.id)
+    # Shares go with the feed; the feed's tombstone reports their removal
+    await db.execute(delete(UserShare).where(UserShare.feed_id == feed_id))
+    await db.delete(db_feed)
+    await db.commit()
+    await response_cache.evict(audience)
+    # Public links to the feed stop resolving in every worker
+    for share_token in share_tokens:
+        await broadcast_share_change(share_token)
+
+    # Remove the stored file once no other feed references it
+    await collect_blob(db, file_ref)
+
     return None
 
 
 @router.get("/{feed_id}/download")
-async def download_feed(feed_id: int, db: Session = Depends(get_db)):
-    """Download the PDF file for a feed."""
-    db_feed = db.query(FeedModel).filter(FeedModel.id == feed_id).first()
+async def download_feed(feed_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Download the PDF file for a feed, with support for range and conditional requests."""
+    db_feed = await db.get(FeedModel, feed_id)
     if db_feed is None:
         raise HTTPException(status_code=404, detail="Feed not found")
-    
-    if not os.path.exists(db_feed.file_path):
+
+    file_path = blob_path(db_feed.file_path)
+    if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
-    
-    return FileResponse(
-        path=db_feed.file_path, 
-        filename=os.path.basename(db_feed.file_path),
-        media_type="application/pdf"
-    ) 
+
+    return serve_file(request, file_path, db_feed.file_path, download_name(db_feed))
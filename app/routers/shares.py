@@ -1,12 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import List
-from datetime import datetime, timedelta
-from ..database.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, insert, update, and_
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import timedelta
+import os
+from ..database.database import get_async_db
 from ..auth.auth import get_current_user
-from ..models.models import FileShare, Feed, User, Comment, UserShare
+from ..models.models import FileShare, Feed, User, Comment, UserShare, utcnow
 from pydantic import BaseModel, EmailStr
-from ..schemas.schemas import ShareCreate, ShareResponse, InvitedCommentCreate, InvitedCommentResponse, FeedWithComments, UserShareCreate, UserShareResponse
+from ..schemas.schemas import ShareCreate, ShareResponse, InvitedCommentCreate, InvitedCommentResponse, FeedWithComments, FeedSummary, UserShareCreate, UserShareResponse, BulkUserShareRequest, BulkUserShareResult
+from ..pagination.pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from ..storage.storage import blob_path
+from ..storage.downloads import serve_file
+from ..sharing.sharing import ResolvedShare, get_active_share, broadcast_share_change, is_share_active
+from ..conditional.conditional import conditional
+from ..cache.responses import response_cache, evict_feed_audience
+from ..sync.sync import add_tombstones, tombstones, record_tombstones
+from ..realtime.realtime import event_stream, feed_comments_channel, publish_comment
+from .comments import comment_page
+from .feeds import with_comment_stats, to_summaries, load_feed_with_comments, download_name, feed_version
 
 router = APIRouter(
     prefix="/share",
@@ -14,29 +27,28 @@ router = APIRouter(
 )
 
 @router.post("/public", response_model=ShareResponse)
-def create_share(share: ShareCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_share(share: ShareCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     # Check if feed exists and user has access
-    feed = db.query(Feed).filter(Feed.id == share.feed_id).first()
+    feed = await db.get(Feed, share.feed_id)
     if not feed:
         raise HTTPException(status_code=404, detail="Feed not found")
     if feed.host_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to share this feed")
-    
+
     # Create share
     expires_at = None
     if share.expires_in_days:
-        expires_at = datetime.now(datetime.timezone.utc) + timedelta(days=share.expires_in_days)
-    
+        expires_at = utcnow() + timedelta(days=share.expires_in_days)
+
     file_share = FileShare(
         feed_id=share.feed_id,
         created_by=current_user.id,
         expires_at=expires_at
     )
-    
+
     db.add(file_share)
-    db.commit()
-    db.refresh(file_share)
-    
+    await db.commit()
+
     share_url = f"/view/shared/{file_share.share_token}"
     return ShareResponse(
         share_token=file_share.share_token,
@@ -44,50 +56,62 @@ def create_share(share: ShareCreate, db: Session = Depends(get_db), current_user
         expires_at=file_share.expires_at
     )
 
-@router.get("/public/{share_token}", response_model=FeedWithComments)
-def get_shared_file(share_token: str, db: Session = Depends(get_db)):
-    share = db.query(FileShare).filter(
+async def shared_feed_version(share: ResolvedShare = Depends(get_active_share), db: AsyncSession = Depends(get_async_db)):
+    return await feed_version(db, share.feed_id)
+
+@router.delete("/public/{share_token}", status_code=204)
+async def revoke_share(share_token: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    """Deactivate a public share link; it stops resolving immediately, in every worker."""
+    result = await db.execute(select(FileShare).options(joinedload(FileShare.feed)).where(
         FileShare.share_token == share_token,
         FileShare.is_active == True
-    ).first()
-    
+    ))
+    share = result.scalars().first()
     if not share:
         raise HTTPException(status_code=404, detail="Share not found or inactive")
-    
-    if share.expires_at and share.expires_at < datetime.now(datetime.timezone.utc):
-        raise HTTPException(status_code=410, detail="Share link has expired")
-    
-    
-    db_feed = db.query(Feed).options(
-        joinedload(Feed.host),
-        joinedload(Feed.comments).joinedload(Comment.user),
-    ).filter(Feed.id == share.feed_id).first()
-    
+
+    # The link's creator and the feed owner may revoke it
+    if share.created_by != current_user.id and (not share.feed or share.feed.host_id != current_user.id):
+        raise HTTPException(status_code=403, detail="Not authorized to revoke this share")
+
+    share.is_active = False
+    await db.commit()
+    await broadcast_share_change(share_token)
+
+    return None
+
+@router.get("/public/{share_token}", response_model=FeedWithComments, dependencies=[Depends(conditional(shared_feed_version))])
+async def get_shared_file(share: ResolvedShare = Depends(get_active_share), db: AsyncSession = Depends(get_async_db)):
+    db_feed = await load_feed_with_comments(db, share.feed_id)
+
     if db_feed is None:
         raise HTTPException(status_code=404, detail="Feed not found")
-    
-    # Calculate total comments
-    db_feed.comment_count = len(db_feed.comments)
-    
+
     return db_feed
 
+@router.get("/public/{share_token}/download")
+async def download_shared_file(
+    request: Request,
+    share: ResolvedShare = Depends(get_active_share),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Download the PDF behind a public share, with support for range and conditional requests."""
+    db_feed = await db.get(Feed, share.feed_id)
+    if db_feed is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
+
+    file_path = blob_path(db_feed.file_path)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return serve_file(request, file_path, db_feed.file_path, download_name(db_feed))
+
 @router.post("/public/{share_token}/comments", response_model=InvitedCommentResponse)
-def create_invited_comment(
-    share_token: str,
+async def create_invited_comment(
     comment: InvitedCommentCreate,
-    db: Session = Depends(get_db)
+    share: ResolvedShare = Depends(get_active_share),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    share = db.query(FileShare).filter(
-        FileShare.share_token == share_token,
-        FileShare.is_active == True
-    ).first()
-    
-    if not share:
-        raise HTTPException(status_code=404, detail="Share not found or inactive")
-    
-    if share.expires_at and share.expires_at < datetime.now(datetime.timezone.utc):
-        raise HTTPException(status_code=410, detail="Share link has expired")
-    
     # Create comment
     db_comment = Comment(
         feed_id=share.feed_id,
@@ -95,142 +119,271 @@ def create_invited_comment(
         commenter_name=comment.commenter_name
     )
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
-    
+    await db.commit()
+    await evict_feed_audience(db, share.feed_id)
+    await publish_comment("created", db_comment)
+
     return db_comment
-    
+
 @router.get("/public/{share_token}/comments", response_model=List[InvitedCommentResponse])
-def get_invited_comments(share_token: str, db: Session = Depends(get_db)):
-    share = db.query(FileShare).filter(
-        FileShare.share_token == share_token,
-        FileShare.is_active == True
-    ).first()
-    
-    if not share:
-        raise HTTPException(status_code=404, detail="Share not found or inactive")
-    
-    if share.expires_at and share.expires_at < datetime.now(datetime.timezone.utc):
-        raise HTTPException(status_code=410, detail="Share link has expired")
-    
-    query = db.query(Comment).options(joinedload(Comment.user))
-    
-    if share.feed_id:
-        query = query.filter(Comment.feed_id == share.feed_id)
-    
-    comments = query.order_by(Comment.updated_at.desc(), Comment.created_at.desc()).all()
-    return comments
+async def get_invited_comments(
+    response: Response,
+    cursor: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    share: ResolvedShare = Depends(get_active_share),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the comments on a shared feed, one page at a time, newest first or since a cursor."""
+    if share.feed_id is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
 
-@router.post("/user")
-def share_with_user(share: UserShareCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Share a PDF with another user by email."""
-    # Check if feed exists and user has access
-    feed = db.query(Feed).filter(Feed.id == share.feed_id).first()
+    query = select(Comment).where(Comment.feed_id == share.feed_id)
+
+    return await comment_page(db, response, query, cursor, since, limit)
+
+@router.get("/public/{share_token}/comments/stream")
+async def stream_invited_comments(share_token: str, share: ResolvedShare = Depends(get_active_share), db: AsyncSession = Depends(get_async_db)):
+    """Server-Sent Events stream of comment changes on a shared feed; it ends when the share expires or is revoked."""
+    if share.feed_id is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    # Release the connection now; the stream only rechecks the share, from the cache when it can
+    await db.close()
+    return event_stream(
+        feed_comments_channel(share.feed_id),
+        deadline=share.expires_at,
+        authorized=lambda: is_share_active(share_token),
+    )
+
+async def get_shareable_feed(db: AsyncSession, feed_id: int, current_user: User):
+    """The feed, provided the user may share it: its owner or an active recipient."""
+    feed = await db.get(Feed, feed_id)
     if not feed:
         raise HTTPException(status_code=404, detail="Feed not found")
-    
-    # Check if current user is the owner or already has access
+
     if feed.host_id != current_user.id:
         # Check if the feed is shared with the current user
-        is_shared_with_me = db.query(UserShare).filter(
-            UserShare.feed_id == share.feed_id,
+        result = await db.execute(select(UserShare.id).where(
+            UserShare.feed_id == feed_id,
             UserShare.shared_with_id == current_user.id,
             UserShare.is_active == True
-        ).first()
-        
-        if not is_shared_with_me:
+        ))
+        if result.first() is None:
             raise HTTPException(status_code=403, detail="Not authorized to share this feed")
-    
-    # Find the user to share with
-    target_user = db.query(User).filter(User.email == share.email).first()
-    if not target_user:
+
+    return feed
+
+
+async def share_feed_with(db: AsyncSession, feed_id: int, emails: List[str], current_user: User):
+    """Share a feed with users by email, returning a result per email in request order.
+
+    Users and their existing shares are found with one query and the new
+    shares are inserted in one batch, however many emails there are.
+    """
+    emails = list(dict.fromkeys(emails))
+    result = await db.execute(
+        select(User.id, User.email, UserShare.id).outerjoin(
+            UserShare,
+            and_(
+                UserShare.shared_with_id == User.id,
+                UserShare.feed_id == feed_id,
+                UserShare.is_active == True
+            )
+        ).where(User.email.in_(emails))
+    )
+    users = {email: (user_id, share_id) for user_id, email, share_id in result.all()}
+
+    recipients = {user_id for user_id, share_id in users.values() if share_id is None}
+    new_shares = {}
+    if recipients:
+        # Core insert, so the rows go in one batch rather than one statement each
+        result = await db.execute(
+            insert(UserShare).returning(UserShare.shared_with_id, UserShare.id),
+            [
+                {"feed_id": feed_id, "shared_by_id": current_user.id, "shared_with_id": user_id}
+                for user_id in recipients
+            ]
+        )
+        new_shares = dict(result.all())
+        await db.commit()
+        await response_cache.evict(recipients)
+
+    results = []
+    for email in emails:
+        if email not in users:
+            results.append({"email": email, "status": "user_not_found"})
+        elif users[email][0] in new_shares:
+            results.append({"email": email, "status": "shared", "share_id": new_shares[users[email][0]]})
+        else:
+            results.append({"email": email, "status": "already_shared", "share_id": users[email][1]})
+    return results
+
+
+@router.post("/user")
+async def share_with_user(share: UserShareCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    """Share a PDF with another user by email."""
+    await get_shareable_feed(db, share.feed_id, current_user)
+
+    (result,) = await share_feed_with(db, share.feed_id, [share.email], current_user)
+    if result["status"] == "user_not_found":
         raise HTTPException(status_code=404, detail="User with this email not found")
-    
-    # Check if already shared with this user
-    existing_share = db.query(UserShare).filter(
-        UserShare.feed_id == share.feed_id,
-        UserShare.shared_with_id == target_user.id,
-        UserShare.is_active == True
-    ).first()
-    
-    if existing_share:
+    if result["status"] == "already_shared":
         raise HTTPException(status_code=400, detail="Feed already shared with this user")
-    
-    # Create the user share
-    user_share = UserShare(
-        feed_id=share.feed_id,
-        shared_by_id=current_user.id,
-        shared_with_id=target_user.id
-    )
-    
-    db.add(user_share)
-    db.commit()
-    db.refresh(user_share)
-    
+
     return {
             "success": True,
             "message": "PDF Shared Successfully"
         }
 
 
-@router.get("/user", response_model=List[FeedWithComments])
-def get_shared_with_me(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Get all feeds shared with the current user."""
-    shared_feeds = db.query(Feed).join(
+@router.post("/user/bulk", response_model=List[BulkUserShareResult])
+async def bulk_share_with_users(request: BulkUserShareRequest, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    """Share a PDF with many users by email, with a result per email.
+
+    Unknown emails and users who already have the feed are reported rather
+    than failing the request.
+    """
+    await get_shareable_feed(db, request.feed_id, current_user)
+    return await share_feed_with(db, request.feed_id, request.emails, current_user)
+
+
+@router.post("/user/bulk/revoke", response_model=List[BulkUserShareResult])
+async def bulk_revoke_user_shares(request: BulkUserShareRequest, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    """Revoke a PDF's shares with many users by email, with a result per email.
+
+    As with single revocation, the feed owner may revoke any share and
+    other users only the shares they granted or received. Shares are found
+    with one query and deactivated with one update.
+    """
+    feed = await db.get(Feed, request.feed_id)
+    if not feed:
+        raise HTTPException(status_code=404, detail="Feed not found")
+
+    emails = list(dict.fromkeys(request.emails))
+    result = await db.execute(
+        select(User.email, UserShare).outerjoin(
+            UserShare,
+            and_(
+                UserShare.shared_with_id == User.id,
+                UserShare.feed_id == request.feed_id,
+                UserShare.is_active == True
+            )
+        ).where(User.email.in_(emails))
+    )
+    shares = {}
+    for email, share in result.all():
+        shares.setdefault(email, [])
+        if share is not None:
+            shares[email].append(share)
+
+    def may_revoke(share):
+        return current_user.id in (feed.host_id, share.shared_by_id, share.shared_with_id)
+
+    results = []
+    revoked = []
+    for email in emails:
+        if email not in shares:
+            results.append({"email": email, "status": "user_not_found"})
+        elif not shares[email]:
+            results.append({"email": email, "status": "not_shared"})
+        elif not any(may_revoke(share) for share in shares[email]):
+            results.append({"email": email, "status": "not_authorized"})
+        else:
+            email_revoked = [share for share in shares[email] if may_revoke(share)]
+            revoked.extend(email_revoked)
+            results.append({"email": email, "status": "revoked", "share_id": email_revoked[0].id})
+
+    if revoked:
+        # Deactivate the shares instead of deleting, as for single revocation
+        await db.execute(
+            update(UserShare).where(UserShare.id.in_([share.id for share in revoked])).values(is_active=False)
+        )
+        removals = []
+        for share in revoked:
+            removals += tombstones("share", share.id, feed_id=feed.id, users=[share.shared_by_id, share.shared_with_id])
+            # The feed leaves the recipient's listing
+            if share.shared_with_id != feed.host_id:
+                removals += tombstones("feed", feed.id, feed_id=feed.id, users=[share.shared_with_id])
+        await record_tombstones(db, removals)
+        await db.commit()
+        await response_cache.evict(share.shared_with_id for share in revoked)
+
+    return results
+
+
+@router.get("/user", response_model=List[FeedSummary])
+async def get_shared_with_me(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get feeds shared with the current user as summaries, one page at a time."""
+    cache_key = f"shared:{cursor or ''}:{limit}"
+    cached, generation = await response_cache.get(current_user.id, cache_key, NEXT_CURSOR_HEADER)
+    if cached is not None:
+        return cached
+
+    shared_query = select(Feed).join(
         UserShare, Feed.id == UserShare.feed_id
-    ).options(
-        joinedload(Feed.host),
-        joinedload(Feed.comments).joinedload(Comment.user)
-    ).filter(
+    ).where(
         UserShare.shared_with_id == current_user.id,
         UserShare.is_active == True
-    ).all()
-    
-    # Calculate total comments for each feed
-    for feed in shared_feeds:
-        feed.comment_count = len(feed.comments)
-    
-    return shared_feeds
+    )
+
+    rows, next_cursor = await paginate(
+        db, with_comment_stats(shared_query), Feed.updated_at, Feed.id, cursor, limit
+    )
+
+    return await response_cache.store(
+        current_user.id, cache_key, generation, List[FeedSummary], to_summaries(rows), NEXT_CURSOR_HEADER, next_cursor
+    )
 
 
 @router.delete("/user/{share_id}", status_code=204)
-def remove_user_share(share_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def remove_user_share(share_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """Remove a user share (unshare with a user)."""
-    share = db.query(UserShare).filter(UserShare.id == share_id).first()
+    share = await db.get(UserShare, share_id)
     if not share:
         raise HTTPException(status_code=404, detail="Share not found")
-    
+
     # Check if current user is authorized to remove this share
     if share.shared_by_id != current_user.id and share.shared_with_id != current_user.id:
         # Also check if the current user is the owner of the feed
-        feed = db.query(Feed).filter(Feed.id == share.feed_id).first()
+        feed = await db.get(Feed, share.feed_id)
         if not feed or feed.host_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized to remove this share")
-    
+
     # Deactivate the share instead of deleting
     share.is_active = False
-    db.commit()
-    
+    await add_tombstones(db, "share", share.id, feed_id=share.feed_id, users=[share.shared_by_id, share.shared_with_id])
+    # The feed leaves the recipient's listing
+    feed = await db.get(Feed, share.feed_id)
+    if feed is not None and feed.host_id != share.shared_with_id:
+        await add_tombstones(db, "feed", share.feed_id, feed_id=share.feed_id, users=[share.shared_with_id])
+    await db.commit()
+    await response_cache.evict([share.shared_with_id])
+
     return None
 
 @router.get("/user/feed/{feed_id}", response_model=List[UserShareResponse])
-def get_feed_shared_users(feed_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_feed_shared_users(feed_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """Get all users who have been shared with a specific PDF."""
     # Check if the current user is the owner of the feed
-    feed = db.query(Feed).filter(Feed.id == feed_id).first()
+    feed = await db.get(Feed, feed_id)
     if not feed:
         raise HTTPException(status_code=404, detail="Feed not found")
-    
+
     if feed.host_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view this information")
-    
+
     # Get all users who have been shared with this feed
-    shares = db.query(UserShare).options(
+    result = await db.execute(select(UserShare).options(
         joinedload(UserShare.shared_with_user),
         joinedload(UserShare.shared_by_user)
-    ).filter(
+    ).where(
         UserShare.feed_id == feed_id,
         UserShare.is_active == True
-    ).all()
-    
-    return shares
\ No newline at end of file
+    ))
+
+    return result.scalars().all()
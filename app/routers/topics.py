@@ -1,46 +1,54 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from ..schemas.schemas import Topic, TopicCreate
 from ..models.models import Topic as TopicModel, User
-from ..database.database import get_db
+from ..database.database import get_async_db
 from ..auth.auth import get_current_active_user
+from ..conditional.conditional import Version, conditional
 
 router = APIRouter(prefix="/topics", tags=["topics"])
 
 
-@router.get("/", response_model=List[Topic])
-async def get_topics(db: Session = Depends(get_db)):
+async def topics_version(db: AsyncSession = Depends(get_async_db)):
+    """Version of the topic listing; topics are only ever added."""
+    topic_count, last_topic_id = (await db.execute(select(func.count(TopicModel.id), func.max(TopicModel.id)))).one()
+    return Version(key=(topic_count, last_topic_id))
+
+
+@router.get("/", response_model=List[Topic], dependencies=[Depends(conditional(topics_version))])
+async def get_topics(db: AsyncSession = Depends(get_async_db)):
     """Get all topics."""
-    topics = db.query(TopicModel).all()
-    return topics
+    result = await db.execute(select(TopicModel))
+    return result.scalars().all()
 
 
 @router.post("/", response_model=Topic, status_code=status.HTTP_201_CREATED)
 async def create_topic(
     topic: TopicCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Create a new topic."""
     # Check if topic already exists
-    db_topic = db.query(TopicModel).filter(TopicModel.topic == topic.topic).first()
+    result = await db.execute(select(TopicModel).where(TopicModel.topic == topic.topic))
+    db_topic = result.scalars().first()
     if db_topic:
         return db_topic
     
     # Create new topic
     db_topic = TopicModel(topic=topic.topic)
     db.add(db_topic)
-    db.commit()
-    db.refresh(db_topic)
+    await db.commit()
     return db_topic
 
 
 @router.get("/{topic_id}", response_model=Topic)
-async def get_topic(topic_id: int, db: Session = Depends(get_db)):
+async def get_topic(topic_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific topic by ID."""
-    db_topic = db.query(TopicModel).filter(TopicModel.id == topic_id).first()
+    db_topic = await db.get(TopicModel, topic_id)
     if db_topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
     return db_topic 
\ No newline at end of file
@@ -1,62 +1,154 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, func
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from ..schemas.schemas import User, UserUpdate, UserWithDetails
-from ..models.models import User as UserModel
-from ..database.database import get_db
-from ..auth.auth import get_current_active_user, get_password_hash
+from ..schemas.schemas import User, UserUpdate, UserWithDetails, FeedSummary, Comment
+from ..models.models import User as UserModel, Feed, Comment as CommentModel
+from ..database.database import get_async_db
+from ..auth.auth import get_current_active_user, get_password_hash, broadcast_user_change
+from ..cache.responses import evict_feed_audience
+from ..pagination.pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from .feeds import with_comment_stats, to_summaries
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Feeds and comments embedded in a user's details, most recent first
+EMBEDDED_ITEMS = 10
+
+
+async def get_user_or_404(db: AsyncSession, user_id: int):
+    db_user = await db.get(UserModel, user_id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
+
 
 @router.get("/", response_model=List[User])
 async def get_users(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_active_user),
 ):
     """Get all users."""
-    users = db.query(UserModel).all()
-    return users
+    result = await db.execute(select(UserModel))
+    return result.scalars().all()
 
 
 @router.get("/{user_id}", response_model=UserWithDetails)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Get a user by ID with their feeds and comments."""
-    db_user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if db_user is None:
+    """Get a user by ID with their most recent feeds and comments.
+
+    Runs a fixed number of queries however much the user has posted; the
+    full lists are paginated by /users/{user_id}/feeds and /comments.
+    """
+    result = await db.execute(
+        select(
+            UserModel,
+            select(func.count(Feed.id)).where(Feed.host_id == UserModel.id).scalar_subquery(),
+            select(func.count(CommentModel.id)).where(CommentModel.user_id == UserModel.id).scalar_subquery(),
+        ).where(UserModel.id == user_id)
+    )
+    row = result.first()
+    if row is None:
         raise HTTPException(status_code=404, detail="User not found")
+    db_user, feed_count, comment_count = row
+    db_user.feed_count = feed_count
+    db_user.comment_count = comment_count
+
+    result = await db.execute(
+        with_comment_stats(select(Feed).where(Feed.host_id == user_id))
+        .order_by(Feed.updated_at.desc(), Feed.id.desc())
+        .limit(EMBEDDED_ITEMS)
+    )
+    set_committed_value(db_user, "feeds", to_summaries(result.all()))
+
+    result = await db.execute(
+        select(CommentModel).where(CommentModel.user_id == user_id)
+        .order_by(CommentModel.created_at.desc(), CommentModel.id.desc())
+        .limit(EMBEDDED_ITEMS)
+    )
+    set_committed_value(db_user, "comments", result.scalars().all())
+
     return db_user
 
 
+@router.get("/{user_id}/feeds", response_model=List[FeedSummary])
+async def get_user_feeds(
+    user_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get a user's feeds as summaries, newest first, one page at a time."""
+    await get_user_or_404(db, user_id)
+
+    rows, next_cursor = await paginate(
+        db, with_comment_stats(select(Feed).where(Feed.host_id == user_id)), Feed.updated_at, Feed.id, cursor, limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return to_summaries(rows)
+
+
+@router.get("/{user_id}/comments", response_model=List[Comment])
+async def get_user_comments(
+    user_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get a user's comments, newest first, one page at a time."""
+    await get_user_or_404(db, user_id)
+
+    comments, next_cursor = await paginate(
+        db, select(CommentModel).where(CommentModel.user_id == user_id),
+        CommentModel.created_at, CommentModel.id, cursor, limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return comments
+
+
 @router.put("/profile", response_model=User)
 async def update_user(
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_active_user),
 ):
     """Update the current user's profile."""
     # Check if username already exists if changing username
     if user_update.username and user_update.username != current_user.username:
-        existing_user = db.query(UserModel).filter(UserModel.username == user_update.username.lower()).first()
+        result = await db.execute(select(UserModel).where(UserModel.username == user_update.username.lower()))
+        existing_user = result.scalars().first()
         if existing_user:
             raise HTTPException(status_code=400, detail="Username already taken")
         current_user.username = user_update.username.lower()
     
     # Check if email already exists if changing email
     if user_update.email and user_update.email != current_user.email:
-        existing_email = db.query(UserModel).filter(UserModel.email == user_update.email).first()
+        result = await db.execute(select(UserModel).where(UserModel.email == user_update.email))
+        existing_email = result.scalars().first()
         if existing_email:
             raise HTTPException(status_code=400, detail="Email already registered")
         current_user.email = user_update.email
     
     # Update password if provided
     if user_update.password:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        current_user.hashed_password = await get_password_hash(user_update.password)
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await broadcast_user_change(current_user.id)
+
+    # Listings show the owner's username on each of their feeds
+    result = await db.execute(select(Feed.id).where(Feed.host_id == current_user.id))
+    await evict_feed_audience(db, *result.scalars().all(), users=[current_user.id])
+    await db.refresh(current_user)
     return current_user 
\ No newline at end of file
@@ -101,14 +101,65 @@ class Feed(FeedBase):
     comment_count: Optional[int] = 0
 
 
+class FeedSummary(Feed):
+    created_at: datetime
+    updated_at: datetime
+    last_activity_at: Optional[datetime] = None
+
+
+class PageMatch(BaseModel):
+    page_number: int
+    snippet: str
+
+
+class FeedSearchResult(FeedSummary):
+    matches: List[PageMatch] = []
+
+
 # Response models with relationships
 class FeedWithComments(Feed):
     comments: List[Comment] = []
 
 
+# Delta sync schemas
+class FeedComment(Comment):
+    feed_id: int
+
+
+class ShareGrant(BaseModel):
+    id: int
+    feed_id: int
+    shared_by_id: int
+    shared_with_id: int
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class Deletion(BaseModel):
+    entity: str
+    entity_id: int
+    deleted_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class FeedChanges(BaseModel):
+    cursor: str
+    feeds: List[FeedSummary] = []
+    comments: List[FeedComment] = []
+    shares: List[ShareGrant] = []
+    deleted: List[Deletion] = []
+
+
 class UserWithDetails(User):
+    # The most recent feeds and comments; the rest are served by /users/{id}/feeds and /comments
     feeds: List[Feed] = []
-    comments: List[Comment] = [] 
+    comments: List[Comment] = []
+    feed_count: int = 0
+    comment_count: int = 0
 
 
 # Token schemas
@@ -123,6 +174,19 @@ class TokenData(BaseModel):
     email: Optional[str] = None
 
 
+# Job schemas
+class JobStatus(BaseModel):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    max_attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
 # Share schemas
 class ShareCreate(BaseModel):
     feed_id: int
@@ -141,6 +205,23 @@ class UserShareCreate(BaseModel):
     email: EmailStr
 
 
+# Most emails accepted by one bulk share or revoke request
+BULK_SHARE_MAX_EMAILS = 200
+
+
+class BulkUserShareRequest(BaseModel):
+    feed_id: int
+    emails: List[EmailStr] = Field(..., min_length=1, max_length=BULK_SHARE_MAX_EMAILS)
+
+
+class BulkUserShareResult(BaseModel):
+    email: str
+    # shared, already_shared or user_not_found when sharing;
+    # revoked, not_shared, not_authorized or user_not_found when revoking
+    status: str
+    share_id: Optional[int] = None
+
+
 class UserShareResponse(BaseModel):
     id: int
     feed_id: int
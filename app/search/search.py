@@ -0,0 +1,283 @@
+from sqlalchemy import text, func, literal, literal_column, or_, false, select, insert, delete, bindparam, Integer, Float
+from sqlalchemy.ext.asyncio import AsyncSession
+import re
+
+from ..models.models import Feed, Topic, FeedPage
+from ..pagination.pagination import encode_cursor, rank_filter
+
+# Text search configuration used for PostgreSQL tsvector/tsquery
+SEARCH_CONFIG = "english"
+
+# Name of the SQLite FTS5 table mirroring the searchable feed columns
+SQLITE_FTS_TABLE = "feed_search"
+
+# Weighted document for a feed row: title outranks description, which outranks topic
+PG_DOCUMENT = f"""
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(feeds.title, '')), 'A') ||
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(feeds.description, '')), 'B') ||
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(
+        (SELECT topics.topic FROM topics WHERE topics.id = feeds.topic_id), ''
+    )), 'C')
+"""
+
+# SQLite FTS5 table holding extracted page text, keyed by feed_pages.id
+SQLITE_PAGE_FTS_TABLE = "feed_page_search"
+
+# Content search limits and snippet formatting
+MAX_MATCHES_PER_FEED = 5
+SNIPPET_WORDS = 16
+SNIPPET_START = "["
+SNIPPET_END = "]"
+
+SQLITE_DOCUMENT = f"""
+    INSERT INTO {SQLITE_FTS_TABLE} (rowid, title, description, topic)
+    SELECT feeds.id, coalesce(feeds.title, ''), coalesce(feeds.description, ''), coalesce(topics.topic, '')
+    FROM feeds LEFT JOIN topics ON topics.id = feeds.topic_id
+"""
+
+
+def _dialect(bind):
+    return bind.dialect.name
+
+
+def _terms(q: str):
+    """Split a user query into plain search terms."""
+    return re.findall(r"\w+", q or "")
+
+
+def init_search_index(engine):
+    """Create the search index structures for the engine's backend and backfill missing rows."""
+    dialect = _dialect(engine)
+    with engine.begin() as conn:
+        if dialect == "postgresql":
+            conn.execute(text("ALTER TABLE feeds ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_feeds_search_vector ON feeds USING GIN (search_vector)"
+            ))
+            conn.execute(text(f"UPDATE feeds SET search_vector = {PG_DOCUMENT} WHERE search_vector IS NULL"))
+            conn.execute(text("ALTER TABLE feed_pages ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_feed_pages_search_vector ON feed_pages USING GIN (search_vector)"
+            ))
+            conn.execute(text(
+                f"UPDATE feed_pages SET search_vector = to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')) "
+                "WHERE search_vector IS NULL"
+            ))
+        elif dialect == "sqlite":
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} "
+                "USING fts5(title, description, topic, tokenize = 'porter unicode61')"
+            ))
+            conn.execute(text(
+                f"{SQLITE_DOCUMENT} WHERE feeds.id NOT IN (SELECT rowid FROM {SQLITE_FTS_TABLE})"
+            ))
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_PAGE_FTS_TABLE} "
+                "USING fts5(text, tokenize = 'porter unicode61')"
+            ))
+            conn.execute(text(
+                f"INSERT INTO {SQLITE_PAGE_FTS_TABLE} (rowid, text) SELECT id, coalesce(text, '') FROM feed_pages "
+                f"WHERE id NOT IN (SELECT rowid FROM {SQLITE_PAGE_FTS_TABLE})"
+            ))
+
+
+async def index_feed(db: AsyncSession, feed_id: int):
+    """Refresh the search index entry for a feed after it was created or changed."""
+    dialect = _dialect(db.bind)
+    if dialect == "postgresql":
+        await db.execute(text(f"UPDATE feeds SET search_vector = {PG_DOCUMENT} WHERE feeds.id = :feed_id"), {"feed_id": feed_id})
+    elif dialect == "sqlite":
+        await db.execute(text(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = :feed_id"), {"feed_id": feed_id})
+        await db.execute(text(f"{SQLITE_DOCUMENT} WHERE feeds.id = :feed_id"), {"feed_id": feed_id})
+
+
+async def remove_feed(db: AsyncSession, feed_id: int):
+    """Drop a feed and its page text from the search index before the feed itself is deleted."""
+    if _dialect(db.bind) == "sqlite":
+        await db.execute(text(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = :feed_id"), {"feed_id": feed_id})
+    await _remove_pages(db, feed_id)
+
+
+async def _remove_pages(db: AsyncSession, feed_id: int):
+    if _dialect(db.bind) == "sqlite":
+        await db.execute(text(
+            f"DELETE FROM {SQLITE_PAGE_FTS_TABLE} WHERE rowid IN (SELECT id FROM feed_pages WHERE feed_id = :feed_id)"
+        ), {"feed_id": feed_id})
+    await db.execute(delete(FeedPage).where(FeedPage.feed_id == feed_id))
+
+
+async def store_pages(db: AsyncSession, feed_id: int, pages):
+    """Replace the extracted text of a feed's pages and index it for content search."""
+    await _remove_pages(db, feed_id)
+    if not pages:
+        return
+    await db.execute(insert(FeedPage), [
+        # PostgreSQL text cannot hold NUL characters
+        {"feed_id": feed_id, "page_number": number, "text": (page_text or "").replace("\x00", "")}
+        for number, page_text in enumerate(pages, start=1)
+    ])
+
+    dialect = _dialect(db.bind)
+    if dialect == "postgresql":
+        await db.execute(text(
+            f"UPDATE feed_pages SET search_vector = to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')) "
+            "WHERE feed_id = :feed_id"
+        ), {"feed_id": feed_id})
+    elif dialect == "sqlite":
+        await db.execute(text(
+            f"INSERT INTO {SQLITE_PAGE_FTS_TABLE} (rowid, text) "
+            "SELECT id, coalesce(text, '') FROM feed_pages WHERE feed_id = :feed_id"
+        ), {"feed_id": feed_id})
+
+
+def apply_search(db: AsyncSession, stmt, q: str):
+    """Restrict a feed select to matches for q and return it with their relevance score.
+
+    Lower scores rank higher; order by (score, Feed.id descending), e.g.
+    with paginate_ranked. Every term is matched as a prefix and all terms
+    must match. Backends without a search index fall back to substring
+    matching, where every match scores the same.
+    """
+    terms = _terms(q)
+    if not terms:
+        return stmt.where(false()), literal(0.0)
+
+    dialect = _dialect(db.bind)
+    if dialect == "postgresql":
+        ts_query = func.to_tsquery(
+            literal_column(f"'{SEARCH_CONFIG}'::regconfig"), " & ".join(f"{term}:*" for term in terms)
+        )
+        document = literal_column("feeds.search_vector")
+        # Negated so that, as with bm25, lower scores rank higher
+        return stmt.where(document.op("@@")(ts_query)), -func.ts_rank_cd(document, ts_query)
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        matches = text(
+            f"SELECT rowid AS feed_id, bm25({SQLITE_FTS_TABLE}, 10.0, 5.0, 2.0) AS score "
+            f"FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH :match"
+        ).bindparams(match=match).columns(feed_id=Integer, score=Float).subquery("matches")
+        # bm25 scores are negative, with the best match lowest
+        return stmt.join(matches, matches.c.feed_id == Feed.id), matches.c.score
+
+    for term in terms:
+        stmt = stmt.where(
+            or_(
+                Feed.title.icontains(term),
+                Feed.description.icontains(term),
+                Feed.topic.has(Topic.topic.icontains(term))
+            )
+        )
+    return stmt, literal(0.0)
+
+
+async def search_pages(db: AsyncSession, feed_ids, q: str, limit: int, cursor: str = None):
+    """Find pages of the given feeds whose extracted text matches q.
+
+    feed_ids is a select of the feed ids the caller may see. Returns up to
+    limit feed ids ordered by their best page match, starting after cursor,
+    with a mapping of feed id to its best matching (page_number, snippet)
+    pairs and the cursor for the next page of feeds, or None. Feeds are
+    ranked and limited before any pages are fetched, so a document with
+    many matching pages cannot crowd out other feeds.
+    """
+    terms = _terms(q)
+    dialect = _dialect(db.bind)
+    if not terms or dialect not in ("postgresql", "sqlite"):
+        return [], {}, None
+
+    if dialect == "postgresql":
+        ts_query = func.to_tsquery(
+            literal_column(f"'{SEARCH_CONFIG}'::regconfig"), " & ".join(f"{term}:*" for term in terms)
+        )
+        document = literal_column("feed_pages.search_vector")
+        # Negated so that, as with bm25, lower scores rank higher
+        hits = select(
+            FeedPage.id.label("page_id"), FeedPage.feed_id, FeedPage.page_number,
+            (-func.ts_rank_cd(document, ts_query)).label("score"),
+        ).where(document.op("@@")(ts_query))
+    else:
+        match = " ".join(f'"{term}"*' for term in terms)
+        matches = text(
+            f"SELECT rowid AS page_id, bm25({SQLITE_PAGE_FTS_TABLE}) AS score "
+            f"FROM {SQLITE_PAGE_FTS_TABLE} WHERE {SQLITE_PAGE_FTS_TABLE} MATCH :match"
+        # Materialized, since bm25 cannot be evaluated once merged into the grouped query
+        ).bindparams(match=match).columns(page_id=Integer, score=Float).cte("page_matches").prefix_with("MATERIALIZED")
+        hits = select(
+            FeedPage.id.label("page_id"), FeedPage.feed_id, FeedPage.page_number, matches.c.score,
+        ).join(matches, matches.c.page_id == FeedPage.id)
+
+    # The visible feeds with the best page matches, each ranked by its best page
+    visible_hits = hits.where(FeedPage.feed_id.in_(feed_ids)).subquery("hits")
+    best = select(visible_hits.c.feed_id, func.min(visible_hits.c.score).label("score")).group_by(
+        visible_hits.c.feed_id
+    ).subquery("best")
+    ranked_feeds = select(best.c.feed_id, best.c.score)
+    if cursor:
+        ranked_feeds = ranked_feeds.where(rank_filter(best.c.score, best.c.feed_id, cursor))
+    ranked_feeds = (await db.execute(
+        ranked_feeds.order_by(best.c.score, best.c.feed_id.desc()).limit(limit + 1)
+    )).all()
+    next_cursor = None
+    if len(ranked_feeds) > limit:
+        ranked_feeds = ranked_feeds[:limit]
+        next_cursor = encode_cursor(ranked_feeds[-1].score, ranked_feeds[-1].feed_id)
+    ordered_feeds = [feed_id for feed_id, _ in ranked_feeds]
+    if not ordered_feeds:
+        return [], {}, None
+
+    # Then the best few pages of those feeds only
+    chosen_hits = hits.where(FeedPage.feed_id.in_(ordered_feeds)).subquery("chosen_hits")
+    ranked = select(
+        chosen_hits.c.page_id,
+        chosen_hits.c.feed_id,
+        chosen_hits.c.page_number,
+        func.row_number().over(
+            partition_by=chosen_hits.c.feed_id, order_by=(chosen_hits.c.score, chosen_hits.c.page_id)
+        ).label("position"),
+    ).subquery("ranked_pages")
+    rows = (await db.execute(
+        select(ranked.c.page_id, ranked.c.feed_id, ranked.c.page_number).where(
+            ranked.c.position <= MAX_MATCHES_PER_FEED
+        ).order_by(ranked.c.feed_id, ranked.c.position)
+    )).all()
+    kept_pages = {feed_id: [] for feed_id in ordered_feeds}
+    for page_id, feed_id, page_number in rows:
+        kept_pages[feed_id].append((page_id, page_number))
+
+    page_ids = [page_id for page_id, _, _ in rows]
+    snippets = await _snippets(db, dialect, page_ids, terms)
+    matches_by_feed = {
+        feed_id: [(page_number, snippets.get(page_id, "")) for page_id, page_number in pages]
+        for feed_id, pages in kept_pages.items()
+    }
+    return ordered_feeds, matches_by_feed, next_cursor
+
+
+async def _snippets(db: AsyncSession, dialect: str, page_ids, terms):
+    """Build highlighted snippets for the matched pages only."""
+    if not page_ids:
+        return {}
+    if dialect == "postgresql":
+        statement = text(
+            f"SELECT id, ts_headline('{SEARCH_CONFIG}', coalesce(text, ''), "
+            f"to_tsquery('{SEARCH_CONFIG}', :query), :options) "
+            "FROM feed_pages WHERE id IN :page_ids"
+        ).bindparams(bindparam("page_ids", expanding=True))
+        params = {
+            "query": " & ".join(f"{term}:*" for term in terms),
+            "options": f"StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords={SNIPPET_WORDS}, MinWords=5",
+            "page_ids": page_ids,
+        }
+    else:
+        statement = text(
+            f"SELECT rowid, snippet({SQLITE_PAGE_FTS_TABLE}, 0, :start, :end, '…', {SNIPPET_WORDS}) "
+            f"FROM {SQLITE_PAGE_FTS_TABLE} WHERE {SQLITE_PAGE_FTS_TABLE} MATCH :match AND rowid IN :page_ids"
+        ).bindparams(bindparam("page_ids", expanding=True))
+        params = {
+            "start": SNIPPET_START,
+            "end": SNIPPET_END,
+            "match": " ".join(f'"{term}"*' for term in terms),
+            "page_ids": page_ids,
+        }
+    return dict((await db.execute(statement, params)).all())
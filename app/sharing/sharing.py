@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from datetime import datetime
+from fastapi import Depends, HTTPException
+from sqlalchemy import select, event
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import logging
+import os
+from dotenv import load_dotenv
+
+from ..cache.cache import TTLCache, MISSING, on_commit
+from ..database.database import get_async_db, AsyncSessionLocal
+from ..models.models import FileShare, utcnow
+from ..realtime.realtime import bus
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SHARE_CACHE_TTL_SECONDS = int(os.getenv("SHARE_CACHE_TTL_SECONDS", "300"))
+# Unknown tokens are remembered briefly so scanning does not reach the database
+SHARE_NEGATIVE_CACHE_TTL_SECONDS = int(os.getenv("SHARE_NEGATIVE_CACHE_TTL_SECONDS", "60"))
+SHARE_CACHE_MAX_ENTRIES = int(os.getenv("SHARE_CACHE_MAX_ENTRIES", "10000"))
+
+# Bus channel carrying the tokens of revoked shares to every worker
+SHARE_INVALIDATION_CHANNEL = "shares:invalidated"
+
+
+@dataclass(frozen=True)
+class ResolvedShare:
+    """The parts of an active public share needed to serve it."""
+    id: int
+    feed_id: Optional[int]
+    expires_at: Optional[datetime]
+
+    @property
+    def expired(self):
+        return self.expires_at is not None and self.expires_at <= utcnow()
+
+
+# Active shares by token; None marks a token known not to resolve
+share_cache = TTLCache(maxsize=SHARE_CACHE_MAX_ENTRIES, ttl=SHARE_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(FileShare, "after_insert")
+@event.listens_for(FileShare, "after_update")
+@event.listens_for(FileShare, "after_delete")
+def _invalidate_share(mapper, connection, target):
+    """Drop a cached share once any change to it is committed, e.g. deactivation."""
+    token = target.share_token
+    on_commit(Session.object_session(target), lambda: share_cache.delete(token))
+
+
+async def broadcast_share_change(share_token: str):
+    """Drop a share from every worker's cache. Call once the change is committed.
+
+    Other workers hear of it through the realtime bus, so with more than one
+    worker this needs REALTIME_BUS_URL; without it they keep serving the
+    cached share until it expires. Failures are logged, never raised.
+    """
+    share_cache.delete(share_token)
+    try:
+        await bus.publish(SHARE_INVALIDATION_CHANNEL, share_token)
+    except Exception:
+        logger.exception("Broadcasting share invalidation failed")
+
+
+async def listen_for_share_changes():
+    """Apply other workers' share invalidations to this worker's cache until cancelled."""
+    while True:
+        async with bus.subscribe(SHARE_INVALIDATION_CHANNEL) as subscription:
+            while not (subscription.overflowed and subscription.queue.empty()):
+                share_cache.delete(await subscription.queue.get())
+        # Invalidations were dropped; forget every share rather than serve a revoked one
+        share_cache.clear()
+
+
+async def resolve_share(db: AsyncSession, share_token: str):
+    """Get the active share for a token, or None, querying at most once per cache lifetime."""
+    share = share_cache.get(share_token)
+    if share is MISSING:
+        result = await db.execute(
+            select(FileShare.id, FileShare.feed_id, FileShare.expires_at).where(
+                FileShare.share_token == share_token,
+                FileShare.is_active == True
+            )
+        )
+        row = result.first()
+        if row is None:
+            share_cache.set(share_token, None, ttl=SHARE_NEGATIVE_CACHE_TTL_SECONDS)
+            return None
+        share = ResolvedShare(*row)
+        share_cache.set(share_token, share)
+    return share
+
+
+async def is_share_active(share_token: str):
+    """Whether a token still resolves to an unexpired share, opening a session only on a cache miss.
+
+    For long-lived responses that no longer hold a session, such as event
+    streams; revocation evicts the cached share, so the next check sees it.
+    """
+    share = share_cache.get(share_token)
+    if share is MISSING:
+        async with AsyncSessionLocal() as db:
+            share = await resolve_share(db, share_token)
+    return share is not None and not share.expired
+
+
+async def get_active_share(share_token: str, db: AsyncSession = Depends(get_async_db)):
+    """Resolve the share token in the path, rejecting unknown, inactive and expired shares."""
+    share = await resolve_share(db, share_token)
+
+    if share is None:
+        raise HTTPException(status_code=404, detail="Share not found or inactive")
+
+    if share.expired:
+        raise HTTPException(status_code=410, detail="Share link has expired")
+
+    return share
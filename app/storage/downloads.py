@@ -0,0 +1,168 @@
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from email.utils import formatdate, parsedate_to_datetime
+import os
+import secrets
+
+import aiofiles
+
+from .storage import is_blob_ref
+
+# Read size for streaming byte ranges
+RANGE_CHUNK_SIZE = 64 * 1024
+
+# Requests asking for more ranges than this get the whole file instead
+MAX_RANGES = 16
+
+# Browsers may keep a copy but must revalidate it with the ETag before use
+DOWNLOAD_CACHE_CONTROL = "private, no-cache"
+
+
+def file_etag(ref: str, stat: os.stat_result):
+    """Strong ETag for a stored file: the content hash for blobs, else mtime and size."""
+    if is_blob_ref(ref):
+        return f'"{ref}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def etag_matches(header: str, etag: str):
+    """Whether an If-None-Match / If-Range style header lists the ETag."""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def not_modified(request: Request, etag: str, mtime: float):
+    """Evaluate If-None-Match, then If-Modified-Since, for a GET of the resource."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(header: str, size: int):
+    """Parse a bytes Range header into inclusive (start, end) pairs.
+
+    Returns None when the header should be ignored and an empty list when
+    no range is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    ranges = []
+    for part in spec.split(","):
+        first, sep, last = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+            else:
+                # Suffix range: the final N bytes
+                start = max(size - int(last), 0)
+                end = size - 1
+        except ValueError:
+            return None
+        if start > end and first and last:
+            return None
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def range_applies(request: Request, etag: str, mtime: float):
+    """Honor If-Range: only serve a partial response if the validator still matches."""
+    if_range = request.headers.get("if-range")
+    if not if_range:
+        return True
+    if if_range.strip().startswith(('"', 'W/')):
+        return if_range.strip() == etag
+    try:
+        return int(mtime) <= parsedate_to_datetime(if_range).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+async def _read_ranges(path: str, ranges, boundary: str = None, media_type: str = None, size: int = None):
+    async with aiofiles.open(path, "rb") as handle:
+        for start, end in ranges:
+            if boundary:
+                yield (
+                    f"\r\n--{boundary}\r\n"
+                    f"Content-Type: {media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+                ).encode()
+            await handle.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await handle.read(min(RANGE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        if boundary:
+            yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def serve_file(request: Request, path: str, ref: str, filename: str, media_type: str = "application/pdf"):
+    """Serve a stored file with ETag/Last-Modified validators and byte-range support.
+
+    Answers 304 for matching conditional requests, 206 for satisfiable
+    single or multiple byte ranges, 416 for unsatisfiable ranges and
+    otherwise the whole file.
+    """
+    stat = os.stat(path)
+    etag = file_etag(ref, stat)
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+        "cache-control": DOWNLOAD_CACHE_CONTROL,
+    }
+
+    if not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    ranges = None
+    if range_header and range_applies(request, etag, stat.st_mtime):
+        ranges = parse_range(range_header, stat.st_size)
+
+    if ranges is None:
+        return FileResponse(path=path, filename=filename, media_type=media_type, headers=headers, stat_result=stat)
+
+    if not ranges:
+        headers["content-range"] = f"bytes */{stat.st_size}"
+        return Response(status_code=416, headers=headers)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["content-range"] = f"bytes {start}-{end}/{stat.st_size}"
+        headers["content-length"] = str(end - start + 1)
+        return StreamingResponse(_read_ranges(path, ranges), status_code=206, media_type=media_type, headers=headers)
+
+    boundary = secrets.token_hex(16)
+    body_length = len(f"\r\n--{boundary}--\r\n")
+    for start, end in ranges:
+        body_length += len(
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{stat.st_size}\r\n\r\n"
+        ) + end - start + 1
+    headers["content-length"] = str(body_length)
+    return StreamingResponse(
+        _read_ranges(path, ranges, boundary, media_type, stat.st_size),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers,
+    )
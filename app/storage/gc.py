@@ -0,0 +1,88 @@
+"""Garbage-collect the blob store.
+
+Recounts blob references from the feeds table, deletes blobs nothing
+references and removes files on disk that have no blob row. Files younger
+than the grace period are left alone so in-flight uploads are not touched.
+
+Usage:
+    python -m app.storage.gc [--dry-run] [--grace-minutes 60]
+"""
+from sqlalchemy import select, func, update, delete
+from datetime import timedelta
+import argparse
+import os
+import time
+
+from ..database.database import SessionLocal
+from ..models.models import Blob, Feed, utcnow
+from .storage import BLOB_DIR, STAGING_DIR, blob_path, is_blob_ref
+
+
+def recount_references(db):
+    """Reset every blob's reference count to the number of feeds pointing at it.
+
+    The rows stay locked until the caller's transaction ends. On PostgreSQL
+    they are locked before counting, so uploads whose increments are still
+    uncommitted finish first and their feeds are counted. SQLite's UPDATE
+    takes the database write lock, with the same effect.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(Blob.sha256).with_for_update()).all()
+    references = select(func.count(Feed.id)).where(Feed.file_path == Blob.sha256).scalar_subquery()
+    db.execute(update(Blob).values(ref_count=references))
+
+
+def collect_garbage(dry_run: bool = False, grace_seconds: int = 3600):
+    """Remove unreferenced blobs and orphaned files. Returns counts of what was removed."""
+    removed = {"blobs": 0, "orphan_files": 0, "stale_uploads": 0}
+    cutoff = time.time() - grace_seconds
+
+    with SessionLocal() as db:
+        recount_references(db)
+        # Naive UTC, as created_at is stored
+        created_before = utcnow() - timedelta(seconds=grace_seconds)
+        unreferenced = (Blob.ref_count <= 0, Blob.created_at < created_before)
+        if dry_run:
+            removed["blobs"] = len(db.execute(select(Blob.sha256).where(*unreferenced)).scalars().all())
+        else:
+            # As in collect_blob, files go before the deletes commit, while the rows are still locked
+            deleted = db.execute(delete(Blob).where(*unreferenced).returning(Blob.sha256)).scalars().all()
+            for ref in deleted:
+                if os.path.exists(blob_path(ref)):
+                    os.remove(blob_path(ref))
+            db.commit()
+            removed["blobs"] = len(deleted)
+
+        known = set(db.execute(select(Blob.sha256)).scalars().all())
+
+    for root, _, files in os.walk(BLOB_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.getmtime(path) > cutoff:
+                continue
+            if root == STAGING_DIR:
+                removed["stale_uploads"] += 1
+            elif is_blob_ref(name) and name not in known:
+                removed["orphan_files"] += 1
+            else:
+                continue
+            if not dry_run:
+                os.remove(path)
+
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report what would be removed without removing it")
+    parser.add_argument("--grace-minutes", type=int, default=60)
+    args = parser.parse_args()
+
+    removed = collect_garbage(dry_run=args.dry_run, grace_seconds=args.grace_minutes * 60)
+    prefix = "Would remove" if args.dry_run else "Removed"
+    print(f"{prefix} {removed['blobs']} unreferenced blobs, {removed['orphan_files']} orphaned files "
+          f"and {removed['stale_uploads']} stale partial uploads.")
+
+
+if __name__ == "__main__":
+    main()
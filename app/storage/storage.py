@@ -0,0 +1,166 @@
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from dataclasses import dataclass
+import contextlib
+import hashlib
+import os
+import re
+import tempfile
+
+import aiofiles
+import aiofiles.os
+from dotenv import load_dotenv
+
+from ..models.models import Blob
+from ..metrics.metrics import UPLOAD_BYTES
+
+load_dotenv()
+
+# Content-addressed blob storage, sharded by the first two byte pairs of the hash
+BLOB_DIR = os.getenv("BLOB_STORAGE_DIR", "app/media/blobs")
+STAGING_DIR = os.path.join(BLOB_DIR, "tmp")
+os.makedirs(STAGING_DIR, exist_ok=True)
+
+BLOB_REF_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# Upload limits
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE_MB", "100")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Every PDF starts with this header
+PDF_MAGIC = b"%PDF-"
+
+
+@dataclass
+class StagedUpload:
+    """An upload written to a temporary file, not yet moved into place."""
+    path: str
+    sha256: str
+    size: int
+
+
+def _too_large():
+    return HTTPException(
+        status_code=413, detail=f"File exceeds the {MAX_UPLOAD_SIZE // (1024 * 1024)} MB upload limit."
+    )
+
+
+async def stage_upload(file: UploadFile, directory: str = STAGING_DIR):
+    """Stream an upload into a temporary file in directory without blocking the event loop.
+
+    The content is hashed and counted while it is copied. Files that do not
+    start with the PDF header or exceed MAX_UPLOAD_SIZE are rejected as soon
+    as that is known and the partial file is removed.
+    """
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        raise _too_large()
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    os.close(fd)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if size == 0 and not chunk.startswith(PDF_MAGIC):
+                    raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
+                size += len(chunk)
+                if size > MAX_UPLOAD_SIZE:
+                    raise _too_large()
+                digest.update(chunk)
+                await buffer.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+    except BaseException:
+        await discard_upload(temp_path)
+        raise
+
+    UPLOAD_BYTES.inc(size)
+    return StagedUpload(path=temp_path, sha256=digest.hexdigest(), size=size)
+
+
+async def commit_upload(staged: StagedUpload, final_path: str):
+    """Atomically move a staged upload to its final path."""
+    await aiofiles.os.replace(staged.path, final_path)
+
+
+async def discard_upload(path: str):
+    """Remove a staged or committed upload, ignoring files that are already gone."""
+    with contextlib.suppress(FileNotFoundError):
+        await aiofiles.os.remove(path)
+
+
+def is_blob_ref(ref: str):
+    """Whether a stored file reference points at a blob rather than a legacy upload path."""
+    return bool(ref and BLOB_REF_PATTERN.fullmatch(ref))
+
+
+def blob_path(ref: str):
+    """Resolve a stored file reference to a path on disk."""
+    if not is_blob_ref(ref):
+        return ref
+    return os.path.join(BLOB_DIR, ref[:2], ref[2:4], ref)
+
+
+async def store_blob(db: AsyncSession, staged: StagedUpload):
+    """Add a reference to the blob holding the staged content and return its reference.
+
+    Content that is already stored only gains a reference and the staged
+    copy is dropped. The reference count change is part of the caller's
+    transaction.
+
+    The file is checked only once the blob row is written and so locked
+    until the caller commits. A collect_blob still running holds the row
+    until its file is gone, so the check never sees a file about to be
+    removed.
+    """
+    increment = update(Blob).where(Blob.sha256 == staged.sha256).values(ref_count=Blob.ref_count + 1)
+    if (await db.execute(increment)).rowcount == 0:
+        try:
+            async with db.begin_nested():
+                db.add(Blob(sha256=staged.sha256, size=staged.size, ref_count=1))
+        except IntegrityError:
+            # Another upload of the same content created the row first
+            await db.execute(increment)
+
+    path = blob_path(staged.sha256)
+    if await aiofiles.os.path.exists(path):
+        await discard_upload(staged.path)
+    else:
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        await commit_upload(staged, path)
+    return staged.sha256
+
+
+async def release_blob(db: AsyncSession, ref: str):
+    """Drop one reference to a blob as part of the caller's transaction."""
+    if is_blob_ref(ref):
+        await db.execute(
+            update(Blob).where(Blob.sha256 == ref).values(ref_count=Blob.ref_count - 1)
+        )
+
+
+async def collect_blob(db: AsyncSession, ref: str):
+    """Delete a blob once nothing references it. Call after the release is committed.
+
+    The row is deleted first, which rechecks that nothing references it and
+    locks it against uploads of the same content, and the file is removed
+    before that delete commits. An upload arriving meanwhile waits for the
+    commit, then finds neither row nor file and stores its own copy.
+
+    Returns True if the blob was removed.
+    """
+    if not is_blob_ref(ref):
+        return False
+    try:
+        result = await db.execute(delete(Blob).where(Blob.sha256 == ref, Blob.ref_count <= 0))
+        if result.rowcount:
+            await discard_upload(blob_path(ref))
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    return result.rowcount > 0
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, Optional
+import os
+from dotenv import load_dotenv
+
+from ..models.models import Tombstone, utcnow
+from ..pagination.pagination import encode_cursor, decode_cursor
+
+load_dotenv()
+
+# Changes stamped this close to a sync are sent again by the next one, covering
+# transactions that were still committing while the sync read
+SYNC_OVERLAP_SECONDS = int(os.getenv("SYNC_OVERLAP_SECONDS", "10"))
+# Most rows of one kind a sync returns; beyond that the client reloads instead
+SYNC_MAX_CHANGES = int(os.getenv("SYNC_MAX_CHANGES", "1000"))
+# Tombstones are kept this long, so older cursors can no longer be served
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+RESYNC_DETAIL = "Sync cursor expired; reload the listing and start a new sync"
+
+
+def sync_cursor(synced_at: datetime, since: Optional[datetime] = None):
+    """Cursor for the next sync by a client that has seen every change up to synced_at."""
+    next_since = synced_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    if since is not None:
+        next_since = max(next_since, since)
+    return encode_cursor(next_since)
+
+
+def decode_sync_cursor(cursor: str):
+    """The time a sync cursor resumes from; 410 once its tombstones may have been pruned."""
+    (since,) = decode_cursor(cursor, 1)
+    try:
+        since = datetime.fromisoformat(since)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if since < utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=RESYNC_DETAIL)
+    return since
+
+
+def check_sync_size(rows):
+    """Turn away syncs too large to be worth sending as a delta."""
+    if len(rows) > SYNC_MAX_CHANGES:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=RESYNC_DETAIL)
+    return rows
+
+
+def tombstones(entity: str, entity_id: int, feed_id: Optional[int] = None, users: Optional[Iterable[int]] = None):
+    """Tombstones for a removal, one per user it is reported to.
+
+    Without users a single tombstone is made that reaches everyone who can
+    see the feed at sync time.
+    """
+    user_ids = [None] if users is None else {user_id for user_id in users if user_id is not None}
+    return [
+        {"entity": entity, "entity_id": entity_id, "feed_id": feed_id, "user_id": user_id}
+        for user_id in user_ids
+    ]
+
+
+async def record_tombstones(db: AsyncSession, rows: list):
+    """Insert tombstones in one batch in the caller's transaction, pruning expired ones at the same time."""
+    await db.execute(
+        delete(Tombstone).where(Tombstone.deleted_at < utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS))
+    )
+    if rows:
+        await db.execute(insert(Tombstone), rows)
+
+
+async def add_tombstones(
+    db: AsyncSession,
+    entity: str,
+    entity_id: int,
+    feed_id: Optional[int] = None,
+    users: Optional[Iterable[int]] = None,
+):
+    """Record a single removal; see tombstones."""
+    await record_tombstones(db, tombstones(entity, entity_id, feed_id, users))
@@ -0,0 +1,99 @@
+"""Concurrent-request throughput benchmark for a running API server.
+
+Registers (or logs in) a benchmark user, seeds a few feeds, then keeps a fixed
+number of requests in flight against the feed listing and reports throughput
+and latency percentiles.
+
+Usage:
+    pip install httpx
+    uvicorn app.main:app --port 8000
+    python benchmarks/concurrency.py --base-url http://localhost:8000 --concurrency 50 --duration 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 2048 + b"\n%%EOF\n"
+
+
+async def get_token(client: httpx.AsyncClient, username: str, password: str):
+    """Log in as the benchmark user, registering it on first use."""
+    response = await client.post("/api/auth/login", data={"username": username, "password": password})
+    if response.status_code == 401:
+        response = await client.post(
+            "/api/auth/register",
+            data={"username": username, "email": f"{username}@example.com", "password": password},
+        )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def seed_feeds(client: httpx.AsyncClient, headers: dict, count: int):
+    """Upload feeds until the benchmark user owns at least count of them."""
+    existing = (await client.get("/api/feeds/", headers=headers)).json()
+    for i in range(len(existing), count):
+        response = await client.post(
+            "/api/feeds/",
+            data={"title": f"Benchmark contract {i}", "description": "benchmark"},
+            files={"file": (f"bench_{i}.pdf", PDF_BYTES, "application/pdf")},
+            headers=headers,
+        )
+        response.raise_for_status()
+
+
+async def worker(client: httpx.AsyncClient, path: str, headers: dict, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+        except httpx.TransportError as exc:
+            errors.append(type(exc).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        token = await get_token(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        await seed_feeds(client, headers, args.feeds)
+
+        latencies, errors = [], []
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            worker(client, args.path, headers, deadline, latencies, errors)
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"path:         {args.path}")
+    print(f"concurrency:  {args.concurrency}")
+    print(f"requests:     {len(latencies)} ({len(errors)} errors)")
+    print(f"throughput:   {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency p50:  {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"latency p95:  {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/feeds/")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--feeds", type=int, default=20)
+    parser.add_argument("--username", default="benchmark")
+    parser.add_argument("--password", default="benchmark-password")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Login-storm benchmark for a running API server.
+
+Measures the latency of an ordinary endpoint twice: once on its own, then
+while a number of clients log in back to back. With password hashing on the
+event loop the probe latency grows with every concurrent login; with hashing
+off-loop it should stay close to the baseline.
+
+Usage:
+    pip install httpx
+    uvicorn app.main:app --port 8000
+    python benchmarks/login_storm.py --base-url http://localhost:8000 --logins 20 --duration 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from concurrency import get_token
+
+
+def summarize(label: str, latencies: list, errors: list, elapsed: float):
+    latencies = sorted(latencies)
+    if not latencies:
+        print(f"{label:<14} no successful requests ({len(errors)} errors)")
+        return
+    print(
+        f"{label:<14} {len(latencies) / elapsed:7.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms  "
+        f"max {latencies[-1] * 1000:7.1f} ms  "
+        f"errors {len(errors)}"
+    )
+
+
+async def loop_requests(send, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await send()
+        except httpx.TransportError as exc:
+            errors.append(type(exc).__name__)
+            continue
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(response.status_code)
+
+
+async def measure(client: httpx.AsyncClient, args, headers: dict, logins: int):
+    """Run probe clients, plus login clients when logins > 0, for one phase."""
+    probe, login = ([], []), ([], [])
+    credentials = {"username": args.username, "password": args.password}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(
+        *(
+            loop_requests(lambda: client.get(args.path, headers=headers), deadline, *probe)
+            for _ in range(args.probes)
+        ),
+        *(
+            loop_requests(lambda: client.post("/api/auth/login", data=credentials), deadline, *login)
+            for _ in range(logins)
+        ),
+    )
+    return probe, login, time.perf_counter() - started
+
+
+async def run(args):
+    connections = args.probes + args.logins
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        token = await get_token(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        print(f"probe path:   {args.path} ({args.probes} clients)")
+        print(f"login storm:  {args.logins} clients")
+        probe, _, elapsed = await measure(client, args, headers, 0)
+        summarize("probe alone", *probe, elapsed)
+        probe, login, elapsed = await measure(client, args, headers, args.logins)
+        summarize("probe + storm", *probe, elapsed)
+        summarize("logins", *login, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/feeds/")
+    parser.add_argument("--probes", type=int, default=5)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--username", default="benchmark")
+    parser.add_argument("--password", default="benchmark-password")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
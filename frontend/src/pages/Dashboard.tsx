@@ -38,7 +38,7 @@ import {
 } from '@mui/icons-material';
 import { useNavigate } from 'react-router-dom';
 import { feeds, shares } from '../services/api';
-import { Feed } from '../types';
+import { CursorPage, Feed } from '../types';
 import { toast } from 'react-toastify';
 
 export const Dashboard: React.FC = () => {
@@ -53,21 +53,33 @@ export const Dashboard: React.FC = () => {
     const [shareEmail, setShareEmail] = useState('');
     const [isSharing, setIsSharing] = useState(false);
     const [shareError, setShareError] = useState<string | null>(null);
+    // The search whose results are listed, or null for the active tab's listing
+    const [activeQuery, setActiveQuery] = useState<string | null>(null);
+    const [nextCursor, setNextCursor] = useState<string | undefined>(undefined);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const navigate = useNavigate();
 
     useEffect(() => {
         loadPdfFiles();
     }, [activeTab]);
 
+    const fetchFiles = (query: string | null, cursor?: string): Promise<CursorPage<Feed>> => {
+        if (query !== null) {
+            return feeds.search(query, cursor);
+        }
+        return activeTab === 'all' ? feeds.getAll(cursor) : shares.getSharedWithMe(cursor);
+    };
+
+    const showFirstPage = async (query: string | null) => {
+        const page = await fetchFiles(query);
+        setActiveQuery(query);
+        setPdfFiles(page.items);
+        setNextCursor(page.nextCursor);
+    };
+
     const loadPdfFiles = async () => {
         try {
-            if (activeTab === 'all') {
-                const response = await feeds.getAll();
-                setPdfFiles(response);
-            } else {
-                const response = await shares.getSharedWithMe();
-                setPdfFiles(response);
-            }
+            await showFirstPage(null);
         } catch (error) {
             toast.error('Failed to load PDF files');
         }
@@ -75,13 +87,27 @@ export const Dashboard: React.FC = () => {
 
     const handleSearch = async () => {
         try {
-            const results = await feeds.search(searchQuery);
-            setPdfFiles(results);
+            await showFirstPage(searchQuery);
         } catch (error) {
             toast.error('Search failed');
         }
     };
 
+    const handleLoadMore = async () => {
+        if (!nextCursor) return;
+
+        setIsLoadingMore(true);
+        try {
+            const page = await fetchFiles(activeQuery, nextCursor);
+            setPdfFiles(previous => [...previous, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (error) {
+            toast.error('Failed to load more PDF files');
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
+
     const handleUpload = async (e: React.FormEvent) => {
         e.preventDefault();
         if (!file || !title) {
@@ -245,6 +271,13 @@ export const Dashboard: React.FC = () => {
                                 </Box>
                             )}
                         </List>
+                        {nextCursor && (
+                            <Box sx={{ textAlign: 'center', mt: 2 }}>
+                                <Button variant="outlined" onClick={handleLoadMore} disabled={isLoadingMore}>
+                                    {isLoadingMore ? 'Loading...' : 'Load more'}
+                                </Button>
+                            </Box>
+                        )}
                     </Paper>
                 </Box>
                 <Box sx={{ flex: { xs: '1', md: '1' } }}>
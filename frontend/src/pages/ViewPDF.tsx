@@ -4,7 +4,7 @@ import { Container, Paper, Typography, TextField, Button, Box, List, ListItem, L
 import { Comment as CommentIcon, Send as SendIcon, ArrowBack as ArrowBackIcon, PersonAdd as PersonAddIcon, MoreVert as MoreVertIcon, Delete as DeleteIcon, People as PeopleIcon } from '@mui/icons-material';
 import { Document, Page } from 'react-pdf';
 import { feeds, shares } from '../services/api';
-import { Feed, Comment } from '../types';
+import { Feed, Comment, CursorPage } from '../types';
 import { toast } from 'react-toastify';
 import 'react-pdf/dist/esm/Page/TextLayer.css';
 import 'react-pdf/dist/esm/Page/AnnotationLayer.css';
@@ -29,6 +29,8 @@ export const ViewPDF: React.FC = () => {
     const { id } = useParams<{ id?: string; }>();
     const [feed, setFeed] = useState<Feed | null>(null);
     const [comments, setComments] = useState<Comment[]>([]);
+    // Cursor for the page of comments before the earliest one shown
+    const [earlierCursor, setEarlierCursor] = useState<string | undefined>(undefined);
     const [comment, setComment] = useState('');
     const [isLoading, setIsLoading] = useState(false);
     const [numPages, setNumPages] = useState<number | null>(null);
@@ -78,14 +80,31 @@ export const ViewPDF: React.FC = () => {
     const loadComments = async () => {
         try {
             setIsLoading(true);
-            let response: Comment[] = [];
+            let page: CursorPage<Comment> = { items: [] };
             if (id) {
-                response = await feeds.getComments(parseInt(id));
+                page = await feeds.getComments(parseInt(id));
             }
-            setComments(Array.isArray(response) ? response : []);
+            setComments(page.items);
+            setEarlierCursor(page.nextCursor);
         } catch (error) {
             toast.error('Failed to load comments');
             setComments([]);
+            setEarlierCursor(undefined);
+        } finally {
+            setIsLoading(false);
+        }
+    };
+
+    const loadEarlierComments = async () => {
+        if (!id || !earlierCursor) return;
+
+        try {
+            setIsLoading(true);
+            const page = await feeds.getComments(parseInt(id), earlierCursor);
+            setComments(previous => [...page.items, ...previous]);
+            setEarlierCursor(page.nextCursor);
+        } catch (error) {
+            toast.error('Failed to load comments');
         } finally {
             setIsLoading(false);
         }
@@ -268,6 +287,13 @@ export const ViewPDF: React.FC = () => {
                                 Post Comment
                             </Button>
                         </Box>
+                        {earlierCursor && (
+                            <Box sx={{ textAlign: 'center', mb: 1 }}>
+                                <Button size="small" onClick={loadEarlierComments} disabled={isLoading}>
+                                    Load earlier comments
+                                </Button>
+                            </Box>
+                        )}
                         <List>
                             {comments.length > 0 ? (
                                 comments.map((comment) => (
@@ -4,7 +4,7 @@ import { Container, Paper, Typography, TextField, Button, Box, List, ListItem, L
 import { Comment as CommentIcon, Send as SendIcon, ArrowBack as ArrowBackIcon } from '@mui/icons-material';
 import { Document, Page } from 'react-pdf';
 import { shares } from '../services/api';
-import { Feed, Comment } from '../types';
+import { Feed, Comment, CursorPage } from '../types';
 import { toast } from 'react-toastify';
 import 'react-pdf/dist/esm/Page/TextLayer.css';
 import 'react-pdf/dist/esm/Page/AnnotationLayer.css';
@@ -22,6 +22,8 @@ export const ViewSharedPDF: React.FC = () => {
     const { token } = useParams<{ token?: string }>();
     const [feed, setFeed] = useState<Feed | null>(null);
     const [comments, setComments] = useState<Comment[]>([]);
+    // Cursor for the page of comments before the earliest one shown
+    const [earlierCursor, setEarlierCursor] = useState<string | undefined>(undefined);
     const [comment, setComment] = useState('');
     const [commenterName, setCommenterName] = useState('');
     const [numPages, setNumPages] = useState<number | null>(null);
@@ -65,14 +67,31 @@ export const ViewSharedPDF: React.FC = () => {
     const loadComments = async () => {
         try {
             setIsLoading(true);
-            let response: Comment[] = [];
+            let page: CursorPage<Comment> = { items: [] };
             if (token) {
-                response = await shares.getComments(token);
+                page = await shares.getComments(token);
             }
-            setComments(Array.isArray(response) ? response : []);
+            setComments(page.items);
+            setEarlierCursor(page.nextCursor);
         } catch (error) {
             toast.error('Failed to load comments');
             setComments([]);
+            setEarlierCursor(undefined);
+        } finally {
+            setIsLoading(false);
+        }
+    };
+
+    const loadEarlierComments = async () => {
+        if (!token || !earlierCursor) return;
+
+        try {
+            setIsLoading(true);
+            const page = await shares.getComments(token, earlierCursor);
+            setComments(previous => [...page.items, ...previous]);
+            setEarlierCursor(page.nextCursor);
+        } catch (error) {
+            toast.error('Failed to load comments');
         } finally {
             setIsLoading(false);
         }
@@ -252,6 +271,13 @@ export const ViewSharedPDF: React.FC = () => {
                                 Post Comment
                             </Button>
                         </Box>
+                        {earlierCursor && (
+                            <Box sx={{ textAlign: 'center', mb: 1 }}>
+                                <Button size="small" onClick={loadEarlierComments} disabled={isLoading}>
+                                    Load earlier comments
+                                </Button>
+                            </Box>
+                        )}
                         <List>
                             {comments.length > 0 ? (
                                 comments.map((comment) => (
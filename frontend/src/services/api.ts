@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { AuthResponse, Feed, ShareResponse, Comment, SharedFeed, UserShareResponse } from '../types';
+import { AuthResponse, Feed, ShareResponse, Comment, CursorPage, SharedFeed, UserShareResponse } from '../types';
 
 // Create axios instance with base configuration
 const api = axios.create({
@@ -21,6 +21,20 @@ api.interceptors.request.use(
     }
 );
 
+// Listings are paginated; the cursor for the next page comes in this header
+const NEXT_CURSOR_HEADER = 'x-next-cursor';
+// Items per request; further pages are only fetched when the user asks for more
+const PAGE_SIZE = 50;
+
+// Fetch one page of a cursor-paginated listing, starting after cursor when given
+const fetchPage = async <T>(url: string, params: Record<string, string | number> = {}, cursor?: string): Promise<CursorPage<T>> => {
+    const response = await api.get(url, { params: { ...params, limit: PAGE_SIZE, cursor } });
+    return { items: response.data, nextCursor: response.headers[NEXT_CURSOR_HEADER] };
+};
+
+// Comment pages come newest first, each following page older; threads are shown in the order comments were written
+const oldestFirst = (page: CursorPage<Comment>): CursorPage<Comment> => ({ ...page, items: [...page.items].reverse() });
+
 export const auth = {
     login: async (username: string, password: string): Promise<AuthResponse> => {
         try {
@@ -71,25 +85,22 @@ export const feeds = {
         });
         return response.data;
     },
-    getAll: async (): Promise<Feed[]> => {
-        const response = await api.get('/feeds');
-        return response.data;
+    getAll: async (cursor?: string): Promise<CursorPage<Feed>> => {
+        return fetchPage<Feed>('/feeds', {}, cursor);
     },
     getById: async (id: number): Promise<Feed> => {
         const response = await api.get(`/feeds/${id}`);
         return response.data;
     },
-    search: async (query: string): Promise<Feed[]> => {
-        const response = await api.get(`/feeds/search?q=${query}`);
-        return response.data;
+    search: async (query: string, cursor?: string): Promise<CursorPage<Feed>> => {
+        return fetchPage<Feed>('/feeds/search', { q: query }, cursor);
     },
-    getComments: async (feedId: number): Promise<Comment[]> => {
+    getComments: async (feedId: number, cursor?: string): Promise<CursorPage<Comment>> => {
         try {
-            const response = await api.get(`/comments?feed_id=${feedId}`);
-            return Array.isArray(response.data) ? response.data : [];
+            return oldestFirst(await fetchPage<Comment>('/comments', { feed_id: feedId }, cursor));
         } catch (error) {
             console.error('Get comments error:', error);
-            return [];
+            return { items: [] };
         }
     },
     addComment: async (feedId: number, commentBody: string): Promise<Comment> => {
@@ -121,9 +132,8 @@ export const shares = {
         });
         return response.data;
     },
-    getSharedWithMe: async (): Promise<Feed[]> => {
-        const response = await api.get('/share/user');
-        return response.data;
+    getSharedWithMe: async (cursor?: string): Promise<CursorPage<Feed>> => {
+        return fetchPage<Feed>('/share/user', {}, cursor);
     },
     removeUserShare: async (shareId: number): Promise<void> => {
         await api.delete(`/share/user/${shareId}`);
@@ -132,9 +142,8 @@ export const shares = {
         const response = await api.get(`/share/public/${token}`);
         return response.data;
     },
-    getComments: async (token: string): Promise<Comment[]> => {
-        const response = await api.get(`/share/public/${token}/comments`);
-        return response.data;
+    getComments: async (token: string, cursor?: string): Promise<CursorPage<Comment>> => {
+        return oldestFirst(await fetchPage<Comment>(`/share/public/${token}/comments`, {}, cursor));
     },
     addComment: async (token: string, commenterName: string, commentBody: string): Promise<Comment> => {
         const response = await api.post(`/share/public/${token}/comments`, {
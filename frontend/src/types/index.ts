@@ -27,6 +27,12 @@ export interface SharedFeed {
 }
 
 
+// One page of a cursor-paginated listing; pass nextCursor back for the page after it
+export interface CursorPage<T> {
+    items: T[];
+    nextCursor?: string;
+}
+
 export interface Comment {
     id: number;
     comment_body: string;
@@ -0,0 +1,82 @@
+"""Shared fixtures: the app on a throwaway SQLite database, and helpers to create users and feeds.
+
+The environment is set before the app is imported, since its modules read
+their configuration at import time.
+"""
+import os
+import tempfile
+import uuid
+
+TEST_DIR = tempfile.mkdtemp(prefix="pdf-app-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}",
+    BLOB_STORAGE_DIR=os.path.join(TEST_DIR, "blobs"),
+    SECRET_KEY="test-secret",
+    ALGORITHM="HS256",
+    ACCESS_TOKEN_EXPIRE_MINUTES="30",
+)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database.migrate import migrate
+
+PASSWORD = "correct horse battery staple"
+PDF = b"%PDF-1.4\n%test document\n"
+
+
+@pytest.fixture(scope="session")
+def client():
+    """A client for the app; one event loop for the session, as the async engine needs."""
+    migrate()
+    from app.main import app
+    from app.jobs.jobs import runner
+
+    with TestClient(app) as client:
+        # Background job polling would run queries in the middle of query budgets
+        client.portal.call(runner.stop)
+        yield client
+
+
+@pytest.fixture
+def make_user(client):
+    """Register a user with a unique name and return (user id, auth headers)."""
+    def make_user():
+        name = f"user_{uuid.uuid4().hex[:12]}"
+        response = client.post(
+            "/api/auth/register", data={"username": name, "email": f"{name}@example.com", "password": PASSWORD}
+        )
+        assert response.status_code == 200, response.text
+        # Authenticate with the header only, not the cookie registration sets
+        client.cookies.clear()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return client.get("/api/auth/user/me", headers=headers).json()["id"], headers
+    return make_user
+
+
+@pytest.fixture
+def user_email(client):
+    """The email make_user registered the user with the given headers under."""
+    def user_email(headers):
+        return f"{client.get('/api/auth/user/me', headers=headers).json()['username']}@example.com"
+    return user_email
+
+
+@pytest.fixture
+def make_feed(client):
+    """Upload a feed as the user with the given headers and return its id."""
+    def make_feed(headers, title="Test feed", content=PDF):
+        response = client.post("/api/feeds/", headers=headers, data={"title": title}, files={"file": ("test.pdf", content)})
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+    return make_feed
+
+
+@pytest.fixture
+def make_comment(client):
+    """Comment on a feed as the user with the given headers and return the comment."""
+    def make_comment(headers, feed_id, body="A comment"):
+        response = client.post("/api/comments/", headers=headers, json={"feed_id": feed_id, "comment_body": body})
+        assert response.status_code == 201, response.text
+        return response.json()
+    return make_comment
@@ -0,0 +1,98 @@
+import pytest
+
+from app.assets import assets
+from app.assets.assets import AssetStore, IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+
+SCRIPT = b"console.log('the frontend');\n" * 100
+
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    """A frontend build served in place of the real one, next to a file it must not expose."""
+    root = tmp_path / "build"
+    (root / "static" / "js").mkdir(parents=True)
+    (root / "index.html").write_bytes(b"<!doctype html><title>app</title>")
+    (root / "static" / "js" / "main.0c05d6f5.js").write_bytes(SCRIPT)
+    (root / "manifest.json").write_bytes(b'{"name": "app"}')
+    (tmp_path / "secret.txt").write_bytes(b"not for the web")
+
+    store = AssetStore(str(root), reload_interval=60, max_cached_bytes=1024 * 1024)
+    store.preload()
+    monkeypatch.setattr(assets, "frontend", store)
+    return store
+
+
+def test_best_accepted_encoding(client, build):
+    path = "/static/js/main.0c05d6f5.js"
+
+    brotli = client.get(path, headers={"Accept-Encoding": "gzip, br"})
+    gzipped = client.get(path, headers={"Accept-Encoding": "gzip, br;q=0"})
+    plain = client.get(path, headers={"Accept-Encoding": "identity"})
+
+    assert brotli.headers["Content-Encoding"] == "br"
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in plain.headers
+    # The client decodes both, so every response has the same content
+    assert brotli.content == gzipped.content == plain.content == SCRIPT
+    assert {response.headers["Vary"] for response in (brotli, gzipped, plain)} == {"Accept-Encoding"}
+    assert len({response.headers["ETag"] for response in (brotli, gzipped, plain)}) == 3
+
+
+def test_cache_control_by_name(client, build):
+    hashed = client.get("/static/js/main.0c05d6f5.js")
+    unhashed = client.get("/manifest.json")
+    index = client.get("/")
+
+    assert hashed.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert unhashed.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+    assert index.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+    # Small files are served as they are
+    assert "Vary" not in unhashed.headers
+
+
+def test_client_routes_get_index(client, build):
+    response = client.get("/feeds/12")
+
+    assert response.status_code == 200
+    assert response.content == b"<!doctype html><title>app</title>"
+
+
+def test_unknown_build_asset_is_not_found(client, build):
+    response = client.get("/static/js/main.00000000.js")
+
+    assert response.status_code == 404
+    assert response.content == b""
+
+
+@pytest.mark.parametrize("path", [
+    "/static/%2e%2e/%2e%2e/secret.txt",
+    "/%2e%2e/secret.txt",
+    "/static/%2e%2e/app/main.py",
+])
+def test_traversal_stays_in_build(client, build, path):
+    response = client.get(path)
+
+    assert b"not for the web" not in response.content
+    assert response.status_code == 404 or response.content == b"<!doctype html><title>app</title>"
+
+
+def test_store_rejects_paths_outside_root(client, build):
+    assert client.portal.call(build.get, "../secret.txt") is None
+    assert client.portal.call(build.get, "static/../../secret.txt") is None
+    # Aliases inside the root resolve to the same file
+    assert client.portal.call(build.get, "static/../index.html") is client.portal.call(build.get, "index.html")
+
+
+def test_matching_etag_is_not_modified(client, build):
+    headers = {"Accept-Encoding": "br"}
+    response = client.get("/static/js/main.0c05d6f5.js", headers=headers)
+    etag = response.headers["ETag"]
+
+    response = client.get("/static/js/main.0c05d6f5.js", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    # A validator for another encoding is a different representation
+    response = client.get("/static/js/main.0c05d6f5.js", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 200
@@ -0,0 +1,42 @@
+def test_unchanged_feed_is_not_modified(client, make_user, make_feed):
+    user_id, headers = make_user()
+    feed_id = make_feed(headers)
+
+    response = client.get(f"/api/feeds/{feed_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    etag = response.headers["ETag"]
+
+    response = client.get(f"/api/feeds/{feed_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+def test_new_comment_changes_feed_etag(client, make_user, make_feed, make_comment):
+    user_id, headers = make_user()
+    feed_id = make_feed(headers)
+    etag = client.get(f"/api/feeds/{feed_id}", headers=headers).headers["ETag"]
+
+    make_comment(headers, feed_id, "A new comment")
+
+    response = client.get(f"/api/feeds/{feed_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [comment["comment_body"] for comment in response.json()["comments"]] == ["A new comment"]
+
+
+def test_user_etag_differs_per_user(client, make_user):
+    first_id, first = make_user()
+    second_id, second = make_user()
+
+    first_response = client.get("/api/auth/user/me", headers=first)
+    second_response = client.get("/api/auth/user/me", headers=second)
+
+    assert first_response.headers["ETag"] != second_response.headers["ETag"]
+    assert first_response.headers["Vary"] == "Authorization, Cookie"
+
+    # One user's validator never revalidates another user's response
+    etag = first_response.headers["ETag"]
+    assert client.get("/api/auth/user/me", headers={**second, "If-None-Match": etag}).status_code == 200
+    assert client.get("/api/auth/user/me", headers={**first, "If-None-Match": etag}).status_code == 304
@@ -0,0 +1,66 @@
+import pytest
+
+from app.storage.downloads import parse_range, MAX_RANGES
+
+from conftest import PDF
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", [(0, 9)]),
+    ("bytes=10-", [(10, 99)]),
+    ("bytes=-10", [(90, 99)]),
+    ("bytes=-500", [(0, 99)]),
+    ("bytes=90-200", [(90, 99)]),
+    ("bytes=0-0, 50-59", [(0, 0), (50, 59)]),
+    ("BYTES=0-1", [(0, 1)]),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "items=0-9",
+    "bytes=",
+    "bytes=5",
+    "bytes=a-b",
+    "bytes=9-0",
+    "bytes=" + ",".join(f"{n}-{n}" for n in range(MAX_RANGES + 1)),
+])
+def test_ignored_ranges(header):
+    assert parse_range(header, 100) is None
+
+
+def test_unsatisfiable_ranges():
+    assert parse_range("bytes=100-", 100) == []
+    assert parse_range("bytes=200-300, 150-", 100) == []
+
+
+def test_download_ranges(client, make_user, make_feed):
+    user_id, headers = make_user()
+    feed_id = make_feed(headers)
+    url = f"/api/feeds/{feed_id}/download"
+
+    whole = client.get(url)
+    assert whole.status_code == 200
+    assert whole.content == PDF
+
+    partial = client.get(url, headers={"Range": "bytes=0-7"})
+    assert partial.status_code == 206
+    assert partial.content == PDF[:8]
+    assert partial.headers["content-range"] == f"bytes 0-7/{len(PDF)}"
+
+    multi = client.get(url, headers={"Range": "bytes=0-3, -4"})
+    assert multi.status_code == 206
+    assert multi.headers["content-type"].startswith("multipart/byteranges")
+    assert int(multi.headers["content-length"]) == len(multi.content)
+
+    unsatisfiable = client.get(url, headers={"Range": f"bytes={len(PDF)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(PDF)}"
+
+    stale = client.get(url, headers={"Range": "bytes=0-7", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.content == PDF
+
+    revalidated = client.get(url, headers={"If-None-Match": whole.headers["etag"]})
+    assert revalidated.status_code == 304
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+
+from app.export import export
+
+
+def ndjson(response):
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_comments(client, make_user, make_feed, make_comment, user_email):
+    owner_id, owner = make_user()
+    reader_id, reader = make_user()
+    feed_id = make_feed(owner)
+    other_feed_id = make_feed(owner)
+    client.post("/api/share/user/bulk", headers=owner, json={"feed_id": feed_id, "emails": [user_email(reader)]})
+    first = make_comment(owner, feed_id, "first")
+    second = make_comment(reader, feed_id, "second")
+    hidden = make_comment(owner, other_feed_id, "hidden")
+
+    rows = ndjson(client.get("/api/export/comments", headers=owner))
+    assert [row["id"] for row in rows] == [first["id"], second["id"], hidden["id"]]
+    assert rows[0]["comment_body"] == "first"
+    assert rows[0]["feed_id"] == feed_id
+
+    # Only comments on feeds the reader can see
+    rows = ndjson(client.get("/api/export/comments", headers=reader))
+    assert [row["id"] for row in rows] == [first["id"], second["id"]]
+
+    rows = ndjson(client.get("/api/export/comments", headers=owner, params={"user_id": reader_id}))
+    assert [row["id"] for row in rows] == [second["id"]]
+
+    rows = ndjson(client.get("/api/export/comments", headers=owner, params={"after_id": first["id"]}))
+    assert [row["id"] for row in rows] == [second["id"], hidden["id"]]
+
+    rows = ndjson(client.get("/api/export/comments", headers=owner, params={"end": "2000-01-01T00:00:00Z"}))
+    assert rows == []
+
+    response = client.get("/api/export/comments", headers=reader, params={"feed_id": other_feed_id})
+    assert response.status_code == 404
+
+
+def test_export_feeds_csv(client, make_user, make_feed):
+    owner_id, owner = make_user()
+    other_id, other = make_user()
+    feed_ids = [make_feed(owner, title=f"Feed {number}") for number in range(3)]
+
+    response = client.get("/api/export/feeds", headers=owner, params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="feeds.csv"'
+    header, *rows = csv.reader(io.StringIO(response.text))
+    assert header[:3] == ["id", "host_id", "title"]
+    assert [(int(row[0]), row[2]) for row in rows] == [(feed_id, f"Feed {number}") for number, feed_id in enumerate(feed_ids)]
+
+    assert ndjson(client.get("/api/export/feeds", headers=other)) == []
+
+    response = client.get("/api/export/feeds", headers=owner, params={"format": "xml"})
+    assert response.status_code == 422
+
+
+def test_export_streams_in_batches(client, make_user, make_feed, monkeypatch):
+    owner_id, owner = make_user()
+    feed_ids = [make_feed(owner) for _ in range(5)]
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+
+    rows = ndjson(client.get("/api/export/feeds", headers=owner))
+
+    assert [row["id"] for row in rows] == feed_ids
@@ -0,0 +1,60 @@
+import hashlib
+import os
+from datetime import timedelta
+
+import pytest
+from conftest import PDF
+
+from app.database.database import SessionLocal
+from app.models.models import Blob, utcnow
+from app.storage.gc import collect_garbage
+from app.routers import feeds
+from app.storage.storage import STAGING_DIR, blob_path
+
+
+def add_blob(content: bytes, age: timedelta):
+    """An unreferenced blob with its file, created age ago."""
+    ref = hashlib.sha256(content).hexdigest()
+    os.makedirs(os.path.dirname(blob_path(ref)), exist_ok=True)
+    with open(blob_path(ref), "wb") as handle:
+        handle.write(content)
+    with SessionLocal() as db:
+        db.add(Blob(sha256=ref, size=len(content), ref_count=0, created_at=utcnow() - age))
+        db.commit()
+    return ref
+
+
+def test_grace_period_protects_recent_blobs(client):
+    recent = add_blob(b"%PDF-1.4\n%recent\n", timedelta(minutes=30))
+    old = add_blob(b"%PDF-1.4\n%old\n", timedelta(hours=2))
+
+    collect_garbage(grace_seconds=3600)
+
+    with SessionLocal() as db:
+        assert db.get(Blob, recent) is not None
+        assert db.get(Blob, old) is None
+    assert os.path.exists(blob_path(recent))
+    assert not os.path.exists(blob_path(old))
+
+
+def test_referenced_blobs_are_kept(client, make_user, make_feed):
+    user_id, headers = make_user()
+    feed_id = make_feed(headers, content=b"%PDF-1.4\n%referenced\n")
+    ref = client.get(f"/api/feeds/{feed_id}", headers=headers).json()["file_path"]
+
+    collect_garbage(grace_seconds=0)
+
+    assert os.path.exists(blob_path(ref))
+
+
+def test_failed_upload_leaves_no_staged_file(client, make_user, monkeypatch):
+    user_id, headers = make_user()
+
+    async def failing_store_blob(db, staged):
+        raise RuntimeError("blob store unavailable")
+    monkeypatch.setattr(feeds, "store_blob", failing_store_blob)
+
+    with pytest.raises(RuntimeError):
+        client.post("/api/feeds/", headers=headers, data={"title": "Lost"}, files={"file": ("test.pdf", PDF)})
+
+    assert not [name for name in os.listdir(STAGING_DIR) if name.endswith(".part")]
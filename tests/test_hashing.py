@@ -0,0 +1,66 @@
+import threading
+import time
+
+from passlib.context import CryptContext
+
+from app.auth import hashing
+from app.auth.hashing import HashPool
+from app.database.database import SessionLocal
+from app.models.models import User
+from conftest import PASSWORD
+
+
+def login(client, username):
+    response = client.post("/api/auth/login", data={"username": username, "password": PASSWORD})
+    client.cookies.clear()
+    return response
+
+
+def stored_hash(user_id):
+    with SessionLocal() as db:
+        return db.get(User, user_id).hashed_password
+
+
+def test_login_upgrades_outdated_hash(client, make_user, monkeypatch):
+    user_id, headers = make_user()
+    username = client.get("/api/auth/user/me", headers=headers).json()["username"]
+    old_hash = stored_hash(user_id)
+
+    monkeypatch.setattr(hashing, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4))
+    assert login(client, username).status_code == 200
+
+    new_hash = stored_hash(user_id)
+    # bcrypt hashes read $2b$<rounds>$...
+    assert old_hash.split("$")[2] == f"{hashing.BCRYPT_ROUNDS:02d}"
+    assert new_hash.split("$")[2] == "04"
+    assert hashing.pwd_context.verify(PASSWORD, new_hash)
+
+    # Up-to-date hashes are left alone
+    assert login(client, username).status_code == 200
+    assert stored_hash(user_id) == new_hash
+
+
+def test_full_pool_turns_logins_away(client, make_user, monkeypatch):
+    user_id, headers = make_user()
+    username = client.get("/api/auth/user/me", headers=headers).json()["username"]
+    pool = HashPool(workers=1, max_pending=1)
+    monkeypatch.setattr(hashing, "hash_pool", pool)
+
+    # Occupy the only slot until released
+    release = threading.Event()
+    busy = client.portal.start_task_soon(pool.run, release.wait)
+    deadline = time.monotonic() + 5
+    while pool.pending < 1:
+        assert time.monotonic() < deadline, "pool never became busy"
+        time.sleep(0.01)
+
+    try:
+        response = login(client, username)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert pool.stats()["rejected"] == 1
+    finally:
+        release.set()
+        busy.result(timeout=5)
+
+    assert login(client, username).status_code == 200
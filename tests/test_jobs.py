@@ -0,0 +1,56 @@
+from app.database.database import SessionLocal
+from app.jobs import jobs
+from app.jobs.jobs import JobRunner
+from app.models.models import Job
+
+
+def run_job(client, kind, payload):
+    """Run one claimed attempt of a job in the test's event loop and return the job as left after it."""
+    with SessionLocal() as db:
+        job = Job(kind=kind, payload=payload, status="running", attempts=1, max_attempts=3)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+
+    # Without a process pool the function runs on the loop's default executor
+    client.portal.call(JobRunner()._execute, job)
+
+    with SessionLocal() as db:
+        return db.get(Job, job.id)
+
+
+def test_missing_file_fails_without_retrying(client, tmp_path):
+    job = run_job(client, "process_pdf", {"feed_id": 0, "path": str(tmp_path / "collected.pdf")})
+
+    assert job.status == "failed"
+    assert job.error.startswith("FileNotFoundError")
+
+
+def test_invalid_document_fails_without_retrying(client, tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"%PDF-1.4\nnot really a pdf")
+
+    job = run_job(client, "process_pdf", {"feed_id": 0, "path": str(path)})
+
+    assert job.status == "failed"
+    assert job.error.startswith("InvalidDocument")
+
+
+def test_programming_errors_are_retried(client, monkeypatch):
+    def buggy(payload):
+        return payload["missing"]
+    monkeypatch.setitem(jobs.REGISTRY, "buggy", (buggy, None))
+
+    job = run_job(client, "buggy", {})
+
+    assert job.status == "queued"
+    assert job.error.startswith("KeyError")
+    assert job.run_after is not None
+
+
+def test_unknown_kind_fails_without_retrying(client):
+    job = run_job(client, "no_such_kind", {})
+
+    assert job.status == "failed"
+    assert job.error.startswith("UnknownJobKind")
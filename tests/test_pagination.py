@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.pagination.pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+
+
+def test_cursor_round_trip():
+    updated_at = datetime(2026, 10, 16, 12, 30, 15, 123456)
+
+    cursor = encode_cursor(updated_at, 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == [updated_at.isoformat(), 42]
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor(1, 2, 3), encode_cursor("a")])
+def test_malformed_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, 2)
+    assert error.value.status_code == 400
+
+
+def test_feed_listing_pages(client, make_user, make_feed):
+    user_id, headers = make_user()
+    feed_ids = [make_feed(headers, title=f"Feed {number}") for number in range(5)]
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/feeds/", headers=headers, params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        seen += [feed["id"] for feed in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    # Newest first, each feed exactly once
+    assert seen == sorted(feed_ids, reverse=True)
+
+
+def test_feed_listing_rejects_bad_cursor(client, make_user):
+    user_id, headers = make_user()
+
+    response = client.get("/api/feeds/", headers=headers, params={"cursor": "garbage"})
+
+    assert response.status_code == 400
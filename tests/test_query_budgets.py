@@ -0,0 +1,71 @@
+"""Statement budgets for the hot listings; each holds however many rows there are."""
+import pytest
+
+from app.metrics.testing import query_budget
+
+
+@pytest.fixture
+def populated(make_user, make_feed, make_comment):
+    """A user with several feeds, each with several comments, shared with a second user."""
+    user_id, headers = make_user()
+    feed_ids = []
+    for number in range(5):
+        feed_id = make_feed(headers, title=f"Feed {number}")
+        for _ in range(3):
+            make_comment(headers, feed_id)
+        feed_ids.append(feed_id)
+    return user_id, headers, feed_ids
+
+
+def test_feed_listing(client, populated):
+    user_id, headers, feed_ids = populated
+
+    # The listing query, plus the authenticated user if it is not cached
+    with query_budget(2):
+        response = client.get("/api/feeds/", headers=headers)
+
+    assert response.status_code == 200
+    assert {feed["id"] for feed in response.json()} == set(feed_ids)
+    assert all(feed["comment_count"] == 3 for feed in response.json())
+
+
+def test_cached_feed_listing(client, populated):
+    user_id, headers, feed_ids = populated
+    client.get("/api/feeds/", headers=headers)
+
+    with query_budget(1):
+        response = client.get("/api/feeds/", headers=headers)
+
+    assert len(response.json()) == len(feed_ids)
+
+
+def test_comment_listing(client, populated):
+    user_id, headers, feed_ids = populated
+
+    # The listing version for the conditional GET, then the page
+    with query_budget(2):
+        response = client.get(f"/api/comments/?feed_id={feed_ids[0]}")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+def test_user_listing(client, populated):
+    user_id, headers, feed_ids = populated
+
+    with query_budget(2):
+        response = client.get("/api/users/", headers=headers)
+
+    assert response.status_code == 200
+    assert user_id in {user["id"] for user in response.json()}
+
+
+def test_user_details(client, populated):
+    user_id, headers, feed_ids = populated
+
+    # The user with counts, recent feeds, recent comments
+    with query_budget(3):
+        response = client.get(f"/api/users/{user_id}")
+
+    assert response.status_code == 200
+    assert len(response.json()["feeds"]) == len(feed_ids)
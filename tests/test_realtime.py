@@ -0,0 +1,202 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import fakeredis
+import pytest
+
+from app.models.models import utcnow
+from app.realtime import realtime
+from app.realtime.realtime import MemoryBus, RedisBus, feed_comments_channel
+
+
+@pytest.fixture(params=["memory", "redis"])
+def make_bus(request, monkeypatch):
+    """Make the bus event streams use; call inside the event loop that uses it."""
+    def make_bus():
+        if request.param == "memory":
+            new_bus = MemoryBus(queue_size=2)
+        else:
+            new_bus = RedisBus(fakeredis.FakeAsyncRedis(), queue_size=2)
+        monkeypatch.setattr(realtime, "bus", new_bus)
+        return new_bus
+    return make_bus
+
+
+async def until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_memory_bus_drops_slow_subscribers():
+    async def scenario():
+        bus = MemoryBus(queue_size=2)
+        async with bus.subscribe("feed") as slow:
+            for number in range(3):
+                await bus.publish("feed", str(number))
+
+            assert slow.overflowed
+            assert [slow.queue.get_nowait() for _ in range(2)] == ["0", "1"]
+            assert bus.stats()["dropped"] == 1
+            assert bus.connections == 0
+            assert not bus.has_subscribers("feed")
+        assert bus.connections == 0
+    asyncio.run(scenario())
+
+
+def test_stream_relays_events(make_bus):
+    async def scenario():
+        bus = make_bus()
+        stream = realtime._stream("feed", None, None)
+        assert await anext(stream) == realtime.sse_frame("ready", "{}")
+
+        await bus.publish("feed", realtime.sse_frame("comment.created", "{}"))
+        assert await anext(stream) == realtime.sse_frame("comment.created", "{}")
+        await stream.aclose()
+
+        assert bus.connections == 0
+        await bus.close()
+    asyncio.run(scenario())
+
+
+def test_stream_ends_after_overflow(make_bus):
+    async def scenario():
+        bus = make_bus()
+        stream = realtime._stream("feed", None, None)
+        await anext(stream)
+
+        for number in range(3):
+            await bus.publish("feed", str(number))
+        await until(lambda: bus.dropped)
+
+        # What was buffered is still sent, then the stream ends
+        assert [frame async for frame in stream] == ["0", "1"]
+        await bus.close()
+    asyncio.run(scenario())
+
+
+def test_stream_ends_when_unauthorized(make_bus):
+    async def scenario():
+        bus = make_bus()
+        allowed = True
+
+        async def authorized():
+            return allowed
+
+        stream = realtime._stream("feed", None, authorized)
+        await anext(stream)
+        await bus.publish("feed", "first")
+        assert await anext(stream) == "first"
+
+        allowed = False
+        await bus.publish("feed", "second")
+        assert [frame async for frame in stream] == []
+        await bus.close()
+    asyncio.run(scenario())
+
+
+def test_stream_ends_at_deadline(make_bus):
+    async def scenario():
+        bus = make_bus()
+        started = time.monotonic()
+
+        stream = realtime._stream("feed", utcnow() + timedelta(seconds=0.2), None)
+        await anext(stream)
+        assert {frame async for frame in stream} <= {realtime.HEARTBEAT}
+
+        assert time.monotonic() - started < realtime.REALTIME_HEARTBEAT_SECONDS
+        await bus.close()
+    asyncio.run(scenario())
+
+
+def test_redis_bus_subscribes_once_per_channel():
+    async def scenario():
+        bus = RedisBus(fakeredis.FakeAsyncRedis())
+
+        async def redis_subscribers():
+            ((_, count),) = await bus.client.pubsub_numsub("realtime:feed")
+            return count
+
+        async with bus.subscribe("feed") as first:
+            async with bus.subscribe("feed") as second:
+                assert await redis_subscribers() == 1
+            assert await redis_subscribers() == 1
+            assert bus.has_subscribers("feed")
+        assert await redis_subscribers() == 0
+        assert bus.connections == 0
+        await bus.close()
+    asyncio.run(scenario())
+
+
+def test_redis_bus_strips_channel_prefix():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        bus = RedisBus(fakeredis.FakeAsyncRedis(server=server))
+        other_worker = RedisBus(fakeredis.FakeAsyncRedis(server=server))
+
+        async with bus.subscribe("feed:1:comments") as subscription:
+            await other_worker.publish("feed:1:comments", "event")
+            assert await asyncio.wait_for(subscription.queue.get(), timeout=5) == "event"
+        await bus.close()
+        await other_worker.close()
+    asyncio.run(scenario())
+
+
+def read_stream(client, url, headers=None):
+    """Read an event stream to its end in a thread; returns the thread and a list that receives the response."""
+    body = []
+
+    def read():
+        response = client.get(url, headers=headers)
+        body.append(response)
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+    return thread, body
+
+
+def wait_for_subscriber(channel):
+    deadline = time.monotonic() + 5
+    while not realtime.bus.has_subscribers(channel):
+        assert time.monotonic() < deadline, "stream never subscribed"
+        time.sleep(0.01)
+
+
+def test_comment_stream(client, make_user, make_feed, make_comment, monkeypatch):
+    user_id, headers = make_user()
+    feed_id = make_feed(headers)
+    # Ends the stream soon after the comment, since the test client reads whole bodies
+    monkeypatch.setattr(realtime, "REALTIME_MAX_STREAM_SECONDS", 1)
+
+    thread, body = read_stream(client, f"/api/comments/stream?feed_id={feed_id}", headers)
+    wait_for_subscriber(feed_comments_channel(feed_id))
+    comment = make_comment(headers, feed_id, "live")
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    (response,) = body
+    assert response.headers["content-type"].startswith("text/event-stream")
+    ready, created = response.text.split("\n\n")[:2]
+    assert ready == "event: ready\ndata: {}"
+    assert created.startswith("event: comment.created\ndata: ")
+    assert f'"id":{comment["id"]}' in created
+
+
+def test_public_stream_ends_on_revocation(client, make_user, make_feed, monkeypatch):
+    user_id, headers = make_user()
+    feed_id = make_feed(headers)
+    token = client.post("/api/share/public", headers=headers, json={"feed_id": feed_id}).json()["share_token"]
+    monkeypatch.setattr(realtime, "REALTIME_HEARTBEAT_SECONDS", 0.1)
+
+    thread, body = read_stream(client, f"/api/share/public/{token}/comments/stream")
+    wait_for_subscriber(feed_comments_channel(feed_id))
+    response = client.delete(f"/api/share/public/{token}", headers=headers)
+    assert response.status_code == 204
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    (response,) = body
+    assert response.text.startswith("event: ready\n")
+    assert client.get(f"/api/share/public/{token}/comments/stream").status_code == 404
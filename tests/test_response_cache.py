@@ -0,0 +1,146 @@
+import asyncio
+from typing import List
+
+import fakeredis
+import pytest
+
+from app.cache.cache import TTLCache, MISSING
+from app.cache.responses import MemoryBackend, RedisBackend, ResponseCache
+
+
+def test_ttl_cache_delete_group():
+    cache = TTLCache(maxsize=10, ttl=60, group=lambda key: key[0])
+    cache.set((1, "a"), "a")
+    cache.set((1, "b"), "b")
+    cache.set((2, "a"), "c")
+
+    cache.delete_group(1)
+
+    assert cache.get((1, "a")) is MISSING
+    assert cache.get((1, "b")) is MISSING
+    assert cache.get((2, "a")) == "c"
+    assert cache._groups == {2: {(2, "a")}}
+
+
+def test_ttl_cache_group_index_follows_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60, group=lambda key: key[0])
+    for name in "abc":
+        cache.set((1, name), name)
+
+    assert cache._groups == {1: {(1, "b"), (1, "c")}}
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    if request.param == "memory":
+        return ResponseCache(MemoryBackend(maxsize=100, ttl=60))
+    return ResponseCache(RedisBackend(fakeredis.FakeAsyncRedis(), ttl=60))
+
+
+def test_store_then_hit(cache):
+    async def scenario():
+        cached, generation = await cache.get(1, "feeds", "X-Next-Cursor")
+        assert cached is None
+        await cache.store(1, "feeds", generation, List[int], [1, 2], "X-Next-Cursor", next_cursor="abc")
+
+        cached, _ = await cache.get(1, "feeds", "X-Next-Cursor")
+        assert cached.body == b"[1,2]"
+        assert cached.headers["X-Next-Cursor"] == "abc"
+    asyncio.run(scenario())
+
+
+def test_evict_is_per_user(cache):
+    async def scenario():
+        for user_id in (1, 2):
+            _, generation = await cache.get(user_id, "feeds", "X-Next-Cursor")
+            await cache.store(user_id, "feeds", generation, List[int], [user_id], "X-Next-Cursor")
+
+        await cache.evict([1, None])
+
+        assert (await cache.get(1, "feeds", "X-Next-Cursor"))[0] is None
+        assert (await cache.get(2, "feeds", "X-Next-Cursor"))[0].body == b"[2]"
+    asyncio.run(scenario())
+
+
+def test_page_read_before_eviction_is_not_cached(cache):
+    async def scenario():
+        _, generation = await cache.get(1, "feeds", "X-Next-Cursor")
+        # A write commits and evicts while the stale page is being built
+        await cache.evict([1])
+        response = await cache.store(1, "feeds", generation, List[int], [1], "X-Next-Cursor")
+
+        assert response.body == b"[1]"
+        assert (await cache.get(1, "feeds", "X-Next-Cursor"))[0] is None
+    asyncio.run(scenario())
+
+
+def test_redis_eviction_during_store_is_not_overwritten():
+    server = fakeredis.FakeServer()
+    backend = RedisBackend(fakeredis.FakeAsyncRedis(server=server), ttl=60)
+    other_worker = fakeredis.FakeAsyncRedis(server=server)
+    pipeline = backend.client.pipeline
+
+    def racing_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        get = pipe.get
+
+        async def get_then_evict(name):
+            # Another worker evicts between the generation check and MULTI
+            value = await get(name)
+            await other_worker.incr(name)
+            return value
+        pipe.get = get_then_evict
+        return pipe
+
+    async def scenario():
+        _, generation = await backend.get(1, "feeds")
+        backend.client.pipeline = racing_pipeline
+        assert await backend.set(1, "feeds", b"stale", generation) is False
+        backend.client.pipeline = pipeline
+        assert (await backend.get(1, "feeds"))[0] is None
+
+        await backend.evict({1})
+        assert await other_worker.ttl("responses:1:generation") > 0
+    asyncio.run(scenario())
+
+
+def test_backend_failure_is_a_miss():
+    class BrokenBackend:
+        async def get(self, user_id, key):
+            raise ConnectionError
+
+        async def set(self, user_id, key, value, generation):
+            raise ConnectionError
+
+        async def evict(self, user_ids):
+            raise ConnectionError
+
+    async def scenario():
+        cache = ResponseCache(BrokenBackend())
+        assert await cache.get(1, "feeds", "X-Next-Cursor") == (None, None)
+        response = await cache.store(1, "feeds", None, List[int], [1], "X-Next-Cursor")
+        assert response.body == b"[1]"
+        await cache.evict([1])
+    asyncio.run(scenario())
+
+
+def test_listing_evicted_by_writes(client, make_user, make_feed, user_email):
+    owner_id, owner = make_user()
+    reader_id, reader = make_user()
+    feed_id = make_feed(owner, title="Before")
+
+    assert [feed["title"] for feed in client.get("/api/feeds/", headers=owner).json()] == ["Before"]
+    assert client.get("/api/feeds/", headers=reader).json() == []
+
+    response = client.put(f"/api/feeds/{feed_id}", headers=owner, json={"title": "After"})
+    assert response.status_code == 200
+    assert [feed["title"] for feed in client.get("/api/feeds/", headers=owner).json()] == ["After"]
+
+    response = client.post("/api/share/user", headers=owner, json={"feed_id": feed_id, "email": user_email(reader)})
+    assert response.status_code == 200
+    assert [feed["id"] for feed in client.get("/api/feeds/", headers=reader).json()] == [feed_id]
+
+    response = client.delete(f"/api/feeds/{feed_id}", headers=owner)
+    assert response.status_code == 204
+    assert client.get("/api/feeds/", headers=owner).json() == []
+    assert client.get("/api/feeds/", headers=reader).json() == []
@@ -0,0 +1,87 @@
+from app.database.database import AsyncSessionLocal
+from app.search.search import store_pages, MAX_MATCHES_PER_FEED
+
+
+def add_pages(client, feed_id, pages):
+    """Store extracted page text for a feed, as the processing job would."""
+    async def store():
+        async with AsyncSessionLocal() as db:
+            await store_pages(db, feed_id, pages)
+            await db.commit()
+    client.portal.call(store)
+
+
+def content_search(client, headers, q, **params):
+    response = client.get("/api/feeds/search", headers=headers, params={"q": q, "content": "true", **params})
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_content_search_ranks_feeds_before_pages(client, make_user, make_feed):
+    user_id, headers = make_user()
+    long_feed = make_feed(headers, title="Long")
+    short_feed = make_feed(headers, title="Short")
+    # More strong matches in one feed than the whole page of results could hold
+    add_pages(client, long_feed, ["zebra zebra zebra"] * (2 * MAX_MATCHES_PER_FEED + 1))
+    add_pages(client, short_feed, ["unrelated text", "a zebra among many other words on a longer page of text"])
+
+    feeds = content_search(client, headers, "zebra", limit=2).json()
+
+    assert [feed["id"] for feed in feeds] == [long_feed, short_feed]
+    assert len(feeds[0]["matches"]) == MAX_MATCHES_PER_FEED
+    assert feeds[1]["matches"] == [{"page_number": 2, "snippet": feeds[1]["matches"][0]["snippet"]}]
+    assert "[zebra]" in feeds[1]["matches"][0]["snippet"]
+
+
+def test_content_search_only_sees_visible_feeds(client, make_user, make_feed):
+    owner_id, owner = make_user()
+    other_id, other = make_user()
+    add_pages(client, make_feed(owner), ["quagga"])
+
+    assert content_search(client, other, "quagga").json() == []
+
+
+def all_pages(client, headers, params):
+    """Every result of a search, following X-Next-Cursor page by page."""
+    results, cursor = [], None
+    while True:
+        response = client.get(
+            "/api/feeds/search", headers=headers, params={**params, **({"cursor": cursor} if cursor else {})}
+        )
+        assert response.status_code == 200, response.text
+        results += [feed["id"] for feed in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return results
+
+
+def test_search_pages_through_ranked_results(client, make_user, make_feed):
+    user_id, headers = make_user()
+    feed_ids = [make_feed(headers, title=" ".join(["okapi"] * number + ["filler"] * 5)) for number in range(1, 6)]
+    # Equal scores are ordered by id
+    feed_ids += [make_feed(headers, title="okapi filler filler filler filler filler") for _ in range(2)]
+
+    ranked = all_pages(client, headers, {"q": "okapi", "limit": 100})
+    assert sorted(ranked) == sorted(feed_ids)
+
+    assert all_pages(client, headers, {"q": "okapi", "limit": 2}) == ranked
+
+
+def test_content_search_pages_through_feeds(client, make_user, make_feed):
+    user_id, headers = make_user()
+    feed_ids = [make_feed(headers) for _ in range(5)]
+    for number, feed_id in enumerate(feed_ids, start=1):
+        add_pages(client, feed_id, [" ".join(["tapir"] * number + ["filler"] * 5)])
+
+    ranked = all_pages(client, headers, {"q": "tapir", "content": "true", "limit": 100})
+    assert sorted(ranked) == sorted(feed_ids)
+
+    assert all_pages(client, headers, {"q": "tapir", "content": "true", "limit": 2}) == ranked
+
+
+def test_search_rejects_bad_cursor(client, make_user):
+    user_id, headers = make_user()
+
+    response = client.get("/api/feeds/search", headers=headers, params={"q": "okapi", "cursor": "garbage"})
+
+    assert response.status_code == 400
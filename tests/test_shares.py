@@ -0,0 +1,148 @@
+from datetime import timedelta
+import uuid
+
+from app.cache.cache import MISSING
+from app.metrics.testing import capture_queries
+from app.models.models import utcnow
+from app.realtime.realtime import bus
+from app.schemas.schemas import BULK_SHARE_MAX_EMAILS
+from app.sharing import sharing
+from app.sharing.sharing import share_cache, SHARE_INVALIDATION_CHANNEL
+
+
+def bulk(client, path, headers, feed_id, emails):
+    response = client.post(f"/api/share/user/{path}", headers=headers, json={"feed_id": feed_id, "emails": emails})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def shared_with(client, headers):
+    return [feed["id"] for feed in client.get("/api/share/user", headers=headers).json()]
+
+
+def test_bulk_share(client, make_user, make_feed, user_email):
+    owner_id, owner = make_user()
+    first_id, first = make_user()
+    second_id, second = make_user()
+    feed_id = make_feed(owner)
+    emails = [user_email(first), user_email(second)]
+
+    results = bulk(client, "bulk", owner, feed_id, emails + ["nobody@example.com", emails[0]])
+
+    # One result per distinct email, in request order
+    assert [(result["email"], result["status"]) for result in results] == [
+        (emails[0], "shared"),
+        (emails[1], "shared"),
+        ("nobody@example.com", "user_not_found"),
+    ]
+    assert shared_with(client, first) == [feed_id]
+    assert shared_with(client, second) == [feed_id]
+
+    again = bulk(client, "bulk", owner, feed_id, emails[:1])
+    assert again == [{"email": emails[0], "status": "already_shared", "share_id": results[0]["share_id"]}]
+
+
+def test_bulk_share_requires_access(client, make_user, make_feed, user_email):
+    owner_id, owner = make_user()
+    stranger_id, stranger = make_user()
+    feed_id = make_feed(owner)
+
+    response = client.post(
+        "/api/share/user/bulk", headers=stranger, json={"feed_id": feed_id, "emails": [user_email(stranger)]}
+    )
+    assert response.status_code == 403
+
+    response = client.post("/api/share/user/bulk", headers=owner, json={"feed_id": feed_id, "emails": []})
+    assert response.status_code == 422
+
+    too_many = [f"user{number}@example.com" for number in range(BULK_SHARE_MAX_EMAILS + 1)]
+    response = client.post("/api/share/user/bulk", headers=owner, json={"feed_id": feed_id, "emails": too_many})
+    assert response.status_code == 422
+
+
+def test_bulk_revoke(client, make_user, make_feed, user_email):
+    owner_id, owner = make_user()
+    reader_id, reader = make_user()
+    other_id, other = make_user()
+    unshared_id, unshared = make_user()
+    feed_id = make_feed(owner)
+    bulk(client, "bulk", owner, feed_id, [user_email(reader), user_email(other)])
+    assert shared_with(client, reader) == [feed_id]
+
+    # A recipient may only revoke shares they granted or received
+    results = bulk(client, "bulk/revoke", reader, feed_id, [user_email(other)])
+    assert [result["status"] for result in results] == ["not_authorized"]
+
+    emails = [user_email(reader), user_email(unshared), "nobody@example.com"]
+    results = bulk(client, "bulk/revoke", owner, feed_id, emails)
+
+    assert [(result["email"], result["status"]) for result in results] == [
+        (emails[0], "revoked"),
+        (emails[1], "not_shared"),
+        ("nobody@example.com", "user_not_found"),
+    ]
+    assert shared_with(client, reader) == []
+    assert shared_with(client, other) == [feed_id]
+
+    results = bulk(client, "bulk/revoke", owner, feed_id, emails[:1])
+    assert [result["status"] for result in results] == ["not_shared"]
+
+
+def share_link(client, headers, feed_id, **options):
+    response = client.post("/api/share/public", headers=headers, json={"feed_id": feed_id, **options})
+    assert response.status_code == 200, response.text
+    return response.json()["share_token"]
+
+
+def share_selects(log):
+    return [statement for statement in log.statements if "FROM file_shares" in statement]
+
+
+def test_unknown_token_is_cached(client):
+    token = str(uuid.uuid4())
+    assert client.get(f"/api/share/public/{token}").status_code == 404
+
+    with capture_queries() as log:
+        assert client.get(f"/api/share/public/{token}").status_code == 404
+
+    assert share_selects(log) == []
+
+
+def test_cached_share_expires(client, make_user, make_feed, monkeypatch):
+    owner_id, owner = make_user()
+    token = share_link(client, owner, make_feed(owner), expires_in_days=1)
+    assert client.get(f"/api/share/public/{token}").status_code == 200
+    assert share_cache.get(token) is not MISSING
+
+    # The cached share is still there, but its expiry is checked on each request
+    later = utcnow() + timedelta(days=2)
+    monkeypatch.setattr(sharing, "utcnow", lambda: later)
+
+    assert client.get(f"/api/share/public/{token}").status_code == 410
+
+
+def test_revoked_share_stops_resolving(client, make_user, make_feed):
+    owner_id, owner = make_user()
+    token = share_link(client, owner, make_feed(owner))
+    assert client.get(f"/api/share/public/{token}").status_code == 200
+
+    with client.portal.wrap_async_context_manager(bus.subscribe(SHARE_INVALIDATION_CHANNEL)) as subscription:
+        assert client.delete(f"/api/share/public/{token}", headers=owner).status_code == 204
+
+        assert subscription.queue.get_nowait() == token
+    assert client.get(f"/api/share/public/{token}").status_code == 404
+
+
+def test_deleted_feed_stops_resolving(client, make_user, make_feed):
+    owner_id, owner = make_user()
+    feed_id = make_feed(owner)
+    token = share_link(client, owner, feed_id)
+    assert client.get(f"/api/share/public/{token}").status_code == 200
+
+    with client.portal.wrap_async_context_manager(bus.subscribe(SHARE_INVALIDATION_CHANNEL)) as subscription:
+        assert client.delete(f"/api/feeds/{feed_id}", headers=owner).status_code == 204
+
+        # Other workers drop the share too
+        assert subscription.queue.get_nowait() == token
+    assert share_cache.get(token) is MISSING
+    assert client.get(f"/api/share/public/{token}").status_code == 404
@@ -0,0 +1,101 @@
+from app.database.database import SessionLocal
+from app.models.models import UserShare
+from app.pagination.pagination import encode_cursor
+
+
+def start_sync(client, headers):
+    response = client.get("/api/feeds/changes", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["feeds"] == []
+    return response.json()["cursor"]
+
+
+def sync(client, headers, cursor):
+    response = client.get("/api/feeds/changes", headers=headers, params={"since": cursor})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def removed(changes):
+    return {(tombstone["entity"], tombstone["entity_id"]) for tombstone in changes["deleted"]}
+
+
+def share(client, headers, feed_id, email):
+    response = client.post("/api/share/user/bulk", headers=headers, json={"feed_id": feed_id, "emails": [email]})
+    assert response.status_code == 200
+    return response.json()[0]["share_id"]
+
+
+def test_comment_changes_and_tombstones(client, make_user, make_feed, make_comment):
+    user_id, headers = make_user()
+    feed_id = make_feed(headers)
+    cursor = start_sync(client, headers)
+
+    comment = make_comment(headers, feed_id)
+    changes = sync(client, headers, cursor)
+    assert comment["id"] in [row["id"] for row in changes["comments"]]
+    assert feed_id in [feed["id"] for feed in changes["feeds"]]
+
+    response = client.delete(f"/api/comments/{comment['id']}", headers=headers)
+    assert response.status_code == 204
+    changes = sync(client, headers, changes["cursor"])
+    assert ("comment", comment["id"]) in removed(changes)
+    assert comment["id"] not in [row["id"] for row in changes["comments"]]
+
+
+def test_revoked_share_removes_feed_for_recipient(client, make_user, make_feed, user_email):
+    owner_id, owner = make_user()
+    reader_id, reader = make_user()
+    feed_id = make_feed(owner)
+    cursor = start_sync(client, reader)
+
+    share_id = share(client, owner, feed_id, user_email(reader))
+    changes = sync(client, reader, cursor)
+    assert [feed["id"] for feed in changes["feeds"]] == [feed_id]
+    assert [row["id"] for row in changes["shares"]] == [share_id]
+
+    response = client.delete(f"/api/share/user/{share_id}", headers=owner)
+    assert response.status_code == 204
+    changes = sync(client, reader, changes["cursor"])
+    assert {("share", share_id), ("feed", feed_id)} <= removed(changes)
+    assert changes["feeds"] == []
+    assert changes["shares"] == []
+
+
+def test_deleted_feed_reaches_owner_and_recipients(client, make_user, make_feed, user_email):
+    owner_id, owner = make_user()
+    reader_id, reader = make_user()
+    feed_id = make_feed(owner)
+    share(client, owner, feed_id, user_email(reader))
+    cursors = {user: start_sync(client, headers) for user, headers in ((owner_id, owner), (reader_id, reader))}
+
+    response = client.delete(f"/api/feeds/{feed_id}", headers=owner)
+    assert response.status_code == 204
+
+    for user, headers in ((owner_id, owner), (reader_id, reader)):
+        changes = sync(client, headers, cursors[user])
+        assert ("feed", feed_id) in removed(changes)
+        assert changes["feeds"] == []
+
+
+def test_shares_orphaned_by_deleted_feeds_are_skipped(client, make_user):
+    owner_id, owner = make_user()
+    reader_id, reader = make_user()
+    cursor = start_sync(client, reader)
+    # Left behind by feed deletions before shares were removed with their feed
+    with SessionLocal() as db:
+        db.add(UserShare(feed_id=None, shared_by_id=owner_id, shared_with_id=reader_id))
+        db.commit()
+
+    for headers in (owner, reader):
+        assert sync(client, headers, cursor)["shares"] == []
+
+
+def test_bad_and_expired_cursors(client, make_user):
+    user_id, headers = make_user()
+
+    response = client.get("/api/feeds/changes", headers=headers, params={"since": "garbage"})
+    assert response.status_code == 400
+
+    response = client.get("/api/feeds/changes", headers=headers, params={"since": encode_cursor("2000-01-01T00:00:00")})
+    assert response.status_code == 410
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+import time
+
+from jose import jwt
+from sqlalchemy import update
+
+from app.auth import auth
+from app.auth.auth import user_cache, USER_INVALIDATION_CHANNEL
+from app.database.database import SessionLocal
+from app.metrics.testing import query_budget, capture_queries
+from app.models.models import User
+from app.realtime.realtime import bus
+
+
+def reissued(headers, seconds=1):
+    """The same token issued some seconds later, as a new login would be."""
+    payload = jwt.decode(headers["Authorization"].split()[1], auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    payload["iat"] += seconds
+    payload["exp"] = datetime.now(timezone.utc) + timedelta(minutes=5)
+    return {"Authorization": f"Bearer {jwt.encode(payload, auth.SECRET_KEY, algorithm=auth.ALGORITHM)}"}
+
+
+def cached_for(user_id):
+    return [key for key in user_cache._entries if key[0] == user_id]
+
+
+def user_selects(log):
+    return [statement for statement in log.statements if "FROM users" in statement]
+
+
+def test_cached_user_needs_no_query(client, make_user):
+    user_id, headers = make_user()
+    client.get("/api/feeds/", headers=headers)
+
+    # Both the user and the listing come from their caches
+    with query_budget(0):
+        response = client.get("/api/feeds/", headers=headers)
+
+    assert response.status_code == 200
+
+
+def test_new_token_loads_user_again(client, make_user):
+    user_id, headers = make_user()
+    client.get("/api/feeds/", headers=headers)
+
+    with capture_queries() as log:
+        response = client.get("/api/feeds/", headers=reissued(headers))
+
+    assert response.status_code == 200
+    assert len(user_selects(log)) == 1
+    assert len(cached_for(user_id)) == 2
+
+
+def test_deactivation_invalidates_cached_user(client, make_user):
+    user_id, headers = make_user()
+    assert client.get("/api/feeds/", headers=headers).status_code == 200
+    assert cached_for(user_id)
+
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+        user.is_active = False
+        db.commit()
+
+    assert cached_for(user_id) == []
+    response = client.get("/api/feeds/", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+
+def test_bulk_deactivation_leaves_cache_alone(client, make_user):
+    # Core updates bypass the ORM hook; only the TTL bounds these
+    user_id, headers = make_user()
+    client.get("/api/feeds/", headers=headers)
+
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.id == user_id).values(is_active=False))
+        db.commit()
+
+    assert cached_for(user_id)
+
+
+def test_invalidation_from_another_worker(client, make_user):
+    user_id, headers = make_user()
+    client.get("/api/feeds/", headers=headers)
+    assert cached_for(user_id)
+
+    client.portal.call(bus.publish, USER_INVALIDATION_CHANNEL, str(user_id))
+
+    # The listener applies it on the app's event loop
+    deadline = time.monotonic() + 5
+    while cached_for(user_id):
+        assert time.monotonic() < deadline, "invalidation never applied"
+        time.sleep(0.01)
+
+
+def test_profile_change_is_broadcast(client, make_user):
+    user_id, headers = make_user()
+    client.get("/api/feeds/", headers=headers)
+
+    with client.portal.wrap_async_context_manager(bus.subscribe(USER_INVALIDATION_CHANNEL)) as subscription:
+        response = client.put("/api/users/profile", headers=headers, json={"email": f"new{user_id}@example.com"})
+
+        assert response.status_code == 200
+        assert subscription.queue.get_nowait() == str(user_id)
+    assert cached_for(user_id) == []